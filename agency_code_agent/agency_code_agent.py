@@ -20,11 +20,13 @@ from shared.system_hooks import create_system_reminder_hook
 from tools import (
     LS,
     Bash,
+    BashOutput,
     Edit,
     ExitPlanMode,
     Git,
     Glob,
     Grep,
+    KillBash,
     MultiEdit,
     NotebookEdit,
     NotebookRead,
@@ -80,6 +82,8 @@ def create_agency_code_agent(
         hooks=hooks,
         tools=[
             Bash,
+            BashOutput,
+            KillBash,
             Glob,
             Grep,
             LS,
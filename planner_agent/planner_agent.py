@@ -18,11 +18,13 @@ from shared.system_hooks import create_message_filter_hook
 from tools import (
     LS,
     Bash,
+    BashOutput,
     Edit,
     ExitPlanMode,
     Git,
     Glob,
     Grep,
+    KillBash,
     MultiEdit,
     NotebookEdit,
     NotebookRead,
@@ -76,6 +78,8 @@ def create_planner_agent(
         hooks=hooks,
         tools=[
             Bash,
+            BashOutput,
+            KillBash,
             Glob,
             Grep,
             LS,
@@ -0,0 +1,244 @@
+import bisect
+import difflib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Regions up to this many lines per side are matched directly with
+# SequenceMatcher; larger ones are first split at lines unique to both sides
+_MAX_MATCH_LINES = 2000
+
+
+def _trim_common_lines(old_lines: Sequence, new_lines: Sequence) -> Tuple[int, int]:
+    """Return (prefix, suffix) counts of identical leading/trailing lines."""
+    limit = min(len(old_lines), len(new_lines))
+    prefix = 0
+    while prefix < limit and old_lines[prefix] == new_lines[prefix]:
+        prefix += 1
+
+    suffix = 0
+    limit -= prefix
+    while (
+        suffix < limit
+        and old_lines[len(old_lines) - 1 - suffix]
+        == new_lines[len(new_lines) - 1 - suffix]
+    ):
+        suffix += 1
+    return prefix, suffix
+
+
+def _unique_anchors(
+    old_lines: Sequence, new_lines: Sequence, o1: int, o2: int, n1: int, n2: int
+) -> List[Tuple[int, int]]:
+    """
+    Pair up lines that occur exactly once on each side (patience diff).
+
+    Returns the longest run of pairs that is increasing on both sides, so
+    the pairs can split the region into independent sub-regions.
+    """
+    counts: Dict = {}
+    for i in range(o1, o2):
+        entry = counts.get(old_lines[i])
+        counts[old_lines[i]] = [i, None, 1, 0] if entry is None else [entry[0], None, entry[2] + 1, 0]
+    for j in range(n1, n2):
+        entry = counts.get(new_lines[j])
+        if entry is not None:
+            entry[1] = j
+            entry[3] += 1
+    pairs = sorted(
+        (entry[0], entry[1]) for entry in counts.values() if entry[2] == 1 and entry[3] == 1
+    )
+
+    # Longest increasing subsequence of the new-side positions
+    tails: List[int] = []
+    tail_pairs: List[int] = []
+    previous: List[int] = []
+    for index, (_, j) in enumerate(pairs):
+        k = bisect.bisect_left(tails, j)
+        previous.append(tail_pairs[k - 1] if k else -1)
+        if k == len(tails):
+            tails.append(j)
+            tail_pairs.append(index)
+        else:
+            tails[k] = j
+            tail_pairs[k] = index
+    anchors = []
+    index = tail_pairs[-1] if tail_pairs else -1
+    while index != -1:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def _match_window(old_lines, new_lines, o1, o2, n1, n2, blocks) -> None:
+    """Append SequenceMatcher's changed blocks for a region of bounded size."""
+    matcher = difflib.SequenceMatcher(None, old_lines[o1:o2], new_lines[n1:n2], autojunk=False)
+    blocks.extend(
+        (o1 + i1, o1 + i2, n1 + j1, n1 + j2)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    )
+
+
+def _match_windows(old_lines, new_lines, o1, o2, n1, n2, blocks) -> None:
+    """
+    Match a large region without unique lines in bounded windows.
+
+    Each window is matched with SequenceMatcher and the changes up to its
+    last matching run are kept; the next window starts after that run.
+    """
+    while o2 - o1 > _MAX_MATCH_LINES or n2 - n1 > _MAX_MATCH_LINES:
+        wo = min(o2, o1 + _MAX_MATCH_LINES)
+        wn = min(n2, n1 + _MAX_MATCH_LINES)
+        matcher = difflib.SequenceMatcher(None, old_lines[o1:wo], new_lines[n1:wn], autojunk=False)
+        opcodes = matcher.get_opcodes()
+        last_equal = max(
+            (index for index, opcode in enumerate(opcodes) if opcode[0] == "equal"), default=None
+        )
+        if last_equal is None:
+            # Nothing in common within the window: the window itself changed
+            blocks.append((o1, wo, n1, wn))
+            o1, n1 = wo, wn
+            continue
+        blocks.extend(
+            (o1 + i1, o1 + i2, n1 + j1, n1 + j2)
+            for tag, i1, i2, j1, j2 in opcodes[:last_equal]
+            if tag != "equal"
+        )
+        _, _, i2, _, j2 = opcodes[last_equal]
+        o1, n1 = o1 + i2, n1 + j2
+    if o1 < o2 or n1 < n2:
+        _match_window(old_lines, new_lines, o1, o2, n1, n2, blocks)
+
+
+def changed_blocks(
+    old_lines: Sequence, new_lines: Sequence
+) -> List[Tuple[int, int, int, int]]:
+    """Return 0-based, half-open (old_start, old_end, new_start, new_end) ranges that differ.
+
+    The common prefix and suffix are skipped, so an edit in a large file
+    costs time proportional to the edited region. Regions too large to
+    match directly are split at lines that occur once on each side, and
+    regions without such lines are matched window by window, so distant
+    edits never merge into one large replacement. Any sequences of
+    comparable items work, e.g. lines or per-line hashes.
+    """
+    blocks: List[Tuple[int, int, int, int]] = []
+    regions = [(0, len(old_lines), 0, len(new_lines))]
+    while regions:
+        o1, o2, n1, n2 = regions.pop()
+        prefix, suffix = _trim_common_lines(old_lines[o1:o2], new_lines[n1:n2])
+        o1, n1 = o1 + prefix, n1 + prefix
+        o2, n2 = o2 - suffix, n2 - suffix
+        if o1 == o2 and n1 == n2:
+            continue
+        if o1 == o2 or n1 == n2:
+            blocks.append((o1, o2, n1, n2))
+            continue
+        if o2 - o1 <= _MAX_MATCH_LINES and n2 - n1 <= _MAX_MATCH_LINES:
+            _match_window(old_lines, new_lines, o1, o2, n1, n2, blocks)
+            continue
+
+        anchors = _unique_anchors(old_lines, new_lines, o1, o2, n1, n2)
+        if not anchors:
+            _match_windows(old_lines, new_lines, o1, o2, n1, n2, blocks)
+            continue
+        # Anchored lines are equal; the gaps between them are matched separately
+        for i, j in anchors:
+            regions.append((o1, i, n1, j))
+            o1, n1 = i + 1, j + 1
+        regions.append((o1, o2, n1, n2))
+
+    blocks.sort()
+    return blocks
+
+
+def _hunk_range(start: int, length: int) -> str:
+    """Format a unified diff range (1-based start, like GNU diff)."""
+    if length == 0:
+        return f"{start},0"
+    if length == 1:
+        return f"{start + 1}"
+    return f"{start + 1},{length}"
+
+
+def compact_diff(
+    old_text: str,
+    new_text: str,
+    file_path: str = "",
+    context: int = 3,
+    max_lines: int = 80,
+    max_hunks: Optional[int] = None,
+) -> str:
+    """Build a bounded unified diff between two versions of a file.
+
+    Args:
+        old_text: Content before the change
+        new_text: Content after the change
+        file_path: Path shown in the ---/+++ header lines
+        context: Number of unchanged lines shown around each change
+        max_lines: Maximum number of diff body lines returned
+        max_hunks: Maximum number of hunks rendered (None for no limit)
+
+    Returns:
+        Unified diff text, or an empty string when the contents are identical
+    """
+    old_lines = old_text.splitlines()
+    new_lines = new_text.splitlines()
+    blocks = changed_blocks(old_lines, new_lines)
+    if not blocks:
+        return ""
+
+    # Group changed blocks whose context windows overlap into hunks
+    hunks = []
+    current = [blocks[0]]
+    for block in blocks[1:]:
+        if block[0] - current[-1][1] <= 2 * context:
+            current.append(block)
+        else:
+            hunks.append(current)
+            current = [block]
+    hunks.append(current)
+
+    body: List[str] = []
+    truncated = False
+    omitted_hunks = 0
+    if max_hunks is not None and len(hunks) > max_hunks:
+        omitted_hunks = len(hunks) - max_hunks
+        hunks = hunks[:max_hunks]
+    for index, hunk in enumerate(hunks):
+        if len(body) >= max_lines:
+            truncated = index < len(hunks)
+            break
+
+        old_start = max(0, hunk[0][0] - context)
+        new_start = max(0, hunk[0][2] - context)
+        old_stop = min(len(old_lines), hunk[-1][1] + context)
+        new_stop = min(len(new_lines), hunk[-1][3] + context)
+        body.append(
+            f"@@ -{_hunk_range(old_start, old_stop - old_start)} "
+            f"+{_hunk_range(new_start, new_stop - new_start)} @@"
+        )
+
+        # Slices are capped to the remaining budget so huge replacements
+        # never materialize more lines than can be shown
+        cursor = old_start
+        for o1, o2, n1, n2 in hunk:
+            body.extend(" " + line for line in old_lines[cursor:o1])
+            room = max(0, max_lines + 1 - len(body))
+            body.extend("-" + line for line in old_lines[o1 : min(o2, o1 + room)])
+            room = max(0, max_lines + 1 - len(body))
+            body.extend("+" + line for line in new_lines[n1 : min(n2, n1 + room)])
+            cursor = o2
+        body.extend(" " + line for line in old_lines[cursor:old_stop])
+
+    if len(body) > max_lines:
+        body = body[:max_lines]
+        truncated = True
+
+    display_path = file_path.lstrip("/")
+    lines = [f"--- a/{display_path}", f"+++ b/{display_path}"] + body
+    if truncated:
+        lines.append(f"... (diff truncated to {max_lines} lines)")
+    elif omitted_hunks:
+        lines.append(f"... ({omitted_hunks} more hunks not shown)")
+    return "\n".join(lines)
@@ -0,0 +1,231 @@
+import hashlib
+import io
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import List, Optional
+
+from shared.diff_utils import changed_blocks
+
+# Session key used when the tool context carries no session id (standalone tool use)
+DEFAULT_SESSION = "default"
+
+
+def split_lines(data: bytes) -> List[str]:
+    """Decode file bytes (utf-8, falling back to latin-1) into lines like text-mode readlines()."""
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        # latin-1 can decode any byte sequence
+        text = data.decode("latin-1")
+    return io.StringIO(text, newline=None).readlines()
+
+
+def hash_lines(lines: List[str]) -> array:
+    """Compact per-line hashes, used to locate changed lines without keeping file contents."""
+    return array("q", map(hash, lines))
+
+
+@dataclass(frozen=True)
+class FileFingerprint:
+    """Identity and content hash of a file at the moment it was read or written."""
+
+    device: int
+    inode: int
+    size: int
+    mtime_ns: int
+    digest: bytes
+    line_hashes: Optional[array] = None
+
+    @classmethod
+    def from_stat(
+        cls,
+        stat: os.stat_result,
+        data: bytes,
+        lines: Optional[List[str]] = None,
+    ) -> "FileFingerprint":
+        """Build a fingerprint from a stat result and the bytes (and decoded lines) it describes."""
+        return cls(
+            device=stat.st_dev,
+            inode=stat.st_ino,
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            digest=hashlib.blake2b(data).digest(),
+            line_hashes=hash_lines(lines) if lines is not None else None,
+        )
+
+
+class FileReadRegistry:
+    """
+    Bounded, session-scoped record of files the agent has read.
+
+    Each session maps absolute paths to the fingerprint captured at read time
+    (None when the path could not be read, e.g. it does not exist yet).
+    Both the number of sessions and the files per session are capped, with the
+    least recently used entry evicted first.
+    """
+
+    def __init__(self, max_sessions: int = 32, max_files_per_session: int = 4096):
+        self.max_sessions = max_sessions
+        self.max_files_per_session = max_files_per_session
+        self._sessions: "OrderedDict[str, OrderedDict[str, Optional[FileFingerprint]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Incremented on every write by a file tool, so caches of command output can invalidate
+        self.write_generation = 0
+
+    def record(
+        self, session: str, path: str, fingerprint: Optional[FileFingerprint] = None
+    ) -> None:
+        """Record that `path` was read (or written) in `session`."""
+        with self._lock:
+            files = self._sessions.get(session)
+            if files is None:
+                files = OrderedDict()
+                self._sessions[session] = files
+                if len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session)
+
+            files[path] = fingerprint
+            files.move_to_end(path)
+            if len(files) > self.max_files_per_session:
+                files.popitem(last=False)
+
+    def record_write(
+        self, session: str, path: str, fingerprint: Optional[FileFingerprint] = None
+    ) -> None:
+        """Record that `path` was written in `session` and bump `write_generation`."""
+        self.record(session, path, fingerprint)
+        self.mark_written()
+
+    def mark_written(self) -> None:
+        """Note that the agent changed files without recording a specific read."""
+        with self._lock:
+            self.write_generation += 1
+
+    def has_read(self, session: str, path: str) -> bool:
+        """Return True if `path` has been recorded for `session`."""
+        with self._lock:
+            files = self._sessions.get(session)
+            return files is not None and path in files
+
+    def get(self, session: str, path: str) -> Optional[FileFingerprint]:
+        """Return the fingerprint recorded for `path`, if any."""
+        with self._lock:
+            files = self._sessions.get(session)
+            return files.get(path) if files is not None else None
+
+    def forget_session(self, session: str) -> None:
+        """Drop everything recorded for `session`."""
+        with self._lock:
+            self._sessions.pop(session, None)
+
+    def clear(self) -> None:
+        """Drop all sessions."""
+        with self._lock:
+            self._sessions.clear()
+
+
+# Process-wide registry shared by Read, Edit, MultiEdit and Write
+read_registry = FileReadRegistry()
+
+
+def session_key(context) -> str:
+    """Return the registry session key for a tool context."""
+    if context is not None:
+        session_id = context.get("session_id", None)
+        if session_id:
+            return str(session_id)
+    return DEFAULT_SESSION
+
+
+def disk_bytes(text: str) -> bytes:
+    """Encode text exactly as a text-mode write would store it on this platform."""
+    if os.linesep != "\n":
+        text = text.replace("\n", os.linesep)
+    return text.encode("utf-8")
+
+
+def file_digest(path: str, chunk_size: int = 1024 * 1024) -> bytes:
+    """Hash a file in chunks so large files are never held in memory at once."""
+    digest = hashlib.blake2b()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def fingerprint_written_file(path: str, text: str) -> FileFingerprint:
+    """Fingerprint a file that was just written with `text` in text mode."""
+    return FileFingerprint.from_stat(
+        os.stat(path), disk_bytes(text), io.StringIO(text, newline=None).readlines()
+    )
+
+
+def fingerprint_file(path: str) -> FileFingerprint:
+    """Fingerprint a file from the bytes currently on disk."""
+    with open(path, "rb") as file:
+        data = file.read()
+        stat = os.fstat(file.fileno())
+    return FileFingerprint.from_stat(stat, data, split_lines(data))
+
+
+def _format_ranges(blocks) -> str:
+    """Describe changed blocks as 1-based line ranges of the current file."""
+    parts = []
+    for _, _, start, end in blocks[:20]:
+        if end - start > 1:
+            parts.append(f"{start + 1}-{end}")
+        elif end - start == 1:
+            parts.append(str(start + 1))
+        else:
+            parts.append(f"lines removed after {start}")
+    if len(blocks) > 20:
+        parts.append(f"... ({len(blocks) - 20} more)")
+    return ", ".join(parts)
+
+
+def check_stale_read(session: str, path: str) -> Optional[str]:
+    """
+    Return an error message if `path` changed on disk since it was read in `session`.
+
+    The check is a stat comparison (size and mtime_ns); the file is only
+    hashed when those differ, so touched-but-identical files still pass.
+    Returns None when the file is unchanged or no fingerprint was recorded.
+    """
+    fingerprint = read_registry.get(session, path)
+    if fingerprint is None:
+        return None
+
+    stat = os.stat(path)
+    if stat.st_size == fingerprint.size and stat.st_mtime_ns == fingerprint.mtime_ns:
+        return None
+
+    with open(path, "rb") as file:
+        data = file.read()
+    digest = hashlib.blake2b(data).digest()
+    if digest == fingerprint.digest:
+        # Same content with new metadata (e.g. touched); refresh the stat data
+        read_registry.record(
+            session,
+            path,
+            replace(
+                fingerprint,
+                device=stat.st_dev,
+                inode=stat.st_ino,
+                size=stat.st_size,
+                mtime_ns=stat.st_mtime_ns,
+            ),
+        )
+        return None
+
+    message = f"Error: File has been modified since it was last read: {path}"
+    if fingerprint.line_hashes is not None:
+        blocks = changed_blocks(fingerprint.line_hashes, hash_lines(split_lines(data)))
+        if blocks:
+            message += f"\nChanged lines in the current file: {_format_ranges(blocks)}"
+    message += "\nUse the Read tool to read the file again before modifying it."
+    return message
@@ -0,0 +1,221 @@
+import email.utils
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Mapping, Optional
+
+# Heuristic freshness for responses with Last-Modified but no explicit lifetime
+# (RFC 9111 section 4.2.2 suggests 10% of the time since modification), capped
+_HEURISTIC_FRACTION = 0.1
+_MAX_HEURISTIC_SECONDS = 24 * 3600
+
+# Response headers kept with each entry
+_STORED_HEADERS = ("content-type", "etag", "last-modified", "cache-control", "expires", "date")
+
+
+def _parse_cache_control(value: str) -> Dict[str, Optional[str]]:
+    directives: Dict[str, Optional[str]] = {}
+    for part in value.split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+def _parse_http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _freshness_lifetime(headers: Mapping[str, str], now: float) -> float:
+    """Seconds a response may be served without revalidation (0 means always revalidate)."""
+    directives = _parse_cache_control(headers.get("cache-control", ""))
+    if "no-cache" in directives:
+        return 0.0
+    for name in ("s-maxage", "max-age"):
+        if directives.get(name):
+            try:
+                return max(0.0, float(directives[name]))
+            except ValueError:
+                return 0.0
+    expires = _parse_http_date(headers.get("expires"))
+    if expires is not None:
+        date = _parse_http_date(headers.get("date")) or now
+        return max(0.0, expires - date)
+    last_modified = _parse_http_date(headers.get("last-modified"))
+    if last_modified is not None:
+        return min(_MAX_HEURISTIC_SECONDS, max(0.0, (now - last_modified) * _HEURISTIC_FRACTION))
+    return 0.0
+
+
+@dataclass
+class CachedResponse:
+    """A cached response body with the validators and lifetime it was stored with."""
+
+    url: str
+    body: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+    stored_at: float = 0.0
+    fresh_until: float = 0.0
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return (now if now is not None else time.time()) < self.fresh_until
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Request headers that let the server answer 304 Not Modified."""
+        headers = {}
+        if self.headers.get("etag"):
+            headers["If-None-Match"] = self.headers["etag"]
+        if self.headers.get("last-modified"):
+            headers["If-Modified-Since"] = self.headers["last-modified"]
+        return headers
+
+
+class HttpCache:
+    """
+    On-disk cache of HTTP GET responses, honoring ETag, Last-Modified and Cache-Control.
+
+    Each URL is stored in one file (a JSON header line followed by the body)
+    named by the URL's hash. Fresh entries are served without a request;
+    stale entries with validators are revalidated with a conditional
+    request. The total size is capped, evicting the least recently used
+    entries first (file mtimes record use, so the order survives restarts).
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 100 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # entry file name -> size, loaded from disk on first use
+        self._sizes: Optional[Dict[str, int]] = None
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".entry")
+
+    def _load_sizes(self) -> Dict[str, int]:
+        if self._sizes is None:
+            self._sizes = {}
+            try:
+                with os.scandir(self.directory) as entries:
+                    for entry in entries:
+                        if entry.name.endswith(".entry"):
+                            self._sizes[entry.name] = entry.stat().st_size
+            except FileNotFoundError:
+                pass
+        return self._sizes
+
+    def lookup(self, url: str) -> Optional[CachedResponse]:
+        """Return the cached response for `url`, fresh or stale, or None."""
+        path = self._path(url)
+        try:
+            with open(path, "rb") as file:
+                meta = json.loads(file.readline())
+                body = file.read()
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url:
+            return None
+        return CachedResponse(
+            url=url,
+            body=body,
+            headers=meta.get("headers", {}),
+            stored_at=meta.get("stored_at", 0.0),
+            fresh_until=meta.get("fresh_until", 0.0),
+        )
+
+    def store(self, url: str, headers: Mapping[str, str], body: bytes) -> Optional[CachedResponse]:
+        """Cache a 200 response unless it forbids storage or cannot be reused."""
+        lowered = {name.lower(): value for name, value in headers.items()}
+        directives = _parse_cache_control(lowered.get("cache-control", ""))
+        if "no-store" in directives or "private" in directives or lowered.get("vary", "").strip() == "*":
+            return None
+        if len(body) > self.max_bytes:
+            return None
+
+        now = time.time()
+        kept = {name: lowered[name] for name in _STORED_HEADERS if name in lowered}
+        lifetime = _freshness_lifetime(kept, now)
+        if lifetime == 0 and "etag" not in kept and "last-modified" not in kept:
+            # Neither fresh nor revalidatable: storing it would never save a download
+            return None
+
+        entry = CachedResponse(url=url, body=body, headers=kept, stored_at=now, fresh_until=now + lifetime)
+        self._write(entry)
+        return entry
+
+    def revalidated(self, entry: CachedResponse, headers: Mapping[str, str]) -> CachedResponse:
+        """Refresh a stale entry after a 304 response, merging its updated headers."""
+        lowered = {name.lower(): value for name, value in headers.items()}
+        entry.headers.update({name: lowered[name] for name in _STORED_HEADERS if name in lowered})
+        now = time.time()
+        entry.stored_at = now
+        entry.fresh_until = now + _freshness_lifetime(entry.headers, now)
+        self._write(entry)
+        return entry
+
+    def _write(self, entry: CachedResponse) -> None:
+        path = self._path(entry.url)
+        name = os.path.basename(path)
+        meta = {
+            "url": entry.url,
+            "headers": entry.headers,
+            "stored_at": entry.stored_at,
+            "fresh_until": entry.fresh_until,
+        }
+        data = json.dumps(meta).encode("utf-8") + b"\n" + entry.body
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temp_path, "wb") as file:
+                file.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            # Unwritable cache directory: fetching still works, just uncached
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            sizes = self._load_sizes()
+            sizes[name] = len(data)
+            self._evict()
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        sizes = self._sizes
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+        by_age = []
+        for name in sizes:
+            try:
+                by_age.append((os.stat(os.path.join(self.directory, name)).st_mtime_ns, name))
+            except OSError:
+                by_age.append((0, name))
+        for _, name in sorted(by_age):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            total -= sizes.pop(name)
+
+    def clear(self) -> None:
+        """Delete every cached entry."""
+        with self._lock:
+            for name in list(self._load_sizes()):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+            self._sizes = {}
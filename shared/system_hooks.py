@@ -1,4 +1,6 @@
-from typing import Optional, TYPE_CHECKING
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Optional, Set, TYPE_CHECKING
 
 from agents import AgentHooks, RunContextWrapper
 
@@ -237,26 +239,97 @@ class MessageFilterHook(AgentHooks):
         filter_duplicates(context)
 
 
+@dataclass
+class _FilterState:
+    """What filter_duplicates already knows about one thread's message list."""
+
+    messages: Optional[list] = None  # the list object that was processed
+    count: int = 0  # messages[:count] are already deduplicated and ordered
+    last: Any = None  # messages[count - 1], to notice lists rewritten in place
+    call_ids: Set[str] = field(default_factory=set)  # function_call ids kept so far
+    output_ids: Set[str] = field(default_factory=set)  # function_call_output ids kept so far
+    pending: Set[str] = field(default_factory=set)  # function_calls still waiting for their output
+    retimed: Set[str] = field(default_factory=set)  # calls whose timestamps were already adjusted
+
+
+# Per thread manager, so each hook call only looks at newly appended messages
+_filter_states: "weakref.WeakKeyDictionary[Any, _FilterState]" = weakref.WeakKeyDictionary()
+
+
 def filter_duplicates(context) -> None:
-    """Filter duplicates and reorder messages."""
+    """
+    Filter duplicates and reorder messages.
+
+    Only messages appended since the previous call are processed. The whole
+    list is processed again when it was replaced or rewritten, or when a new
+    message pairs with a function call or output already in the processed part.
+    """
 
     thread_manager = context.context.thread_manager
 
     # Access the message store directly
     messages = thread_manager._store.messages
 
+    try:
+        state = _filter_states.get(thread_manager)
+    except TypeError:
+        # Not weak-referenceable: no state to keep, process everything
+        state = None
+    if (
+        state is None
+        or state.messages is not messages
+        or state.count > len(messages)
+        or (state.count and messages[state.count - 1] is not state.last)
+    ):
+        state = _FilterState(messages=messages, retimed=state.retimed if state else set())
+
+    if state.count == len(messages):
+        return
+
+    # A new output for a call that was kept standalone, or a new call for an
+    # output already kept, moves a message inside the processed part
+    start = state.count
+    for message in messages[start:]:
+        call_id = message.get("call_id")
+        msg_type = message.get("type")
+        if (msg_type == "function_call_output" and call_id in state.pending) or (
+            msg_type == "function_call" and call_id in state.output_ids and call_id not in state.call_ids
+        ):
+            state = _FilterState(messages=messages, retimed=state.retimed)
+            start = 0
+            break
+
+    new_messages = messages[start:]
+    filtered = _filter_messages(new_messages, state)
+
+    # Update the message store in place when anything was dropped or moved
+    if len(filtered) != len(new_messages) or any(
+        orig is not new for orig, new in zip(new_messages, filtered)
+    ):
+        messages[start:] = filtered
+
+    state.count = len(messages)
+    state.last = messages[-1] if messages else None
+    try:
+        _filter_states[thread_manager] = state
+    except TypeError:
+        pass
+
+
+def _filter_messages(messages: list, state: _FilterState) -> list:
+    """Deduplicate and reorder newly appended messages, updating `state`."""
+
     # Step 1: Filter duplicates based on call_id for function calls
-    call_ids_seen = set()
     deduplicated_messages = []
 
     for message in messages:
         call_id = message.get("call_id")
 
         if call_id and message.get("type") == "function_call":
-            if call_id in call_ids_seen:
+            if call_id in state.call_ids:
                 continue
             else:
-                call_ids_seen.add(call_id)
+                state.call_ids.add(call_id)
                 deduplicated_messages.append(message)
         else:
             # Messages without call_id or non-function calls are always included
@@ -278,8 +351,6 @@ def filter_duplicates(context) -> None:
             function_outputs[call_id] = message
 
     # Build the reordered list: keep function_call_outputs in place, move function_calls to come before their outputs
-    processed_call_ids = set()
-
     for message in deduplicated_messages:
         msg_type = message.get("type")
         call_id = message.get("call_id")
@@ -288,19 +359,20 @@ def filter_duplicates(context) -> None:
         if (
             msg_type == "function_call_output"
             and call_id
-            and call_id not in processed_call_ids
+            and call_id not in state.output_ids
         ):
-            processed_call_ids.add(call_id)
+            state.output_ids.add(call_id)
 
             if call_id in function_calls:
                 function_call_msg = function_calls[call_id]
-                # Adjust timestamps to avoid collisions with same-timestamp reasoning
+                # Adjust timestamps to avoid collisions with same-timestamp reasoning (once per call)
                 output_ts_raw = message.get("timestamp")
-                if isinstance(output_ts_raw, (int, float)):
+                if isinstance(output_ts_raw, (int, float)) and call_id not in state.retimed:
                     try:
                         new_output_ts = float(output_ts_raw) + 2
                         message["timestamp"] = new_output_ts
                         function_call_msg["timestamp"] = new_output_ts - 1
+                        state.retimed.add(call_id)
                     except Exception:
                         pass
                 reordered_messages.append(function_call_msg)
@@ -320,14 +392,12 @@ def filter_duplicates(context) -> None:
             not call_id or call_id not in function_outputs
         ):
             reordered_messages.append(message)
+            if call_id:
+                state.pending.add(call_id)
 
         # Function calls with matching outputs are handled when we process their corresponding outputs
 
-    # Update the message store directly
-    if len(reordered_messages) != len(messages) or any(
-        orig != new for orig, new in zip(messages, reordered_messages)
-    ):
-        thread_manager._store.messages = reordered_messages
+    return reordered_messages
 
 
 # Factory function to create the hook
@@ -447,6 +517,19 @@ class SafeSessionHook(AgentHooks):
         """
         self.session = session
 
+    async def on_start(self, context: RunContextWrapper, agent) -> None:
+        """
+        Expose the session id to tools so per-session state (e.g. the read registry) is keyed by it.
+
+        Args:
+            context: Execution context
+            agent: Agent being started
+        """
+        try:
+            context.context.set("session_id", self.session.session_id)
+        except Exception as e:
+            print(f"Warning: SafeSessionHook failed to publish session id: {e}")
+
     async def on_tool_end(self, context: RunContextWrapper, agent, tool, result: str) -> None:
         """
         Record tool execution to session metrics.
@@ -0,0 +1,154 @@
+import os
+import re
+import time
+
+from tools import Bash, BashOutput, KillBash
+
+
+def _start(session, command):
+    tool = Bash(command=command, run_in_background=True)
+    tool.context.set("session_id", session)
+    out = tool.run()
+    match = re.search(r"Started background job (\w+)", out)
+    assert match, out
+    return match.group(1)
+
+
+def _output(session, **kwargs):
+    tool = BashOutput(**kwargs)
+    tool.context.set("session_id", session)
+    return tool.run()
+
+
+def _kill(session, job_id):
+    tool = KillBash(job_id=job_id)
+    tool.context.set("session_id", session)
+    return tool.run()
+
+
+def test_background_job_returns_immediately_and_can_be_waited_on():
+    session = "test-bg-wait"
+    start = time.monotonic()
+    job_id = _start(session, "echo first; sleep 1; echo second; exit 3")
+    assert time.monotonic() - start < 1
+
+    out = _output(session, job_id=job_id, wait_seconds=10)
+    assert f"Job {job_id}: finished with exit code 3" in out
+    assert "first" in out and "second" in out
+
+    # Output already returned is not repeated
+    out = _output(session, job_id=job_id)
+    assert "(no new output)" in out
+
+
+def test_background_job_incremental_output():
+    session = "test-bg-incremental"
+    job_id = _start(session, "echo one; sleep 2; echo two")
+
+    deadline = time.monotonic() + 5
+    out = ""
+    while "one" not in out and time.monotonic() < deadline:
+        out = _output(session, job_id=job_id)
+        time.sleep(0.1)
+    assert "running" in out
+    assert "one" in out and "two" not in out
+
+    out = _output(session, job_id=job_id, wait_seconds=10)
+    assert "two" in out and "one" not in out
+
+
+def test_background_job_wait_times_out_while_running():
+    session = "test-bg-wait-timeout"
+    job_id = _start(session, "sleep 30")
+    out = _output(session, job_id=job_id, wait_seconds=1)
+    assert "running" in out
+    assert "still running after waiting 1s" in out
+    _kill(session, job_id)
+
+
+def test_kill_bash_stops_job_tree():
+    session = "test-bg-kill"
+    job_id = _start(session, "sleep 300 & sleep 300; echo never")
+    out = _kill(session, job_id)
+    assert f"Job {job_id}: killed" in out
+    assert "never" not in out
+
+    out = _kill(session, job_id)
+    assert "nothing to kill" in out
+
+
+def test_background_jobs_are_scoped_to_session():
+    job_id = _start("test-bg-owner", "echo mine")
+    assert "No background job" in _output("test-bg-other", job_id=job_id)
+    assert "No background job" in _kill("test-bg-other", job_id)
+
+    listing = _output("test-bg-owner")
+    assert job_id in listing and "echo mine" in listing
+    assert _output("test-bg-nobody") == "No background jobs in this session"
+
+
+def test_background_job_starts_in_session_cwd(tmp_path):
+    session = "test-bg-cwd"
+    tool = Bash(command=f"cd {tmp_path}")
+    tool.context.set("session_id", session)
+    tool.run()
+
+    job_id = _start(session, "pwd")
+    out = _output(session, job_id=job_id, wait_seconds=10)
+    assert str(tmp_path) in out
+
+
+def test_finished_background_job_reports_resource_usage():
+    session = "test-bg-usage"
+    job_id = _start(session, "python -c 'x = bytearray(50 * 1024 * 1024); sum(range(2000000))'")
+    out = _output(session, job_id=job_id, wait_seconds=20)
+    assert "finished with exit code 0" in out
+    match = re.search(r"max RSS ([\d.]+) MB", out)
+    assert match, out
+    assert float(match.group(1)) >= 50
+
+
+def test_background_job_env_overlay():
+    session = "test-bg-env"
+    tool = Bash(command='echo "value=$AGENT_JOB_VAR"', run_in_background=True, env={"AGENT_JOB_VAR": "42"})
+    tool.context.set("session_id", session)
+    job_id = re.search(r"Started background job (\w+)", tool.run()).group(1)
+    out = _output(session, job_id=job_id, wait_seconds=10)
+    assert "value=42" in out
+
+
+def test_background_job_runs_under_session_sandbox(monkeypatch):
+    import tools.bash
+
+    session = "test-bg-sandbox"
+    pool = tools.bash._get_shell_pool(session)
+    monkeypatch.setattr(pool, "sandbox_policy", "(version 1)\n(allow default)\n")
+
+    argvs = []
+    real_spawn = tools.bash._spawn
+
+    def recording_spawn(argv, **kwargs):
+        argvs.append(argv)
+        if argv[0] == "/usr/bin/sandbox-exec" and not os.path.exists(argv[0]):
+            argv = argv[3:]
+        return real_spawn(argv, **kwargs)
+
+    monkeypatch.setattr(tools.bash, "_spawn", recording_spawn)
+    job_id = _start(session, "echo sandboxed")
+    assert argvs[-1][:3] == ["/usr/bin/sandbox-exec", "-p", pool.sandbox_policy]
+    assert argvs[-1][3:] == ["/bin/bash", "-c", "echo sandboxed"]
+    assert "sandboxed" in _output(session, job_id=job_id, wait_seconds=10)
+
+
+def test_background_job_inherits_session_exports(tmp_path):
+    session = "test-bg-exports"
+    venv_bin = tmp_path / "venv" / "bin"
+    venv_bin.mkdir(parents=True)
+    tool = Bash(command=f'export AGENT_SESSION_VAR="a b"; export PATH="{venv_bin}:$PATH"; LOCAL_ONLY=1')
+    tool.context.set("session_id", session)
+    assert "Exit code: 0" in tool.run()
+
+    job_id = _start(session, 'echo "var=$AGENT_SESSION_VAR local=$LOCAL_ONLY"; echo "path=$PATH"')
+    out = _output(session, job_id=job_id, wait_seconds=10)
+    assert "var=a b local=" in out
+    assert f"path={venv_bin}:" in out
@@ -1,4 +1,8 @@
+import os
+import re
 import tempfile
+import threading
+import time
 from pathlib import Path
 
 import pytest
@@ -331,3 +335,435 @@ def test_bash_sandbox_denies_write_outside_allowed():
     finally:
         if os.path.exists(target_path):
             os.remove(target_path)
+
+
+def _session_bash(session_id, command, **kwargs):
+    tool = Bash(command=command, **kwargs)
+    tool.context.set("session_id", session_id)
+    return tool.run()
+
+
+def test_bash_persistent_session_keeps_cwd_and_env(tmp_path):
+    session = "test-persistent-state"
+    assert "Exit code: 0" in _session_bash(session, f"cd {tmp_path} && export AGENT_TEST_VAR=kept")
+
+    out = _session_bash(session, 'pwd && echo "var=$AGENT_TEST_VAR"')
+    assert "Exit code: 0" in out
+    assert str(tmp_path) in out
+    assert "var=kept" in out
+
+    # Other sessions get their own shell
+    other = _session_bash("test-persistent-other", 'echo "var=$AGENT_TEST_VAR"')
+    assert "var=kept" not in other
+
+
+def test_bash_persistent_session_survives_syntax_error_and_exit():
+    session = "test-persistent-recovery"
+    out = _session_bash(session, "if then")
+    assert "Exit code: 2" in out
+    assert "syntax error" in out
+
+    out = _session_bash(session, "exit 3")
+    assert "Exit code: 3" in out
+    assert "new shell session" in out
+
+    out = _session_bash(session, "echo recovered")
+    assert "Exit code: 0" in out
+    assert "recovered" in out
+
+
+def test_bash_persistent_session_resets_options_and_traps():
+    session = "test-persistent-options"
+    out = _session_bash(session, "export KEEP=1; set -euo pipefail; trap 'echo trapped' ERR DEBUG; echo ok")
+    assert "Exit code: 0" in out
+
+    # A failing command no longer exits the shell, and no trap fires
+    out = _session_bash(session, 'false | true; grep -q nomatch /dev/null; echo "after-grep $KEEP $UNSET_VAR"')
+    assert "Exit code: 0" in out
+    assert "after-grep 1" in out
+    assert "trapped" not in out
+    assert "new shell session" not in out
+
+
+def test_bash_background_children_do_not_leak_into_later_results():
+    session = "test-persistent-background-child"
+    out = _session_bash(session, "(sleep 1; echo LATE) & echo started")
+    assert "started" in out
+    assert "LATE" not in out
+
+    time.sleep(1.5)
+    out = _session_bash(session, "echo next")
+    assert "Exit code: 0" in out
+    assert "LATE" not in out
+    assert "next" in out
+
+
+def test_bash_persistent_session_restarts_after_timeout(tmp_path):
+    session = "test-persistent-timeout"
+    _session_bash(session, f"cd {tmp_path}")
+    out = _session_bash(session, "sleep 30", timeout=5000)
+    assert "Exit code: 124" in out
+    assert "timed out" in out.lower()
+
+    out = _session_bash(session, "pwd")
+    assert "Exit code: 0" in out
+    assert str(tmp_path) in out
+
+
+def test_bash_persistent_session_recovers_from_deleted_cwd():
+    session = "test-persistent-deleted-cwd"
+    with tempfile.TemporaryDirectory(dir="/tmp") as temp_dir:
+        _session_bash(session, f"cd {temp_dir}")
+    out = _session_bash(session, "pwd")
+    assert "Exit code: 0" in out
+    assert temp_dir not in out
+
+
+def test_bash_parallel_calls_run_concurrently():
+    from concurrent.futures import ThreadPoolExecutor
+
+    session = "test-parallel"
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        results = list(
+            executor.map(
+                lambda i: _session_bash(session, f"sleep 2 && echo done-{i}"), range(3)
+            )
+        )
+    elapsed = time.monotonic() - start
+
+    for i, out in enumerate(results):
+        assert "Exit code: 0" in out
+        assert f"done-{i}" in out
+        assert "busy" not in out.lower()
+    assert elapsed < 5.5
+
+
+def test_bash_parallel_calls_share_session_cwd(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    session = "test-parallel-cwd"
+    _session_bash(session, f"cd {tmp_path}")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(lambda _: _session_bash(session, "sleep 1; pwd"), range(2)))
+    for out in results:
+        assert str(tmp_path) in out
+
+
+def test_bash_per_call_cwd_leaves_session_cwd(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    session = "test-per-call-cwd"
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    _session_bash(session, f"cd {tmp_path}")
+
+    # Parallel calls each run in their own directory, even when they cd elsewhere
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(
+            executor.map(
+                lambda name: _session_bash(session, "sleep 1; pwd; cd /", cwd=name), ["a", "b"]
+            )
+        )
+    assert str(tmp_path / "a") in results[0]
+    assert str(tmp_path / "b") in results[1]
+    assert f"{tmp_path}\n" in _session_bash(session, "pwd") + "\n"
+
+    out = _session_bash(session, "pwd", cwd="missing")
+    assert "Exit code: 1" in out
+    assert "Working directory does not exist" in out
+
+
+def test_bash_overlapping_cd_does_not_move_session(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    session = "test-overlapping-cd"
+    (tmp_path / "a").mkdir()
+    _session_bash(session, f"cd {tmp_path}")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(lambda command: _session_bash(session, command), ["cd a; sleep 1", "sleep 1"]))
+    assert f"{tmp_path}\n" in _session_bash(session, "pwd") + "\n"
+
+    # A sequential cd still moves the session
+    _session_bash(session, "cd a")
+    assert str(tmp_path / "a") in _session_bash(session, "pwd")
+
+
+def test_shell_pool_queues_when_full():
+    from tools.bash import _ShellPool
+
+    pool = _ShellPool(max_shells=1)
+    try:
+        held = pool.acquire(5)
+        assert held is not None
+
+        # No free shell within the timeout: reported as busy instead of running
+        exit_code, _, status, shell, _ = pool.run("echo queued", 0.2)
+        assert status == "busy" and shell is None
+
+        # Once the shell is released, queued work proceeds
+        pool.release(held)
+        exit_code, output, status, _, _ = pool.run("echo queued", 5)
+        assert status == "ok" and exit_code == 0
+        assert "queued" in output
+    finally:
+        pool.close()
+
+
+def test_shell_pool_counts_queueing_against_timeout():
+    from tools.bash import _ShellPool
+
+    pool = _ShellPool(max_shells=1)
+    try:
+        blocker = threading.Thread(target=pool.run, args=("sleep 1.5", 10))
+        blocker.start()
+        time.sleep(0.2)
+
+        started = time.monotonic()
+        exit_code, _, status, _, _ = pool.run("sleep 10", 3)
+        elapsed = time.monotonic() - started
+        blocker.join()
+        assert status == "timeout" and exit_code is None
+        # About 1.3s queued plus the rest of the 3s budget, not 1.3s + 3s
+        assert elapsed < 4
+    finally:
+        pool.close()
+
+
+def test_bash_large_output_keeps_head_and_tail():
+    out = Bash(command="seq 1 200000").run()
+    assert "Exit code: 0" in out
+    lines = out.split("\n")
+    assert "1" in lines and "2" in lines
+    assert "200000" in lines
+    assert "bytes omitted" in out
+    assert len(out) < 31000
+
+
+def test_output_buffer_is_bounded():
+    from tools.bash import _OutputBuffer
+
+    buffer = _OutputBuffer(head_limit=4, tail_limit=6)
+    for chunk in (b"ab", b"cdef", b"ghij", b"klmnopqrstuvwxyz"):
+        buffer.write(chunk)
+    assert buffer.total == 26
+    assert buffer.dropped == 16
+    value = buffer.getvalue()
+    assert value.startswith("abcd")
+    assert value.endswith("uvwxyz")
+    assert "16 bytes omitted" in value
+
+    small = _OutputBuffer(head_limit=4, tail_limit=6)
+    small.write(b"hello")
+    assert small.getvalue() == "hello"
+    assert small.dropped == 0
+
+
+def test_bash_reports_resource_usage():
+    session = "test-resources"
+    out = _session_bash(session, "python -c 'sum(i * i for i in range(3000000))'")
+    assert "Exit code: 0" in out
+    match = re.search(r"Resources: wall ([\d.]+)s, cpu ([\d.]+)s", out)
+    assert match, out
+    assert float(match.group(2)) > 0
+
+    # Usage is also recorded in the agent context
+    tool = Bash(command="true")
+    tool.context.set("session_id", session)
+    tool.run()
+    history = tool.context.get("bash_command_usage")
+    assert history[-1]["command"] == "true"
+    assert history[-1]["exit_code"] == 0
+    assert history[-1]["wall_seconds"] >= 0
+
+
+def test_bash_exit_reports_non_negative_usage():
+    from tools.bash import _ShellSession
+
+    out = _session_bash("test-resources-exit", "python -c 'sum(i * i for i in range(300000))'; exit 4")
+    assert "Exit code: 4" in out
+    assert re.search(r"Resources: wall [\d.]+s, cpu [\d.]+s \(user [\d.]+s, sys [\d.]+s\)", out), out
+
+    shell = _ShellSession()
+    try:
+        # Earlier commands reported more CPU through `times` than wait4 will for the whole shell
+        shell._cpu_times = (1000.0, 1000.0)
+        exit_code, _, status, usage = shell.run("exit 5", 5)
+        assert (exit_code, status) == (5, "exited")
+        assert usage.user_seconds == 0.0 and usage.system_seconds == 0.0
+        assert "-" not in usage.describe()
+    finally:
+        shell.close()
+
+
+def test_bash_timeout_terminates_process_group(tmp_path):
+    session = "test-timeout-group"
+    pid_file = tmp_path / "child.pid"
+    out = _session_bash(
+        session, f"sleep 300 & echo $! > {pid_file}; wait", timeout=5000
+    )
+    assert "Exit code: 124" in out
+    assert "process group was terminated" in out
+
+    child_pid = int(pid_file.read_text())
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        try:
+            os.kill(child_pid, 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.1)
+    else:
+        pytest.fail("background child survived the timeout")
+
+
+def test_bash_timeout_kills_children_ignoring_sigterm(tmp_path):
+    session = "test-timeout-sigkill"
+    pid_file = tmp_path / "child.pid"
+    out = _session_bash(
+        session,
+        f"(trap '' TERM; sleep 300) & echo $! > {pid_file}; wait",
+        timeout=5000,
+    )
+    assert "Exit code: 124" in out
+
+    child_pid = int(pid_file.read_text())
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        try:
+            os.kill(child_pid, 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.1)
+    else:
+        pytest.fail("child ignoring SIGTERM survived the timeout")
+
+
+def test_bash_env_overlay_applies_to_single_command(tmp_path):
+    session = "test-env-overlay"
+    out = _session_bash(
+        session,
+        f'cd {tmp_path} && echo "in=$AGENT_OVERLAY" && bash -c \'echo "child=$AGENT_OVERLAY"\'',
+        env={"AGENT_OVERLAY": "it's set"},
+    )
+    assert "in=it's set" in out
+    assert "child=it's set" in out
+
+    # The overlay does not leak into later commands, but the cd persists
+    out = _session_bash(session, 'echo "after=$AGENT_OVERLAY" && pwd')
+    assert "after=\n" in out
+    assert str(tmp_path) in out
+
+
+def test_bash_env_overlay_rejects_invalid_names():
+    out = Bash(command="true", env={"BAD-NAME": "x"}).run()
+    assert "Exit code: 1" in out
+    assert "BAD-NAME" in out
+
+
+def test_bash_session_environment_is_computed_once(monkeypatch):
+    from tools.bash import _get_shell_pool
+
+    pool = _get_shell_pool("test-env-once")
+    monkeypatch.setenv("AGENT_LATE_VAR", "late")
+    assert "AGENT_LATE_VAR" not in pool.base_env
+    assert pool.environment() is pool.base_env
+    assert pool.environment({"A": "1"})["A"] == "1"
+    assert "A" not in pool.base_env
+
+
+def test_spawn_close_fds_is_configurable(monkeypatch):
+    import subprocess
+
+    import tools.bash
+
+    calls = []
+    real_popen = subprocess.Popen
+
+    def recording_popen(*args, **kwargs):
+        calls.append(kwargs)
+        return real_popen(*args, **kwargs)
+
+    monkeypatch.setattr(tools.bash.subprocess, "Popen", recording_popen)
+    for close_fds in (True, False):
+        monkeypatch.setattr(tools.bash, "_CLOSE_FDS", close_fds)
+        process = tools.bash._spawn(["/bin/echo", "spawned"], cwd=os.getcwd(), env=dict(os.environ))
+        assert process.stdout.read() == b"spawned\n"
+        process.wait()
+        process.stdout.close()
+        assert calls[-1]["close_fds"] is close_fds
+        assert "preexec_fn" not in calls[-1]
+
+
+@pytest.fixture
+def command_cache(monkeypatch):
+    from tools.bash import _command_cache
+
+    monkeypatch.setattr(_command_cache, "enabled", True)
+    _command_cache.invalidate()
+    yield _command_cache
+    _command_cache.invalidate()
+
+
+def test_command_cache_allowlist(command_cache):
+    assert command_cache.cacheable("git status")
+    assert command_cache.cacheable("git status --porcelain")
+    assert command_cache.cacheable("ls -la")
+    assert not command_cache.cacheable("git statusx")
+    assert not command_cache.cacheable("git commit -m x")
+    assert not command_cache.cacheable("ls > out.txt")
+    assert not command_cache.cacheable("git status && rm -rf build")
+    assert not command_cache.cacheable("ls $HOME")
+    assert not command_cache.cacheable("git diff --output=patch.txt")
+
+
+def test_command_cache_hits_and_invalidates(command_cache, tmp_path):
+    session = "test-command-cache"
+    _session_bash(session, f"cd {tmp_path}")
+    (tmp_path / "a.txt").write_text("a")
+
+    first = _session_bash(session, "ls")
+    assert "a.txt" in first and "cached" not in first
+
+    second = _session_bash(session, "ls")
+    assert "a.txt" in second and "cached result" in second
+
+    # Any other command may have side effects and drops the cache
+    _session_bash(session, "touch b.txt")
+    third = _session_bash(session, "ls")
+    assert "b.txt" in third and "cached" not in third
+
+    # Changes made outside the agent are caught through the directory mtime
+    (tmp_path / "c.txt").write_text("c")
+    fourth = _session_bash(session, "ls")
+    assert "c.txt" in fourth and "cached" not in fourth
+
+
+def test_command_cache_invalidated_by_file_tools(command_cache, tmp_path):
+    from tools import Read, Write
+
+    session = "test-command-cache-write"
+    target = tmp_path / "note.txt"
+    target.write_text("one\n")
+    _session_bash(session, f"cd {tmp_path}")
+    _session_bash(session, "ls -l")
+    assert "cached" in _session_bash(session, "ls -l")
+
+    read_tool = Read(file_path=str(target))
+    read_tool.context.set("session_id", session)
+    read_tool.run()
+    write_tool = Write(file_path=str(target), content="two two\n")
+    write_tool.context.set("session_id", session)
+    assert "Successfully" in write_tool.run()
+
+    assert "cached" not in _session_bash(session, "ls -l")
+
+
+def test_command_cache_disabled_by_default():
+    from tools.bash import _command_cache
+
+    if _command_cache.enabled:
+        pytest.skip("BASH_COMMAND_CACHE is enabled in this environment")
+    session = "test-command-cache-off"
+    _session_bash(session, "pwd")
+    assert "cached" not in _session_bash(session, "pwd")
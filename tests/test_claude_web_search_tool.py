@@ -0,0 +1,182 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+import tools.claude_web_search
+from tools import ClaudeWebSearch
+
+
+def _answer(text):
+    return SimpleNamespace(output=[SimpleNamespace(content=[SimpleNamespace(text=text)])])
+
+
+@pytest.fixture
+def fake_model(tmp_path, monkeypatch):
+    """Replace the model call with a counting fake and the cache with a temporary one."""
+    calls = []
+
+    async def fake_responses(**kwargs):
+        calls.append(kwargs)
+        if getattr(fake_responses, "delay", 0):
+            await asyncio.sleep(fake_responses.delay)
+        if getattr(fake_responses, "error", None):
+            raise fake_responses.error
+        return _answer(f"answer {len(calls)}")
+
+    monkeypatch.setattr(tools.claude_web_search, "aresponses", fake_responses)
+    cache = tools.claude_web_search._SearchCache(str(tmp_path / "search"), ttl_seconds=3600)
+    monkeypatch.setattr(tools.claude_web_search, "_search_cache", cache)
+    fake_responses.calls = calls
+    fake_responses.cache = cache
+    return fake_responses
+
+
+async def test_web_search_returns_model_answer(fake_model):
+    out = await ClaudeWebSearch(query="FastAPI integration", links=["https://a.test/1", "https://a.test/2", "https://a.test/3", "https://a.test/4"]).run()
+    assert out == "Web search results for: 'FastAPI integration'\n\nanswer 1"
+    prompt = fake_model.calls[0]["input"][1]["content"]
+    assert "https://a.test/3" in prompt and "https://a.test/4" not in prompt
+
+
+async def test_web_search_reuses_cached_results_for_equivalent_queries(fake_model):
+    await ClaudeWebSearch(query="How are files uploaded in OpenAI API?", links=["https://Docs.test/files/"]).run()
+    out = await ClaudeWebSearch(query="  how are files   uploaded in openai api", links=["https://docs.test/files"]).run()
+    assert len(fake_model.calls) == 1
+    assert out.startswith("Web search results for: '  how are files   uploaded in openai api' (cached result from 1 min ago)")
+    assert out.endswith("answer 1")
+
+    # Different links are a different search
+    await ClaudeWebSearch(query="How are files uploaded in OpenAI API?", links=["https://docs.test/other"]).run()
+    assert len(fake_model.calls) == 2
+
+
+async def test_web_search_cache_expires(fake_model, monkeypatch):
+    await ClaudeWebSearch(query="dulwich walker").run()
+    real_time = time.time
+    monkeypatch.setattr(tools.claude_web_search.time, "time", lambda: real_time() + 7200)
+    assert (await ClaudeWebSearch(query="dulwich walker").run()).endswith("answer 2")
+    assert len(fake_model.calls) == 2
+
+
+async def test_web_search_errors_are_not_cached(fake_model):
+    fake_model.error = RuntimeError("rate limited")
+    assert (await ClaudeWebSearch(query="q").run()) == "Error performing web search: rate limited"
+    fake_model.error = None
+    assert (await ClaudeWebSearch(query="q").run()).endswith("answer 2")
+
+
+async def test_concurrent_identical_searches_share_one_call(fake_model):
+    fake_model.delay = 0.3
+    results = await asyncio.gather(*(ClaudeWebSearch(query="Same question?").run() for _ in range(4)))
+    assert len(fake_model.calls) == 1
+    assert all(result.endswith("answer 1") for result in results)
+
+
+def test_identical_searches_are_shared_across_threads(fake_model):
+    fake_model.delay = 0.3
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(asyncio.run(ClaudeWebSearch(query="Same question?").run())))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(fake_model.calls) == 1
+    assert len(results) == 3
+    assert all(result.endswith("answer 1") for result in results)
+
+
+class _MockAnthropic(BaseHTTPRequestHandler):
+    """Minimal stand-in for the Anthropic messages endpoint that answers slowly."""
+
+    def do_POST(self):
+        self.server.bodies.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+        time.sleep(0.5)
+        body = json.dumps(
+            {
+                "id": "msg_test",
+                "type": "message",
+                "role": "assistant",
+                "model": "claude-sonnet-4-20250514",
+                "content": [{"type": "text", "text": "mock search answer"}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": {"input_tokens": 10, "output_tokens": 5},
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+async def test_web_search_does_not_block_the_event_loop(tmp_path, monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MockAnthropic)
+    server.bodies = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    monkeypatch.setenv("ANTHROPIC_API_BASE", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(
+        tools.claude_web_search,
+        "_search_cache",
+        tools.claude_web_search._SearchCache(str(tmp_path / "search"), ttl_seconds=3600),
+    )
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.05)
+            ticks += 1
+
+    ticking = asyncio.create_task(ticker())
+    try:
+        out = await ClaudeWebSearch(query="async search").run()
+    finally:
+        ticking.cancel()
+        server.shutdown()
+        server.server_close()
+
+    assert out == "Web search results for: 'async search'\n\nmock search answer"
+    assert "async search" in json.dumps(server.bodies[0])
+    # The loop kept running while the model answered
+    assert ticks >= 5
+
+
+async def test_cancelled_waiter_does_not_break_shared_search(fake_model):
+    fake_model.delay = 0.3
+    owner = asyncio.ensure_future(ClaudeWebSearch(query="shared").run())
+    await asyncio.sleep(0.05)
+    waiters = [asyncio.ensure_future(ClaudeWebSearch(query="shared").run()) for _ in range(2)]
+    await asyncio.sleep(0.05)
+    waiters[0].cancel()
+
+    assert (await owner).endswith("answer 1")
+    assert (await waiters[1]).endswith("answer 1")
+    assert waiters[0].cancelled()
+    assert len(fake_model.calls) == 1
+
+
+async def test_cancelled_search_owner_hands_search_to_waiter(fake_model):
+    fake_model.delay = 0.3
+    owner = asyncio.ensure_future(ClaudeWebSearch(query="shared").run())
+    await asyncio.sleep(0.05)
+    waiter = asyncio.ensure_future(ClaudeWebSearch(query="shared").run())
+    await asyncio.sleep(0.05)
+    owner.cancel()
+
+    assert (await waiter).endswith("answer 2")
+    assert owner.cancelled()
+    assert tools.claude_web_search._in_flight == {}
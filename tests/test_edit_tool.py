@@ -68,7 +68,21 @@ def test_edit_unique_replacement_and_preview(tmp_path: Path):
     )
     out = tool.run()
     assert "Successfully replaced 1 occurrence" in out
-    assert "Preview:" in out
+    assert "Diff:" in out
+    assert "-hello world" in out
+    assert "+hi world" in out
+
+
+def test_edit_diff_is_bounded_to_touched_region(tmp_path: Path):
+    p = tmp_path / "long.txt"
+    p.write_text("".join(f"line {i}\n" for i in range(1, 501)), encoding="utf-8")
+    Read(file_path=str(p)).run()
+    tool = Edit(file_path=str(p), old_string="line 250\n", new_string="LINE 250\n")
+    out = tool.run()
+    assert "@@ -247,7 +247,7 @@" in out
+    assert "-line 250" in out and "+LINE 250" in out
+    assert "line 1\n" not in out
+    assert "line 500" not in out
 
 
 def test_edit_multiple_occurrences_error_with_previews(tmp_path: Path):
@@ -81,3 +95,45 @@ def test_edit_multiple_occurrences_error_with_previews(tmp_path: Path):
     out = tool.run()
     assert "Error: String appears" in out
     assert "First matches:" in out
+
+
+def test_edit_rejects_file_changed_since_read(tmp_path: Path):
+    p = tmp_path / "stale.txt"
+    p.write_text("".join(f"line {i}\n" for i in range(1, 21)), encoding="utf-8")
+    Read(file_path=str(p)).run()
+
+    # Another process changes lines 5 and 12 after the Read
+    changed = p.read_text(encoding="utf-8")
+    changed = changed.replace("line 5\n", "LINE 5\n").replace("line 12\n", "LINE 12\n")
+    p.write_text(changed, encoding="utf-8")
+
+    tool = Edit(file_path=str(p), old_string="line 1\n", new_string="first\n")
+    out = tool.run()
+    assert "modified since it was last read" in out
+    assert "Changed lines in the current file: 5, 12" in out
+    assert p.read_text(encoding="utf-8") == changed
+
+    # Reading again clears the stale state
+    Read(file_path=str(p)).run()
+    assert "Successfully replaced" in tool.run()
+
+
+def test_edit_allows_touched_but_identical_file(tmp_path: Path):
+    import os
+
+    p = tmp_path / "touched.txt"
+    p.write_text("alpha\nbeta\n", encoding="utf-8")
+    Read(file_path=str(p)).run()
+    os.utime(p, ns=(1_000_000_000, 1_000_000_000))
+
+    tool = Edit(file_path=str(p), old_string="beta", new_string="gamma")
+    assert "Successfully replaced" in tool.run()
+
+
+def test_consecutive_edits_do_not_require_reread(tmp_path: Path):
+    p = tmp_path / "twice.txt"
+    p.write_text("one\ntwo\n", encoding="utf-8")
+    Read(file_path=str(p)).run()
+
+    assert "Successfully replaced" in Edit(file_path=str(p), old_string="one", new_string="1").run()
+    assert "Successfully replaced" in Edit(file_path=str(p), old_string="two", new_string="2").run()
@@ -0,0 +1,95 @@
+import os
+from pathlib import Path
+
+from shared.file_registry import (
+    DEFAULT_SESSION,
+    FileFingerprint,
+    FileReadRegistry,
+    session_key,
+)
+from tools import Edit, Read
+
+
+def _fingerprint(path: Path) -> FileFingerprint:
+    data = path.read_bytes()
+    return FileFingerprint.from_stat(os.stat(path), data)
+
+
+def test_registry_is_scoped_per_session():
+    registry = FileReadRegistry()
+    registry.record("s1", "/tmp/a.txt")
+
+    assert registry.has_read("s1", "/tmp/a.txt")
+    assert not registry.has_read("s2", "/tmp/a.txt")
+
+
+def test_registry_evicts_least_recently_used_files():
+    registry = FileReadRegistry(max_files_per_session=2)
+    registry.record("s1", "/a")
+    registry.record("s1", "/b")
+    registry.record("s1", "/a")  # refresh /a so /b becomes the oldest
+    registry.record("s1", "/c")
+
+    assert registry.has_read("s1", "/a")
+    assert not registry.has_read("s1", "/b")
+    assert registry.has_read("s1", "/c")
+
+
+def test_registry_evicts_least_recently_used_sessions():
+    registry = FileReadRegistry(max_sessions=2)
+    registry.record("s1", "/a")
+    registry.record("s2", "/a")
+    registry.record("s3", "/a")
+
+    assert not registry.has_read("s1", "/a")
+    assert registry.has_read("s2", "/a")
+    assert registry.has_read("s3", "/a")
+
+
+def test_registry_forget_session():
+    registry = FileReadRegistry()
+    registry.record("s1", "/a")
+    registry.forget_session("s1")
+
+    assert not registry.has_read("s1", "/a")
+
+
+def test_fingerprint_records_identity_and_hash(tmp_path: Path):
+    p = tmp_path / "f.txt"
+    p.write_text("hello\n", encoding="utf-8")
+    fp = _fingerprint(p)
+    stat = os.stat(p)
+
+    assert fp.size == 6
+    assert fp.inode == stat.st_ino
+    assert fp.mtime_ns == stat.st_mtime_ns
+    assert fp == _fingerprint(p)
+
+    p.write_text("hellO\n", encoding="utf-8")
+    assert _fingerprint(p).digest != fp.digest
+
+
+def test_session_key_uses_context_session_id():
+    tool = Read(file_path="/tmp/nothing")
+    assert session_key(tool.context) == DEFAULT_SESSION
+    assert session_key(None) == DEFAULT_SESSION
+
+    tool.context.set("session_id", "abc")
+    assert session_key(tool.context) == "abc"
+
+
+def test_read_in_one_session_does_not_allow_edit_in_another(tmp_path: Path):
+    p = tmp_path / "scoped.txt"
+    p.write_text("hello world\n", encoding="utf-8")
+
+    read_tool = Read(file_path=str(p))
+    read_tool.context.set("session_id", "session-a")
+    read_tool.run()
+
+    edit_b = Edit(file_path=str(p), old_string="world", new_string="there")
+    edit_b.context.set("session_id", "session-b")
+    assert "must use Read tool" in edit_b.run()
+
+    edit_a = Edit(file_path=str(p), old_string="world", new_string="there")
+    edit_a.context.set("session_id", "session-a")
+    assert "Successfully replaced" in edit_a.run()
@@ -60,3 +60,376 @@ def test_git_tool_error_handling():
             assert "Error opening git repo" in out
     finally:
         os.chdir(original_cwd)
+
+
+def _make_repo(path):
+    from dulwich import porcelain
+
+    repo = porcelain.init(str(path))
+    for name, content in {"a.txt": "alpha\n", "b.txt": "beta\n", "sub/c.txt": "gamma\n"}.items():
+        file_path = path / name
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(content)
+        porcelain.add(repo, [str(file_path)])
+    porcelain.commit(repo, message=b"initial", author=b"T <t@example.com>", committer=b"T <t@example.com>")
+    return repo
+
+
+def _git_in(path, **kwargs):
+    import os
+
+    original_cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        return Git(**kwargs).run()
+    finally:
+        os.chdir(original_cwd)
+
+
+def test_git_status_reports_all_change_kinds(tmp_path):
+    from dulwich import porcelain
+
+    repo = _make_repo(tmp_path)
+    assert _git_in(tmp_path, cmd="status") == "(clean)"
+
+    (tmp_path / "a.txt").write_text("alpha changed\n")
+    (tmp_path / "b.txt").unlink()
+    (tmp_path / "new.txt").write_text("new\n")
+    (tmp_path / "staged.txt").write_text("staged\n")
+    porcelain.add(repo, [str(tmp_path / "staged.txt")])
+
+    lines = _git_in(tmp_path, cmd="status").splitlines()
+    assert "?? new.txt" in lines
+    assert " M a.txt" in lines
+    assert " M b.txt" in lines
+    assert " A staged.txt" in lines
+    assert not any("sub/c.txt" in line for line in lines)
+
+
+def test_git_status_only_hashes_files_whose_stat_changed(tmp_path, monkeypatch):
+    import os
+
+    import dulwich.index
+
+    _make_repo(tmp_path)
+    # Age the worktree files so they are not racily clean against the index
+    for name in ("a.txt", "b.txt", "sub/c.txt"):
+        os.utime(tmp_path / name, ns=(1_000_000_000, 1_000_000_000))
+
+    hashed = []
+    original = dulwich.index.blob_from_path_and_stat
+
+    def counting(fs_path, st, *args, **kwargs):
+        hashed.append(fs_path)
+        return original(fs_path, st, *args, **kwargs)
+
+    monkeypatch.setattr(dulwich.index, "blob_from_path_and_stat", counting)
+
+    # Stat data differs from the index (we changed mtimes), so each file is hashed once
+    assert _git_in(tmp_path, cmd="status") == "(clean)"
+    first = len(hashed)
+    assert first == 3
+
+    # Unchanged files are answered from the stat cache without re-hashing
+    assert _git_in(tmp_path, cmd="status") == "(clean)"
+    assert len(hashed) == first
+
+    # Same size, different content: detected through the changed mtime
+    (tmp_path / "a.txt").write_text("ALPHA\n")
+    assert " M a.txt" in _git_in(tmp_path, cmd="status")
+    assert len(hashed) == first + 1
+
+
+def test_git_repo_handle_is_reused_until_refs_change(tmp_path):
+    from dulwich import porcelain
+
+    from tools.git import _open_repo
+
+    repo = _make_repo(tmp_path)
+    first = _open_repo(str(tmp_path))
+    assert _open_repo(str(tmp_path)) is first
+    # Subdirectories resolve to the same repository
+    assert _open_repo(str(tmp_path / "sub")) is first
+
+    (tmp_path / "d.txt").write_text("delta\n")
+    porcelain.add(repo, [str(tmp_path / "d.txt")])
+    porcelain.commit(repo, message=b"second", author=b"T <t@example.com>", committer=b"T <t@example.com>")
+
+    reopened = _open_repo(str(tmp_path))
+    assert reopened is not first
+    assert _open_repo(str(tmp_path)) is reopened
+    assert "second" in _git_in(tmp_path, cmd="log")
+
+
+def _commit_file(repo, path, name, content, message, timestamp):
+    from dulwich import porcelain
+
+    (path / name).parent.mkdir(parents=True, exist_ok=True)
+    (path / name).write_text(content)
+    porcelain.add(repo, [str(path / name)])
+    porcelain.commit(
+        repo,
+        message=message,
+        author=b"T <t@example.com>",
+        committer=b"T <t@example.com>",
+        author_timestamp=timestamp,
+        commit_timestamp=timestamp,
+        author_timezone=0,
+        commit_timezone=0,
+    )
+
+
+def test_git_log_pages_through_history(tmp_path):
+    repo = _make_repo(tmp_path)
+    for number in range(1, 6):
+        _commit_file(repo, tmp_path, "a.txt", f"v{number}\n", f"change {number}".encode(), 1_700_000_000 + number * 86400)
+
+    first = _git_in(tmp_path, cmd="log", limit=2, oneline=True).splitlines()
+    assert [line.split(" ", 2)[2] for line in first[:2]] == ["change 5", "change 4"]
+    assert first[2] == "(more commits available: use skip=2)"
+
+    second = _git_in(tmp_path, cmd="log", limit=2, skip=2, oneline=True).splitlines()
+    assert [line.split(" ", 2)[2] for line in second[:2]] == ["change 3", "change 2"]
+
+    # The last page has no "more" hint
+    last = _git_in(tmp_path, cmd="log", limit=10, skip=4, oneline=True).splitlines()
+    assert [line.split(" ", 2)[2] for line in last] == ["change 1", "initial"]
+
+
+def test_git_log_since_and_path_filters(tmp_path):
+    repo = _make_repo(tmp_path)
+    _commit_file(repo, tmp_path, "sub/c.txt", "gamma 2\n", b"touch sub", 1_700_000_000)
+    _commit_file(repo, tmp_path, "a.txt", "alpha 2\n", b"touch a", 1_800_000_000)
+
+    out = _git_in(tmp_path, cmd="log", oneline=True, paths=["sub"])
+    subjects = [line.split(" ", 2)[2] for line in out.splitlines()]
+    assert subjects == ["touch sub", "initial"]
+
+    # Paths are resolved relative to the working directory
+    assert _git_in(tmp_path / "sub", cmd="log", oneline=True, paths=["c.txt"]) == out
+
+    out = _git_in(tmp_path, cmd="log", oneline=True, since="2025-01-01")
+    assert out.splitlines()[0].split(" ", 1)[1] == "2027-01-15 touch a"
+    assert "touch sub" not in out
+
+    assert "Unrecognized since value" in _git_in(tmp_path, cmd="log", since="last tuesday")
+
+
+def test_git_log_stops_walking_when_page_is_full(tmp_path, monkeypatch):
+    from dulwich.walk import Walker
+
+    repo = _make_repo(tmp_path)
+    for number in range(1, 6):
+        _commit_file(repo, tmp_path, "a.txt", f"v{number}\n", f"change {number}".encode(), 1_700_000_000 + number)
+
+    yielded = []
+    original = Walker.__iter__
+
+    def counting(self):
+        for entry in original(self):
+            yielded.append(entry)
+            yield entry
+
+    monkeypatch.setattr(Walker, "__iter__", counting)
+    _git_in(tmp_path, cmd="log", limit=1, skip=1)
+    assert len(yielded) <= 3
+
+
+def test_git_diff_worktree_against_head(tmp_path):
+    from dulwich import porcelain
+
+    repo = _make_repo(tmp_path)
+    assert _git_in(tmp_path, cmd="diff") == ""
+
+    (tmp_path / "a.txt").write_text("alpha\nmore\n")
+    (tmp_path / "b.txt").unlink()
+    (tmp_path / "staged.txt").write_text("staged\n")
+    porcelain.add(repo, [str(tmp_path / "staged.txt")])
+    (tmp_path / "untracked.txt").write_text("ignored by diff\n")
+
+    out = _git_in(tmp_path, cmd="diff")
+    assert "diff --git a/a.txt b/a.txt" in out
+    assert "+more" in out
+    assert "deleted file" in out and "-beta" in out
+    assert "new file" in out and "+staged" in out
+    assert "untracked" not in out
+
+    assert _git_in(tmp_path, cmd="diff", name_only=True).splitlines() == ["a.txt", "b.txt", "staged.txt"]
+    assert _git_in(tmp_path, cmd="diff", stat=True).splitlines() == [
+        " a.txt | +1 -0",
+        " b.txt | +0 -1",
+        " staged.txt | +1 -0",
+        " 3 files changed, 2 insertions(+), 1 deletions(-)",
+    ]
+
+    # Path filters, resolved relative to the working directory
+    (tmp_path / "sub" / "c.txt").write_text("gamma\ndelta\n")
+    assert _git_in(tmp_path, cmd="diff", name_only=True, paths=["sub"]) == "sub/c.txt"
+    assert _git_in(tmp_path / "sub", cmd="diff", name_only=True, paths=["c.txt"]) == "sub/c.txt"
+
+    # Against an older revision
+    _commit_file(repo, tmp_path, "a.txt", "alpha\nmore\n", b"second", 1_700_000_000)
+    assert "a.txt" not in _git_in(tmp_path, cmd="diff", name_only=True)
+    assert "a.txt" in _git_in(tmp_path, cmd="diff", name_only=True, ref="HEAD~1")
+
+
+def test_git_diff_skips_binary_and_huge_files(tmp_path, monkeypatch):
+    import tools.git
+
+    repo = _make_repo(tmp_path)
+    _commit_file(repo, tmp_path, "image.bin", "\0\1\2", b"binary", 1_700_000_000)
+    (tmp_path / "image.bin").write_bytes(b"\0\3\4")
+    monkeypatch.setattr(tools.git, "_MAX_DIFF_BLOB_BYTES", 100)
+    (tmp_path / "a.txt").write_text("x\n" * 100)
+
+    out = _git_in(tmp_path, cmd="diff")
+    assert "Binary files a/image.bin and b/image.bin differ" in out
+    assert "(skipped, larger than 100 bytes)" in out
+    assert "+x" not in out
+
+    stat = _git_in(tmp_path, cmd="diff", stat=True)
+    assert " image.bin | binary" in stat
+
+
+def test_git_diff_caps_hunks_and_lines(tmp_path):
+    repo = _make_repo(tmp_path)
+    original = "".join(f"line {n}\n" for n in range(200))
+    _commit_file(repo, tmp_path, "long.txt", original, b"long", 1_700_000_000)
+    changed = "".join(f"line {n}{' changed' if n % 20 == 0 else ''}\n" for n in range(200))
+    (tmp_path / "long.txt").write_text(changed)
+
+    out = _git_in(tmp_path, cmd="diff", max_hunks=3)
+    assert out.count("@@ -") == 3
+    assert "(7 more hunks not shown)" in out
+
+    (tmp_path / "a.txt").write_text("alpha 2\n")
+    (tmp_path / "b.txt").write_text("beta 2\n")
+    out = _git_in(tmp_path, cmd="diff", max_lines=4).splitlines()
+    assert out[0] == "diff --git a/a.txt b/a.txt"
+    assert out[-1].startswith("(truncated: 2 more changed files not shown")
+
+
+def test_git_diff_counts_distant_edits_in_large_file(tmp_path):
+    repo = _make_repo(tmp_path)
+    original = ["def f():", "    return 1", ""] * 1667
+    _commit_file(repo, tmp_path, "big.py", "\n".join(original) + "\n", b"big", 1_700_000_000)
+    changed = list(original)
+    changed[2] = "# changed 3"
+    changed[4989] = "# changed 4990"
+    (tmp_path / "big.py").write_text("\n".join(changed) + "\n")
+
+    assert _git_in(tmp_path, cmd="diff", stat=True).splitlines() == [
+        " big.py | +2 -2",
+        " 1 files changed, 2 insertions(+), 2 deletions(-)",
+    ]
+    out = _git_in(tmp_path, cmd="diff").splitlines()
+    assert [line for line in out if line.startswith("@@ ")] == [
+        "@@ -1,6 +1,6 @@",
+        "@@ -4987,7 +4987,7 @@",
+    ]
+    assert [line for line in out if line[:1] in "+-" and line[:3] not in ("---", "+++")] == [
+        "-",
+        "+# changed 3",
+        "-def f():",
+        "+# changed 4990",
+    ]
+
+
+def test_git_file_history_uses_incremental_commit_graph(tmp_path, monkeypatch):
+    import dulwich.diff_tree
+
+    import tools.git
+
+    repo = _make_repo(tmp_path)
+    _commit_file(repo, tmp_path, "a.txt", "alpha 2\n", b"edit a", 1_700_000_000)
+    _commit_file(repo, tmp_path, "sub/d.txt", "delta\n", b"add d", 1_700_000_100)
+
+    diffed = []
+    original = dulwich.diff_tree.tree_changes
+
+    def counting(*args, **kwargs):
+        diffed.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(dulwich.diff_tree, "tree_changes", counting)
+
+    out = _git_in(tmp_path, cmd="file_history", paths=["a.txt"]).splitlines()
+    assert [line.split(": ", 1)[1] for line in out] == ["edit a", "initial"]
+    assert len(diffed) == 3
+    assert (tmp_path / ".git" / tools.git._HISTORY_CACHE_FILE).exists()
+
+    # Directories list the files that changed
+    out = _git_in(tmp_path, cmd="file_history", paths=["sub"], limit=1).splitlines()
+    assert out[0].endswith("add d [sub/d.txt]")
+    assert out[1] == "(more commits available: use skip=1)"
+    assert len(diffed) == 3
+
+    # Only the new commit is examined, even after the in-memory graph is dropped
+    _commit_file(repo, tmp_path, "a.txt", "alpha 3\n", b"edit a again", 1_700_000_200)
+    tools.git._commit_graphs.clear()
+    out = _git_in(tmp_path, cmd="file_history", paths=["a.txt"], skip=1).splitlines()
+    assert [line.split(": ", 1)[1] for line in out] == ["edit a", "initial"]
+    assert len(diffed) == 4
+
+    assert "requires paths" in _git_in(tmp_path, cmd="file_history")
+
+
+def test_git_blame_attributes_lines_to_commits(tmp_path):
+    repo = _make_repo(tmp_path)
+    _commit_file(repo, tmp_path, "f.txt", "one\ntwo\nthree\n", b"create", 1_700_000_000)
+    _commit_file(repo, tmp_path, "a.txt", "unrelated\n", b"other", 1_700_000_050)
+    _commit_file(repo, tmp_path, "f.txt", "zero\none\nTWO\nthree\n", b"rework", 1_700_000_100)
+    _commit_file(repo, tmp_path, "f.txt", "zero\none\nTWO\nthree\nfour\n", b"append", 1_700_000_200)
+
+    subjects = {
+        line.split(" ", 1)[0]: line.split(": ", 1)[1]
+        for line in _git_in(tmp_path, cmd="file_history", paths=["f.txt"]).splitlines()
+    }
+    out = _git_in(tmp_path, cmd="blame", paths=["f.txt"]).splitlines()
+    assert [subjects[line.split(" ", 1)[0]] for line in out] == [
+        "rework",
+        "create",
+        "rework",
+        "create",
+        "append",
+    ]
+    assert out[2].endswith(" 3) TWO")
+
+    out = _git_in(tmp_path, cmd="blame", paths=["f.txt"], start_line=2, end_line=3).splitlines()
+    assert [line.rsplit(") ", 1)[1] for line in out] == ["one", "TWO"]
+
+    out = _git_in(tmp_path, cmd="blame", paths=["f.txt"], ref="HEAD~1").splitlines()
+    assert len(out) == 4
+
+    assert "does not exist" in _git_in(tmp_path, cmd="blame", paths=["missing.txt"])
+    assert "exactly one file" in _git_in(tmp_path, cmd="blame", paths=["a.txt", "f.txt"])
+
+
+def test_git_blame_matches_git_on_large_file(tmp_path):
+    # Only unambiguous in-place edits: for moved or repeated lines the two
+    # line diffs may legitimately pick different alignments
+    import shutil
+    import subprocess
+
+    import pytest
+
+    if shutil.which("git") is None:
+        pytest.skip("git executable not available")
+
+    repo = _make_repo(tmp_path)
+    original = [f"line {n}" for n in range(5000)]
+    _commit_file(repo, tmp_path, "big.txt", "\n".join(original) + "\n", b"root", 1_700_000_000)
+    changed = list(original)
+    changed[1] = "line 1 changed"
+    changed[4998] = "line 4998 changed"
+    _commit_file(repo, tmp_path, "big.txt", "\n".join(changed) + "\n", b"edit two lines", 1_700_000_100)
+
+    expected = subprocess.run(
+        ["git", "blame", "-l", "-s", "big.txt"], cwd=tmp_path, capture_output=True, text=True, check=True
+    ).stdout.splitlines()
+    out = _git_in(tmp_path, cmd="blame", paths=["big.txt"]).splitlines()
+
+    assert len(out) == len(expected) == 5000
+    assert [line[:7] for line in out] == [line[:7] for line in expected]
+    edit = expected[1][:7]
+    assert [number for number, line in enumerate(out, 1) if line.startswith(edit)] == [2, 4999]
@@ -678,3 +678,64 @@ def test_multi_edit_file_already_exists_create_mode(tmp_path: Path):
     result = tool.run()
 
     assert "Error: File already exists, cannot create new file" in result
+
+
+def test_multi_edit_returns_compact_diff(tmp_path: Path):
+    """Test that the result contains a unified diff of only the touched lines"""
+    test_file = tmp_path / "diff.py"
+    test_file.write_text("".join(f"value_{i} = {i}\n" for i in range(200)))
+
+    Read(file_path=str(test_file)).run()
+
+    edits = [
+        EditOperation(old_string="value_10 = 10", new_string="value_10 = 100"),
+        EditOperation(old_string="value_150 = 150", new_string="value_150 = 1500"),
+    ]
+    tool = MultiEdit(file_path=str(test_file), edits=edits)
+    result = tool.run()
+
+    assert "Successfully applied 2 edit operations" in result
+    assert "Diff:" in result
+    assert "-value_10 = 10\n+value_10 = 100" in result
+    assert "-value_150 = 150\n+value_150 = 1500" in result
+    assert result.count("@@ ") == 2
+    assert "value_80 = 80" not in result
+
+
+def test_multi_edit_diff_of_distant_edits_in_large_file(tmp_path: Path):
+    """Test that two edits far apart in a file over 2000 lines diff as two small hunks"""
+    test_file = tmp_path / "large.py"
+    test_file.write_text("".join(f"value_{i} = {i}\n" for i in range(5000)))
+
+    Read(file_path=str(test_file)).run()
+
+    edits = [
+        EditOperation(old_string="value_2 = 2\n", new_string="value_2 = 20\n"),
+        EditOperation(old_string="value_4998 = 4998", new_string="value_4998 = 49980"),
+    ]
+    result = MultiEdit(file_path=str(test_file), edits=edits).run()
+
+    diff_lines = result.split("Diff:\n", 1)[1].splitlines()
+    assert diff_lines.count("-value_2 = 2") == 1
+    assert diff_lines.count("+value_4998 = 49980") == 1
+    assert [line for line in diff_lines if line.startswith("@@ ")] == [
+        "@@ -1,6 +1,6 @@",
+        "@@ -4996,5 +4996,5 @@",
+    ]
+    assert len([line for line in diff_lines[2:] if line[0] in "+-"]) == 4
+
+
+def test_multi_edit_rejects_file_changed_since_read(tmp_path: Path):
+    """Test that edits are refused when the file changed on disk after the Read"""
+    test_file = tmp_path / "stale.py"
+    test_file.write_text("a = 1\nb = 2\nc = 3\n")
+
+    Read(file_path=str(test_file)).run()
+    test_file.write_text("a = 1\nb = 20\nc = 3\n")
+
+    edits = [EditOperation(old_string="a = 1", new_string="a = 10")]
+    result = MultiEdit(file_path=str(test_file), edits=edits).run()
+
+    assert "modified since it was last read" in result
+    assert "Changed lines in the current file: 2" in result
+    assert test_file.read_text() == "a = 1\nb = 20\nc = 3\n"
@@ -1,4 +1,5 @@
 import json
+import os
 from pathlib import Path
 
 from tools import NotebookEdit
@@ -535,3 +536,173 @@ print(process_data(sample_data))'''
         and "d{2}" in source_content
     )
     assert "json.dumps(result, indent=2)" in source_content
+
+
+def test_notebook_edit_batch_edits(tmp_path: Path):
+    """Test applying several edits with one load and save"""
+    notebook_file = tmp_path / "test.ipynb"
+    create_sample_notebook(str(notebook_file))
+
+    tool = NotebookEdit(
+        notebook_path=str(notebook_file),
+        edits=[
+            {"cell_id": "cell-1", "new_source": "# New Title"},
+            {"cell_id": "cell-2", "new_source": "y = 2", "cell_type": "code", "edit_mode": "insert"},
+            {"cell_id": "cell-2", "edit_mode": "delete"},
+            {"cell_id": "1", "new_source": "z = 3"},
+        ],
+    )
+    result = tool.run()
+
+    assert result.startswith(f"Successfully applied 4 edits to {notebook_file}. Notebook now has 2 cells:")
+    assert "2. inserted new code cell (ID: new-cell-2) at position 2" in result
+    assert "4. replaced content of code cell (ID: new-cell-2) at position 1" in result
+
+    with open(notebook_file, "r", encoding="utf-8") as f:
+        notebook = json.load(f)
+    assert [cell["id"] for cell in notebook["cells"]] == ["cell-1", "new-cell-2"]
+    assert "".join(notebook["cells"][0]["source"]) == "# New Title"
+    assert "".join(notebook["cells"][1]["source"]) == "z = 3"
+
+
+def test_notebook_edit_batch_is_all_or_nothing(tmp_path: Path):
+    """Test that a failing edit leaves the notebook untouched"""
+    notebook_file = tmp_path / "test.ipynb"
+    create_sample_notebook(str(notebook_file))
+    original = notebook_file.read_text(encoding="utf-8")
+
+    tool = NotebookEdit(
+        notebook_path=str(notebook_file),
+        edits=[
+            {"cell_id": "cell-1", "new_source": "# Changed"},
+            {"cell_id": "missing", "edit_mode": "delete"},
+        ],
+    )
+    result = tool.run()
+
+    assert result == "Error in edit 2: Cell with ID 'missing' not found in notebook. No edits were applied."
+    assert notebook_file.read_text(encoding="utf-8") == original
+    assert [p.name for p in tmp_path.iterdir()] == ["test.ipynb"]
+
+
+def test_notebook_edit_batch_rejects_single_cell_fields(tmp_path: Path):
+    """Test that edits cannot be mixed with the single-cell fields"""
+    notebook_file = tmp_path / "test.ipynb"
+    create_sample_notebook(str(notebook_file))
+
+    tool = NotebookEdit(
+        notebook_path=str(notebook_file),
+        cell_id="cell-1",
+        edits=[{"cell_id": "cell-2", "new_source": "x = 2"}],
+    )
+    assert tool.run().startswith("Error: Provide either edits or the single-cell fields")
+
+    tool = NotebookEdit(notebook_path=str(notebook_file), cell_id="cell-1")
+    assert tool.run() == "Error: new_source is required when using edit_mode=replace"
+
+
+def test_notebook_edit_compact_outputs(tmp_path: Path):
+    """Test stripping, truncating and deduplicating outputs"""
+    notebook_file = tmp_path / "test.ipynb"
+    create_sample_notebook(
+        str(notebook_file),
+        [
+            {
+                "cell_type": "code",
+                "id": "train",
+                "metadata": {},
+                "execution_count": 1,
+                "source": ["train()"],
+                "outputs": [
+                    {"name": "stdout", "output_type": "stream", "text": ["epoch 1\n", " 10%\r 50%\r100%\n"]},
+                    {"name": "stdout", "output_type": "stream", "text": ["loss: nan\n"] * 5},
+                    {
+                        "output_type": "display_data",
+                        "metadata": {"image/png": {"width": 400}},
+                        "data": {"image/png": "iVBORw0KGgo" * 100, "text/plain": ["<Figure>"]},
+                    },
+                    {
+                        "output_type": "execute_result",
+                        "execution_count": 1,
+                        "metadata": {},
+                        "data": {"text/html": ["<table>" + "<tr></tr>" * 200], "text/plain": ["row\n" * 200]},
+                    },
+                ],
+            },
+            {"cell_type": "markdown", "id": "notes", "metadata": {}, "source": ["# Notes"]},
+        ],
+    )
+
+    tool = NotebookEdit(
+        notebook_path=str(notebook_file),
+        edit_mode="compact_outputs",
+        strip_mime_types=["image/*"],
+        max_output_chars=100,
+    )
+    result = tool.run()
+
+    assert result.startswith(f"Successfully compacted outputs of 1 cells in {notebook_file}: ")
+    assert "Removed 2.8 KB of outputs: image/png x1, text/html x1" in result
+    assert "Truncated 1 outputs to 100 characters" in result
+    assert "Merged 1 stream outputs and collapsed 6 repeated lines or progress updates" in result
+
+    text = notebook_file.read_text(encoding="utf-8")
+    assert '\n "cells": [' in text  # rewritten with nbformat's one-space indent
+    outputs = json.loads(text)["cells"][0]["outputs"]
+    assert len(outputs) == 3
+    assert "".join(outputs[0]["text"]) == (
+        "epoch 1\n100%\nloss: nan\n... (previous line repeated 4 more times)\n"
+    )
+    assert outputs[1]["data"] == {"text/plain": ["<Figure>"]}
+    assert outputs[1]["metadata"] == {}
+    assert list(outputs[2]["data"]) == ["text/plain"]
+    assert "characters truncated" in "".join(outputs[2]["data"]["text/plain"])
+
+
+def test_notebook_edit_compact_outputs_of_one_cell(tmp_path: Path):
+    """Test compacting a single cell and describing removed rich outputs"""
+    image_output = {"output_type": "display_data", "metadata": {}, "data": {"image/png": "A" * 5000}}
+    cells = [
+        {"cell_type": "code", "id": f"plot-{n}", "metadata": {}, "execution_count": n, "source": ["plot()"], "outputs": [image_output]}
+        for n in range(2)
+    ]
+    notebook_file = tmp_path / "test.ipynb"
+    create_sample_notebook(str(notebook_file), cells)
+
+    result = NotebookEdit(notebook_path=str(notebook_file), cell_id="plot-1", edit_mode="compact_outputs").run()
+    assert result == f"Outputs are already compact; {notebook_file} was left unchanged"
+
+    result = NotebookEdit(
+        notebook_path=str(notebook_file), cell_id="plot-1", edit_mode="compact_outputs", max_output_chars=1000
+    ).run()
+    assert result.startswith("Successfully compacted outputs of 1 cells")
+
+    notebook = json.loads(notebook_file.read_text(encoding="utf-8"))
+    assert notebook["cells"][0]["outputs"] == [image_output]
+    assert notebook["cells"][1]["outputs"][0]["data"] == {"text/plain": ["[image/png output removed (4.9 KB)]"]}
+
+
+def test_notebook_edit_compact_outputs_leaves_compact_notebook_untouched(tmp_path: Path):
+    """Test that compacting an already-compact notebook does not rewrite it"""
+    notebook_file = tmp_path / "test.ipynb"
+    create_sample_notebook(
+        str(notebook_file),
+        [
+            {
+                "cell_type": "code",
+                "id": "cell-1",
+                "metadata": {},
+                "execution_count": 1,
+                "source": ["print(1)"],
+                "outputs": [{"name": "stdout", "output_type": "stream", "text": ["1\n"]}],
+            }
+        ],
+    )
+    before = notebook_file.read_bytes()
+    os.utime(notebook_file, ns=(1_000_000_000, 1_000_000_000))
+
+    result = NotebookEdit(notebook_path=str(notebook_file), edit_mode="compact_outputs").run()
+
+    assert result == f"Outputs are already compact; {notebook_file} was left unchanged"
+    assert notebook_file.read_bytes() == before
+    assert notebook_file.stat().st_mtime_ns == 1_000_000_000
@@ -480,3 +480,137 @@ def test_notebook_read_raw_cell_type(tmp_path: Path):
     assert "Cell 1 (raw)" in result or "Cell 0" in result and "raw" in result
     assert "This is raw text content" in result
     assert "Not rendered as markdown" in result
+
+
+def _numbered_cells(count):
+    return [
+        {
+            "cell_type": "code",
+            "id": f"c{i}",
+            "metadata": {},
+            "execution_count": i,
+            "source": [f"value = {i}\n"],
+            "outputs": [],
+        }
+        for i in range(count)
+    ]
+
+
+def test_notebook_read_paginates_cells(tmp_path: Path):
+    notebook_file = tmp_path / "paged.ipynb"
+    create_sample_notebook(str(notebook_file), _numbered_cells(10))
+
+    result = NotebookRead(notebook_path=str(notebook_file), limit=4).run()
+    assert "Total cells: 10" in result
+    assert "value = 3" in result and "value = 4" not in result
+    assert result.endswith("Showing cells 0-3 of 10.\nUse offset=4 to read more.")
+
+    result = NotebookRead(notebook_path=str(notebook_file), offset=8, limit=4).run()
+    assert "=== Cell 8 (ID: c8, Type: code) ===" in result
+    assert "value = 7" not in result
+    assert result.endswith("Showing cells 8-9 of 10.")
+
+    result = NotebookRead(notebook_path=str(notebook_file), offset=10).run()
+    assert "Error: offset 10 is past the last cell" in result
+
+
+def test_notebook_read_omits_binary_outputs(tmp_path: Path):
+    import base64
+
+    image = base64.b64encode(b"\x89PNG" + bytes(30000)).decode()
+    cells = [
+        {
+            "cell_type": "code",
+            "id": "plot",
+            "metadata": {},
+            "execution_count": 1,
+            "source": ["plt.plot([1, 2])"],
+            "outputs": [
+                {
+                    "output_type": "display_data",
+                    "metadata": {},
+                    "data": {"image/png": image, "text/plain": ["<Figure size 640x480>"]},
+                }
+            ],
+        }
+    ]
+    notebook_file = tmp_path / "plot.ipynb"
+    create_sample_notebook(str(notebook_file), cells)
+
+    result = NotebookRead(notebook_path=str(notebook_file), cell_id="plot").run()
+    assert "<Figure size 640x480>" in result
+    assert "[Also contains: image/png (39.1 KB)]" in result
+    assert image[:100] not in result
+
+
+def test_notebook_read_reuses_cell_index_until_file_changes(tmp_path: Path, monkeypatch):
+    import os
+
+    import tools.notebook_read
+
+    scans = []
+    original = tools.notebook_read._scan_cells
+
+    def counting(data):
+        scans.append(len(data))
+        return original(data)
+
+    monkeypatch.setattr(tools.notebook_read, "_scan_cells", counting)
+    notebook_file = tmp_path / "indexed.ipynb"
+    create_sample_notebook(str(notebook_file), _numbered_cells(5))
+
+    assert "value = 3" in NotebookRead(notebook_path=str(notebook_file), cell_id="c3").run()
+    assert "value = 1" in NotebookRead(notebook_path=str(notebook_file), cell_id="1").run()
+    assert len(scans) == 1
+
+    create_sample_notebook(str(notebook_file), _numbered_cells(6))
+    os.utime(notebook_file, ns=(1, 1))
+    assert "value = 5" in NotebookRead(notebook_path=str(notebook_file), cell_id="c5").run()
+    assert len(scans) == 2
+
+
+def test_notebook_read_cell_id_matches_first_cell_by_id_or_position(tmp_path: Path):
+    cells = _numbered_cells(4)
+    cells[3]["id"] = "1"
+    notebook_file = tmp_path / "ids.ipynb"
+    create_sample_notebook(str(notebook_file), cells)
+
+    # Position 1 comes before the cell whose id is "1"
+    assert "=== Cell 1 (ID: c1" in NotebookRead(notebook_path=str(notebook_file), cell_id="1").run()
+    cells[0]["id"] = "2"
+    create_sample_notebook(str(notebook_file), cells)
+    assert "=== Cell 0 (ID: 2" in NotebookRead(notebook_path=str(notebook_file), cell_id="2").run()
+
+
+def test_notebook_read_reports_output_sizes(tmp_path: Path):
+    """Test listing cell and output sizes without their contents"""
+    cells = [
+        {"cell_type": "markdown", "id": "intro", "metadata": {}, "source": ["# Title"]},
+        {
+            "cell_type": "code",
+            "id": "plot",
+            "metadata": {},
+            "execution_count": 1,
+            "source": ["plot()"],
+            "outputs": [
+                {"name": "stdout", "output_type": "stream", "text": ["x" * 2048]},
+                {"output_type": "display_data", "metadata": {}, "data": {"image/png": "A" * 40000, "text/plain": ["<Figure>"]}},
+            ],
+        },
+    ]
+    notebook_file = tmp_path / "sizes.ipynb"
+    create_sample_notebook(str(notebook_file), cells)
+
+    result = NotebookRead(notebook_path=str(notebook_file), output_sizes=True).run()
+    lines = result.splitlines()
+    assert lines[0] == f"Output sizes: {notebook_file}"
+    assert lines[1].startswith("Total cells: 2 (")
+    assert lines[3].startswith("Cell 0 (ID: intro, Type: markdown): ")
+    assert "outputs" not in lines[3]
+    assert lines[4].endswith("outputs 41.1 KB: stream stdout 2.0 KB, image/png 39.1 KB, text/plain 8 B")
+    assert lines[-1] == "Outputs shown total 41.1 KB."
+    assert "AAAA" not in result and "xxxx" not in result
+
+    single = NotebookRead(notebook_path=str(notebook_file), cell_id="plot", output_sizes=True).run()
+    assert "Cell 1 (ID: plot" in single and "Cell 0" not in single
+    assert "Showing cells 1-1 of 2." in single
@@ -86,3 +86,19 @@ def test_safe_session_hook_coexists_with_system_reminder():
 
     # SystemReminderHook incremented
     assert reminder_hook.tool_call_count == 1
+
+
+def test_safe_session_hook_publishes_session_id():
+    """Test on_start exposes the session id to tools through the shared context"""
+    from agents import RunContextWrapper
+    from agency_swarm.context import MasterContext
+
+    session = SafeSession()
+    hook = SafeSessionHook(session)
+    context = RunContextWrapper(
+        context=MasterContext(thread_manager=None, agents={}, user_context={}, current_agent_name=None)
+    )
+
+    asyncio.run(hook.on_start(context, None))
+
+    assert context.context.get("session_id") == session.session_id
@@ -2,7 +2,7 @@ from typing import Any
 
 import pytest
 
-from shared.system_hooks import create_system_reminder_hook
+from shared.system_hooks import create_system_reminder_hook, filter_duplicates
 
 
 class MockMessageStore:
@@ -116,3 +116,89 @@ async def test_triggers_after_15_tool_calls():
     # 15th should inject
     await hook.on_tool_end(ctx, agent, tool=None, result="ok")
     assert ctx.context.get("pending_system_reminder") is not None
+
+
+class CountingMessage(dict):
+    """Message that counts how often the filter inspects it."""
+
+    reads = 0
+
+    def get(self, key, default=None):
+        CountingMessage.reads += 1
+        return super().get(key, default)
+
+
+def _call(call_id, timestamp=None):
+    message = {"type": "function_call", "call_id": call_id}
+    if timestamp is not None:
+        message["timestamp"] = timestamp
+    return message
+
+
+def _output(call_id, timestamp=None):
+    message = {"type": "function_call_output", "call_id": call_id}
+    if timestamp is not None:
+        message["timestamp"] = timestamp
+    return message
+
+
+def test_filter_duplicates_processes_only_new_messages():
+    ctx = MockRunContextWrapper(MockContext())
+    store = ctx.context.thread_manager._store
+    store.messages.extend(
+        CountingMessage(m)
+        for m in [{"role": "user", "content": "hi"}, _output("a"), _call("a"), _call("a")]
+    )
+
+    filter_duplicates(ctx)
+    assert [(m.get("type"), m.get("call_id")) for m in store.messages] == [
+        (None, None),
+        ("function_call", "a"),
+        ("function_call_output", "a"),
+    ]
+
+    CountingMessage.reads = 0
+    store.messages.extend([_call("a"), _call("b"), _output("b")])
+    filter_duplicates(ctx)
+
+    # Earlier messages were not inspected again
+    assert CountingMessage.reads == 0
+    assert [m.get("call_id") for m in store.messages] == [None, "a", "a", "b", "b"]
+
+
+def test_filter_duplicates_moves_earlier_call_before_late_output():
+    ctx = MockRunContextWrapper(MockContext())
+    store = ctx.context.thread_manager._store
+    store.messages.extend([_call("a", 10.0), {"role": "assistant", "content": "working"}])
+    filter_duplicates(ctx)
+    assert store.messages[0]["call_id"] == "a"
+
+    store.messages.append(_output("a", 20.0))
+    filter_duplicates(ctx)
+    assert [m.get("type") for m in store.messages] == [None, "function_call", "function_call_output"]
+    assert store.messages[1]["timestamp"] == 21.0
+    assert store.messages[2]["timestamp"] == 22.0
+
+
+def test_filter_duplicates_adjusts_timestamps_once():
+    ctx = MockRunContextWrapper(MockContext())
+    store = ctx.context.thread_manager._store
+    store.messages.extend([_call("a", 5.0), _output("a", 5.0)])
+
+    for _ in range(3):
+        filter_duplicates(ctx)
+        store.messages.append({"role": "assistant", "content": "next"})
+
+    assert store.messages[0]["timestamp"] == 6.0
+    assert store.messages[1]["timestamp"] == 7.0
+
+
+def test_filter_duplicates_restarts_when_store_is_replaced():
+    ctx = MockRunContextWrapper(MockContext())
+    store = ctx.context.thread_manager._store
+    store.messages.extend([_call("a"), _output("a")])
+    filter_duplicates(ctx)
+
+    store.messages = [_call("a"), _call("a"), _output("a")]
+    filter_duplicates(ctx)
+    assert [m["type"] for m in store.messages] == ["function_call", "function_call_output"]
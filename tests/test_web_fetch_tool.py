@@ -0,0 +1,284 @@
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import tools.web_fetch
+from shared.http_cache import HttpCache
+from tools import WebFetch
+
+PAGE = b"<html><body><main><h1>Docs</h1><p>Hello from the local server</p></main></body></html>"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serves routes registered on the server; records every request it sees."""
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        status, headers, body = self.server.routes[self.path](self)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.routes = {}
+    httpd.requests = []
+    httpd.base_url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def http_cache(tmp_path, monkeypatch):
+    cache = HttpCache(str(tmp_path / "http"), max_bytes=1024 * 1024)
+    monkeypatch.setattr(tools.web_fetch, "_http_cache", cache)
+    return cache
+
+
+def _etag_route(request):
+    if request.headers.get("If-None-Match") == '"v1"':
+        return 304, {"ETag": '"v1"'}, b""
+    return 200, {"Content-Type": "text/html", "ETag": '"v1"', "Cache-Control": "no-cache"}, PAGE
+
+
+def test_web_fetch_returns_page_text(server, http_cache):
+    server.routes["/page"] = lambda request: (200, {"Content-Type": "text/html"}, PAGE)
+    out = WebFetch(url=server.base_url + "/page").run()
+    assert out.startswith(f"Successfully fetched content from {server.base_url}/page")
+    assert "Hello from the local server" in out
+
+
+def test_web_fetch_revalidates_with_etag(server, http_cache):
+    server.routes["/etag"] = _etag_route
+    url = server.base_url + "/etag"
+
+    first = WebFetch(url=url).run()
+    second = WebFetch(url=url).run()
+    assert second == first
+    assert len(server.requests) == 2
+    assert "If-None-Match" not in server.requests[0][1]
+    assert server.requests[1][1]["If-None-Match"] == '"v1"'
+
+
+def test_web_fetch_serves_fresh_entries_without_a_request(server, http_cache):
+    server.routes["/fresh"] = lambda request: (
+        200,
+        {"Content-Type": "text/html", "Cache-Control": "max-age=600"},
+        PAGE,
+    )
+    url = server.base_url + "/fresh"
+    assert "Hello" in WebFetch(url=url).run()
+    assert "Hello" in WebFetch(url=url).run()
+    assert len(server.requests) == 1
+
+
+def test_web_fetch_does_not_cache_no_store(server, http_cache):
+    server.routes["/private"] = lambda request: (
+        200,
+        {"Content-Type": "text/html", "Cache-Control": "no-store", "ETag": '"x"'},
+        PAGE,
+    )
+    url = server.base_url + "/private"
+    WebFetch(url=url).run()
+    WebFetch(url=url).run()
+    assert len(server.requests) == 2
+    assert "If-None-Match" not in server.requests[1][1]
+
+
+def test_http_cache_evicts_least_recently_used(tmp_path):
+    import os
+
+    cache = HttpCache(str(tmp_path), max_bytes=2500)
+    headers = {"Cache-Control": "max-age=60"}
+    cache.store("http://example.test/a", headers, b"a" * 1000)
+    cache.store("http://example.test/b", headers, b"b" * 1000)
+    # Make "a" the most recently used, then overflow the cap
+    os.utime(cache._path("http://example.test/b"), ns=(1, 1))
+    cache.lookup("http://example.test/a")
+    cache.store("http://example.test/c", headers, b"c" * 1000)
+
+    assert cache.lookup("http://example.test/a") is not None
+    assert cache.lookup("http://example.test/b") is None
+    assert cache.lookup("http://example.test/c").body == b"c" * 1000
+
+
+def test_web_fetch_reports_http_errors(server, http_cache):
+    server.routes["/missing"] = lambda request: (404, {"Content-Type": "text/html"}, b"nope")
+    out = WebFetch(url=server.base_url + "/missing").run()
+    assert out.startswith("Error: HTTP 404 error")
+
+
+DOC_PAGE = b"""<html><head><title>Site</title><script>var tracking = 1;</script>
+<style>body { color: red }</style></head><body>
+<nav><a href="/">Home</a> <a href="/docs">Docs</a></nav>
+<header>Site header</header>
+<main><h1>API   reference</h1><p>Create a file &amp; upload it.<br>Second line</p>
+<pre>client.files.create(
+    file=open("data.jsonl", "rb"),
+)</pre><script>inline()</script></main>
+<footer>Copyright</footer></body></html>"""
+
+
+def test_web_fetch_extracts_main_content(server, http_cache):
+    server.routes["/doc"] = lambda request: (200, {"Content-Type": "text/html; charset=utf-8"}, DOC_PAGE)
+    out = WebFetch(url=server.base_url + "/doc").run()
+    text = out.split("\n\n", 1)[1]
+    assert text.splitlines() == [
+        "API reference",
+        "Create a file & upload it.",
+        "Second line",
+        "client.files.create(",
+        '    file=open("data.jsonl", "rb"),',
+        ")",
+    ]
+    for dropped in ("tracking", "color", "Home", "Site header", "Copyright", "inline"):
+        assert dropped not in out
+
+
+def test_web_fetch_falls_back_to_whole_page_without_main(server, http_cache):
+    page = b"<html><body><div><p>Intro text</p></div><article><p>x</p></article><div>" + b"Body text " * 50 + b"</div></body></html>"
+    server.routes["/plain-layout"] = lambda request: (200, {"Content-Type": "text/html"}, page)
+    out = WebFetch(url=server.base_url + "/plain-layout").run()
+    assert "Intro text" in out and "Body text" in out
+
+
+def test_web_fetch_paginates_long_text(server, http_cache):
+    page = "".join(f"<p>Paragraph {n:04d}</p>" for n in range(500)).encode()
+    server.routes["/long"] = lambda request: (200, {"Content-Type": "text/html"}, page)
+    url = server.base_url + "/long"
+
+    first = WebFetch(url=url, max_chars=1000).run()
+    assert "Paragraph 0000" in first
+    assert "[Showing characters 0-1000 of 7499. Use offset=1000 to read more.]" in first
+
+    second = WebFetch(url=url, offset=1000, max_chars=1000).run()
+    assert "Paragraph 0000" not in second
+    assert "Use offset=2000" in second
+
+    last = WebFetch(url=url, offset=7000).run()
+    assert last.rstrip().endswith("Paragraph 0499")
+    assert "Use offset" not in last
+    assert "past the end" in WebFetch(url=url, offset=8000).run()
+
+
+def test_web_fetch_caps_response_bytes(server, http_cache, monkeypatch):
+    monkeypatch.setattr(tools.web_fetch, "_MAX_RESPONSE_BYTES", 64 * 1024)
+    page = b"<html><body>" + b"<p>filler line</p>" * 20000 + b"<p>THE END</p></body></html>"
+    server.routes["/huge"] = lambda request: (200, {"Content-Type": "text/html", "Cache-Control": "max-age=60"}, page)
+
+    out = WebFetch(url=server.base_url + "/huge").run()
+    assert "filler line" in out
+    assert "THE END" not in out
+    assert f"[Page was cut off after {64 * 1024} bytes.]" in out
+    # Cut-off bodies are not cached
+    WebFetch(url=server.base_url + "/huge").run()
+    assert len(server.requests) == 2
+
+
+def test_web_fetch_returns_plain_text_as_is(server, http_cache):
+    server.routes["/notes.md"] = lambda request: (200, {"Content-Type": "text/markdown"}, b"# Title\n\n<b>not html</b>\n")
+    server.routes["/logo.png"] = lambda request: (200, {"Content-Type": "image/png"}, b"\x89PNG\r\n")
+    assert "# Title\n\n<b>not html</b>" in WebFetch(url=server.base_url + "/notes.md").run()
+    assert "Cannot extract text" in WebFetch(url=server.base_url + "/logo.png").run()
+
+
+def _slow_route(seconds, body=PAGE):
+    import time
+
+    def route(request):
+        server = request.server
+        with server.lock:
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+        time.sleep(seconds)
+        with server.lock:
+            server.active -= 1
+        return 200, {"Content-Type": "text/html"}, body
+
+    return route
+
+
+@pytest.fixture
+def tracked_server(server):
+    server.lock = threading.Lock()
+    server.active = 0
+    server.peak = 0
+    return server
+
+
+def test_web_fetch_fetches_urls_concurrently(tracked_server, http_cache):
+    import time
+
+    server = tracked_server
+    for n in range(4):
+        server.routes[f"/slow{n}"] = _slow_route(0.5)
+    server.routes["/missing"] = lambda request: (404, {"Content-Type": "text/html"}, b"nope")
+    urls = [server.base_url + f"/slow{n}" for n in range(4)] + [server.base_url + "/missing", "ftp://x"]
+
+    tool = WebFetch(urls=urls)
+    started = time.monotonic()
+    out = tool.run()
+    assert time.monotonic() - started < 1.5
+    assert out.startswith("Fetched 4 of 6 URLs:")
+    assert f"=== [1/6] {server.base_url}/slow0 ===\nSuccessfully fetched content" in out
+    assert "=== [5/6]" in out and "Error: HTTP 404" in out
+    assert "Error: Invalid URL format" in out
+    assert server.peak == 4
+    assert tool.context.get("fetched_urls", set()) == set(urls[:4])
+
+
+def test_web_fetch_limits_requests_per_host(tracked_server, http_cache, monkeypatch):
+    monkeypatch.setattr(tools.web_fetch, "_PER_HOST_LIMIT", 2)
+    server = tracked_server
+    for n in range(5):
+        server.routes[f"/p{n}"] = _slow_route(0.2)
+    out = WebFetch(urls=[server.base_url + f"/p{n}" for n in range(5)]).run()
+    assert out.startswith("Fetched 5 of 5 URLs:")
+    assert server.peak == 2
+
+
+def test_web_fetch_batch_time_limit_and_budget(tracked_server, http_cache):
+    server = tracked_server
+    long_page = "".join(f"<p>Line {n:04d}</p>" for n in range(1000)).encode()
+    server.routes["/long"] = lambda request: (200, {"Content-Type": "text/html"}, long_page)
+    server.routes["/stuck"] = _slow_route(8)
+
+    out = WebFetch(urls=[server.base_url + "/long", server.base_url + "/stuck"], timeout=5, max_chars=4000).run()
+    assert out.startswith("Fetched 1 of 2 URLs:")
+    # The page that was not fetched leaves its share of max_chars to the other
+    assert "[Showing characters 0-4000 of 9999. Use offset=4000 to read more.]" in out
+    stuck = out.split(f"=== [2/2] {server.base_url}/stuck ===\n", 1)[1]
+    assert stuck.startswith("Error:")
+    assert "time limit" in stuck or "timed out" in stuck
+
+
+def test_web_fetch_batch_output_stays_within_max_chars(server, http_cache):
+    long_page = "".join(f"<p>Line {n:04d}</p>" for n in range(1000)).encode()
+    for n in range(19):
+        server.routes[f"/long{n}"] = lambda request: (200, {"Content-Type": "text/html"}, long_page)
+    server.routes["/short"] = lambda request: (200, {"Content-Type": "text/plain"}, b"short page")
+    urls = [server.base_url + f"/long{n}" for n in range(19)] + [server.base_url + "/short"]
+
+    out = WebFetch(urls=urls, max_chars=1000).run()
+    assert out.startswith("Fetched 20 of 20 URLs:")
+    # The short page is returned whole and the long ones split the rest of the budget
+    assert "short page" in out
+    assert len(re.findall(r"\[Showing characters 0-5[23] of 9999\.", out)) == 19
+    pages = [section.split(":\n\n", 1)[1].split("\n\n[Showing", 1)[0] for section in out.split("=== [")[1:]]
+    assert sum(len(page) for page in pages) == 1000
+
+    out = WebFetch(url=urls[0], urls=urls[1:], offset=100).run()
+    assert out.startswith("Error: offset cannot be combined with urls")
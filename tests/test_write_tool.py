@@ -123,6 +123,9 @@ def test_write_overwrite_existing_file(tmp_path: Path):
 
     assert "Successfully overwritten file" in result
     assert file_path in result
+    assert "Diff:" in result
+    assert "-print('initial')" in result
+    assert "+print('overwritten')" in result
 
     # Verify file was overwritten
     with open(file_path, "r", encoding="utf-8") as f:
@@ -363,3 +366,97 @@ def test_write_file_size_reporting(tmp_path: Path):
     tool2 = Write(file_path=file_path, content=large_content)
     result2 = tool2.run()
     assert "Size: 1024 bytes" in result2
+
+
+def test_write_identical_content_is_skipped(tmp_path: Path):
+    """Test that writing byte-identical content leaves the file untouched"""
+    file_path = str(tmp_path / "same.txt")
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write("unchanged\n")
+    os.utime(file_path, ns=(1_000_000_000, 1_000_000_000))
+
+    Read(file_path=file_path).run()
+    result = Write(file_path=file_path, content="unchanged\n").run()
+
+    assert "File unchanged" in result
+    assert os.stat(file_path).st_mtime_ns == 1_000_000_000
+
+
+def test_write_same_size_different_content_is_written(tmp_path: Path):
+    """Test that a size match alone does not skip the write"""
+    file_path = str(tmp_path / "same_size.txt")
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write("abc\n")
+
+    Read(file_path=file_path).run()
+    result = Write(file_path=file_path, content="xyz\n").run()
+
+    assert "Successfully overwritten file" in result
+    assert Path(file_path).read_text(encoding="utf-8") == "xyz\n"
+
+
+def test_write_append_mode(tmp_path: Path):
+    """Test that append mode adds content to the end of an existing file"""
+    file_path = str(tmp_path / "build.log")
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write("line 1\n")
+
+    Read(file_path=file_path).run()
+    result = Write(file_path=file_path, content="line 2\nline 3\n", mode="append").run()
+
+    assert "Successfully appended to file" in result
+    assert "Appended: 14 bytes, 2 lines" in result
+    assert Path(file_path).read_text(encoding="utf-8") == "line 1\nline 2\nline 3\n"
+
+
+def test_write_append_mode_requires_prior_read(tmp_path: Path):
+    """Test that appending to an existing file still requires a prior Read"""
+    file_path = str(tmp_path / "unread.log")
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write("existing\n")
+
+    result = Write(file_path=file_path, content="more\n", mode="append").run()
+
+    assert "must use Read tool" in result
+    assert Path(file_path).read_text(encoding="utf-8") == "existing\n"
+
+
+def test_write_append_keeps_stale_read_protection(tmp_path: Path):
+    """Test that appends are refused after external changes and do not hide later ones"""
+    from tools import Edit
+
+    file_path = str(tmp_path / "notes.txt")
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write("line 1\n")
+
+    Read(file_path=file_path).run()
+    assert "Successfully appended" in Write(file_path=file_path, content="line 2\n", mode="append").run()
+
+    # An edit right after the append needs no new Read
+    assert "Successfully" in Edit(file_path=file_path, old_string="line 2", new_string="line two").run()
+
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write("rewritten elsewhere\n")
+
+    result = Edit(file_path=file_path, old_string="rewritten", new_string="clobbered").run()
+    assert "modified since it was last read" in result
+    result = Write(file_path=file_path, content="more\n", mode="append").run()
+    assert "modified since it was last read" in result
+    assert Path(file_path).read_text(encoding="utf-8") == "rewritten elsewhere\n"
+
+
+def test_write_rejects_overwrite_of_file_changed_since_read(tmp_path: Path):
+    """Test that overwriting a file modified after the Read is refused"""
+    file_path = str(tmp_path / "stale.txt")
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write("a\nb\nc\n")
+
+    Read(file_path=file_path).run()
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write("a\nB\nc\nd\n")
+
+    result = Write(file_path=file_path, content="replacement\n").run()
+
+    assert "modified since it was last read" in result
+    assert "Changed lines in the current file: 2, 4" in result
+    assert Path(file_path).read_text(encoding="utf-8") == "a\nB\nc\nd\n"
@@ -1,9 +1,11 @@
 from .bash import Bash
+from .bash_output import BashOutput
 from .edit import Edit
 from .exit_plan_mode import ExitPlanMode
 from .git import Git
 from .glob import Glob
 from .grep import Grep
+from .kill_bash import KillBash
 from .ls import LS
 from .multi_edit import MultiEdit
 from .notebook_edit import NotebookEdit
@@ -16,6 +18,8 @@ from .web_fetch import WebFetch
 
 __all__ = [
     "Bash",
+    "BashOutput",
+    "KillBash",
     "Glob",
     "Grep",
     "LS",
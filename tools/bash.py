@@ -1,15 +1,32 @@
+import atexit
+import locale
 import os
 import platform
+import re
+import select
+import shlex
+import shutil
+import signal
 import subprocess
+import tempfile
 import threading
-from typing import Optional
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
 
 from agency_swarm.tools import BaseTool
 from pydantic import Field
 
-# Global execution lock to prevent parallel bash commands
-_bash_execution_lock = threading.Lock()
-_bash_busy = False  # Track if a bash command is currently executing
+from shared.file_registry import read_registry, session_key
+
+# Maximum number of commands running at once per session; further calls queue
+_MAX_CONCURRENT_COMMANDS = max(1, int(os.getenv("BASH_MAX_CONCURRENCY", "4")))
+
+# Close inherited descriptors in children (BASH_CLOSE_FDS=false skips the close_range()
+# call; descriptors Python opens are non-inheritable anyway, see PEP 446)
+_CLOSE_FDS = os.getenv("BASH_CLOSE_FDS", "true").lower() == "true"
 
 # Detect OS and configure shell at module load time
 _SYSTEM = platform.system()  # 'Windows', 'Darwin', 'Linux'
@@ -40,8 +57,6 @@ def normalize_windows_path(command):
     if not _IS_WINDOWS or not _USING_GIT_BASH:
         return command
 
-    import re
-
     def convert_quoted_path(match):
         """Convert quoted Windows path."""
         quote = match.group(1)
@@ -80,6 +95,1015 @@ def preprocess_command(command):
     return processed
 
 
+def _sandbox_policy(cwd):
+    """macOS sandbox policy allowing writes only under cwd and the temp dirs."""
+    return f"""(version 1)
+(allow default)
+(deny file-write*)
+(allow file-write* (subpath \"{cwd}\"))
+(allow file-write* (subpath \"/tmp\"))
+(allow file-write* (subpath \"/private/tmp\"))
+"""
+
+
+# Number of recent commands whose resource usage is kept in the agent context
+_MAX_USAGE_HISTORY = 100
+
+# Output kept per command: the first _OUTPUT_HEAD_BYTES and the last _OUTPUT_TAIL_BYTES
+_OUTPUT_HEAD_BYTES = 10000
+_OUTPUT_TAIL_BYTES = 20000
+
+
+class _OutputBuffer:
+    """
+    Constant-memory capture of a command's output.
+
+    The first `head_limit` bytes are kept as they arrive; after that only the
+    most recent `tail_limit` bytes are kept, and the bytes pushed out of the
+    tail are counted in `dropped`. The agent therefore sees both how a long
+    build started and how it ended, whatever the output size. Writes and
+    reads are locked so a reader thread can fill the buffer while it is polled.
+    """
+
+    def __init__(
+        self,
+        head_limit: int = _OUTPUT_HEAD_BYTES,
+        tail_limit: int = _OUTPUT_TAIL_BYTES,
+        encoding: str = "utf-8",
+    ):
+        self.head_limit = head_limit
+        self.tail_limit = tail_limit
+        self.encoding = encoding
+        self.total = 0
+        self.dropped = 0
+        self._head = bytearray()
+        self._tail = bytearray()
+        self._lock = threading.Lock()
+
+    def write(self, data: bytes) -> None:
+        if not data:
+            return
+        with self._lock:
+            self._write(data)
+
+    def _write(self, data: bytes) -> None:
+        self.total += len(data)
+        room = self.head_limit - len(self._head)
+        if room > 0:
+            self._head += data[:room]
+            data = data[room:]
+            if not data:
+                return
+        if len(data) >= self.tail_limit:
+            self.dropped += len(self._tail) + len(data) - self.tail_limit
+            self._tail[:] = data[-self.tail_limit :]
+            return
+        self._tail += data
+        excess = len(self._tail) - self.tail_limit
+        if excess > 0:
+            # Deleting from the front of a bytearray is O(1) amortized in CPython
+            del self._tail[:excess]
+            self.dropped += excess
+
+    def read_since(self, position: int) -> Tuple[str, int, int]:
+        """
+        Return output written after stream offset `position`.
+
+        Returns:
+            (text, new_position, skipped) where `skipped` counts bytes after
+            `position` that were already dropped from the buffer.
+        """
+        with self._lock:
+            chunks = []
+            if position < len(self._head):
+                chunks.append(bytes(self._head[position:]))
+                position = len(self._head)
+            tail_start = self.total - len(self._tail)
+            skipped = max(0, tail_start - position)
+            position = max(position, tail_start)
+            chunks.append(bytes(self._tail[position - tail_start :]))
+            return (
+                b"".join(chunks).decode(self.encoding, errors="replace"),
+                self.total,
+                skipped,
+            )
+
+    def getvalue(self) -> str:
+        with self._lock:
+            return self._getvalue()
+
+    def _getvalue(self) -> str:
+        if not self.dropped:
+            return bytes(self._head + self._tail).decode(self.encoding, errors="replace")
+        head = self._head.decode(self.encoding, errors="replace")
+        tail = self._tail.decode(self.encoding, errors="replace")
+        return (
+            f"{head}\n\n... ({self.dropped} bytes omitted; showing the first {len(self._head)} "
+            f"and last {len(self._tail)} of {self.total} bytes) ...\n\n{tail}"
+        )
+
+
+def _drain_pipe(stream, buffer: _OutputBuffer) -> None:
+    """Copy a pipe into an output buffer until EOF (used from a reader thread)."""
+    fd = stream.fileno()
+    for chunk in iter(lambda: os.read(fd, 65536), b""):
+        buffer.write(chunk)
+
+
+# Seconds between SIGTERM and SIGKILL when stopping a command's process group
+_KILL_GRACE_SECONDS = 2.0
+
+
+def _terminate_process_group(process: subprocess.Popen, reap: bool = True) -> None:
+    """
+    Stop a process and every process in its group.
+
+    The group gets SIGTERM, then SIGKILL for whatever is still alive after
+    _KILL_GRACE_SECONDS. With `reap`, the leader is reaped while waiting so it
+    doesn't linger as a zombie member of the group; callers that reap it
+    themselves (e.g. with wait4) pass reap=False. On Windows the tree is
+    killed with taskkill.
+    """
+    if _IS_WINDOWS:
+        subprocess.run(
+            ["taskkill", "/F", "/T", "/PID", str(process.pid)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        return
+
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        return
+    deadline = time.monotonic() + _KILL_GRACE_SECONDS
+    while time.monotonic() < deadline:
+        if reap:
+            process.poll()
+        try:
+            os.killpg(process.pid, 0)
+        except (ProcessLookupError, PermissionError):
+            return
+        time.sleep(0.05)
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+@dataclass
+class _CommandUsage:
+    """Wall-clock time and, where measurable, CPU time and peak memory of one command."""
+
+    wall_seconds: float
+    user_seconds: Optional[float] = None
+    system_seconds: Optional[float] = None
+    max_rss_kb: Optional[int] = None
+
+    @classmethod
+    def from_rusage(cls, wall_seconds: float, rusage) -> "_CommandUsage":
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        max_rss = rusage.ru_maxrss // 1024 if _IS_MACOS else rusage.ru_maxrss
+        return cls(wall_seconds, rusage.ru_utime, rusage.ru_stime, max_rss)
+
+    def describe(self) -> str:
+        parts = [f"wall {self.wall_seconds:.2f}s"]
+        if self.user_seconds is not None and self.system_seconds is not None:
+            parts.append(
+                f"cpu {self.user_seconds + self.system_seconds:.2f}s "
+                f"(user {self.user_seconds:.2f}s, sys {self.system_seconds:.2f}s)"
+            )
+        if self.max_rss_kb is not None:
+            parts.append(f"max RSS {self.max_rss_kb / 1024:.1f} MB")
+        return "Resources: " + ", ".join(parts)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def _wait_with_usage(process: subprocess.Popen) -> Tuple[int, _CommandUsage]:
+    """
+    Reap a child with wait4 so its CPU time and peak RSS (including its
+    waited-for descendants) are known. Wall time is filled in by the caller.
+    """
+    if _IS_WINDOWS or not hasattr(os, "wait4"):
+        return process.wait(), _CommandUsage(0.0)
+    try:
+        _, status, rusage = os.wait4(process.pid, 0)
+    except ChildProcessError:
+        # Already reaped elsewhere; the exit code is still known to Popen
+        return process.wait(), _CommandUsage(0.0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return process.returncode, _CommandUsage.from_rusage(0.0, rusage)
+
+
+def _parse_shell_time(value: str) -> float:
+    """Parse a bash `times` value such as 1m2.345s."""
+    minutes, _, seconds = value.rstrip("s").partition("m")
+    try:
+        return int(minutes) * 60 + float(seconds.replace(",", "."))
+    except ValueError:
+        return 0.0
+
+
+def _spawn(argv, cwd, env, stdin=subprocess.DEVNULL) -> subprocess.Popen:
+    """
+    Start a process with stdout+stderr on one pipe, in its own process group.
+
+    Kept vfork-friendly: no preexec_fn, user/group changes or pass_fds, so
+    CPython launches it with vfork() instead of a full fork of the agent
+    process. posix_spawn is never used here: CPython only takes that path
+    without cwd and start_new_session, which every command needs. The env
+    mapping is passed as is.
+    """
+    return subprocess.Popen(
+        argv,
+        stdin=stdin,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        cwd=cwd,
+        env=env,
+        # Children inherit no descriptors beyond stdio; cheap with close_range()
+        close_fds=_CLOSE_FDS,
+        # Own session/process group so the whole tree can be stopped together and
+        # parallel commands never receive each other's signals
+        start_new_session=not _IS_WINDOWS,
+        creationflags=getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0),
+        bufsize=0,
+    )
+
+
+_ENV_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*\Z")
+
+
+def _env_assignments(env: Optional[Dict[str, str]]) -> str:
+    """Render per-call variables as shell assignments prefixed to a single command."""
+    if not env:
+        return ""
+    return "".join(f"{name}={shlex.quote(str(value))} " for name, value in env.items())
+
+
+# Directory for the named pipes carrying each command's output (under /tmp, which
+# the macOS sandbox policy leaves writable); created on first use
+_pipe_dir: Optional[str] = None
+_pipe_dir_lock = threading.Lock()
+
+
+def _command_pipe_dir() -> str:
+    global _pipe_dir
+    with _pipe_dir_lock:
+        if _pipe_dir is None:
+            _pipe_dir = tempfile.mkdtemp(prefix="agent-bash-", dir="/tmp" if os.path.isdir("/tmp") else None)
+        return _pipe_dir
+
+
+@atexit.register
+def _remove_command_pipe_dir() -> None:
+    if _pipe_dir is not None:
+        shutil.rmtree(_pipe_dir, ignore_errors=True)
+
+
+def _discard_pipe(fd: int) -> None:
+    """Read and drop everything from a pipe until EOF, then close it (used from a thread)."""
+    try:
+        os.set_blocking(fd, True)
+        while os.read(fd, 65536):
+            pass
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class _CommandPipe:
+    """
+    A named pipe carrying one command's stdout and stderr.
+
+    The persistent shell's own stdout only carries the sentinel trailer, and
+    each command writes to a fresh pipe instead. Background children (`cmd &`)
+    inherit that pipe, so whatever they print after their command finished
+    is discarded rather than showing up in a later command's result. We hold
+    a write end ourselves until the command is done, so the read end never
+    reports EOF before the shell has opened it.
+    """
+
+    def __init__(self, token: str):
+        self.path = os.path.join(_command_pipe_dir(), token)
+        os.mkfifo(self.path, 0o600)
+        self.fd = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK)
+        self._writer: Optional[int] = os.open(self.path, os.O_WRONLY | os.O_NONBLOCK)
+
+    def read_into(self, buffer: "_OutputBuffer") -> None:
+        """Move everything the pipe holds right now into `buffer`."""
+        while True:
+            try:
+                chunk = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return
+            if not chunk:
+                return
+            buffer.write(chunk)
+
+    def close(self, buffer: Optional["_OutputBuffer"] = None) -> None:
+        """Collect the pending output into `buffer`, then detach from the pipe."""
+        if self._writer is None:
+            return
+        if buffer is not None:
+            self.read_into(buffer)
+        os.close(self._writer)
+        self._writer = None
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+        try:
+            still_open = os.read(self.fd, 65536) != b""
+        except BlockingIOError:
+            still_open = True
+        if still_open:
+            # Background children still hold the pipe; drain it until they exit
+            threading.Thread(target=_discard_pipe, args=(self.fd,), daemon=True).start()
+        else:
+            os.close(self.fd)
+
+
+# Per-command shell state a fresh `bash -c` would not inherit: errexit, nounset,
+# xtrace, verbose, noglob, noclobber, errtrace, functrace, pipefail and traps
+_RESET_SHELL_STATE = "set +euxvfCET +o pipefail; trap - ERR EXIT DEBUG RETURN"
+
+
+class _ShellSession:
+    """
+    A long-lived bash process driven over pipes.
+
+    Each command is passed to the shell through a quoted here-doc and run with
+    `eval`, its output going to a _CommandPipe of its own, followed by a
+    sentinel line carrying the exit status and $PWD on the shell's stdout.
+    Shell state (cwd, exported variables, activated virtualenvs) therefore
+    carries between commands and each command costs a pipe write instead of
+    a new shell. Options and traps a command sets (set -e, set -x, trap ...)
+    are reset after it, as they would not outlive a `bash -c`. On timeout or
+    if the shell exits, the session restarts in its last known working
+    directory.
+    """
+
+    def __init__(
+        self,
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        sandbox_policy: Optional[str] = None,
+    ):
+        self.cwd = cwd or os.getcwd()
+        self.env = env if env is not None else dict(os.environ)
+        self.sandbox_policy = sandbox_policy
+        self.process: Optional[subprocess.Popen] = None
+        # Cumulative (user, sys) CPU seconds reported by `times` after the last command
+        self._cpu_times = (0.0, 0.0)
+        self._start()
+
+    def _start(self) -> None:
+        argv = ["/bin/bash", "--noprofile", "--norc"]
+        if self.sandbox_policy:
+            argv = ["/usr/bin/sandbox-exec", "-p", self.sandbox_policy] + argv
+        self.process = _spawn(
+            argv,
+            cwd=self.cwd if os.path.isdir(self.cwd) else os.getcwd(),
+            env=self.env,
+            stdin=subprocess.PIPE,
+        )
+        self._cpu_times = (0.0, 0.0)
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def close(self) -> None:
+        """Terminate the shell and everything it started."""
+        if self.process is None:
+            return
+        _terminate_process_group(self.process)
+        try:
+            self.process.wait(timeout=5)
+        except Exception:
+            pass
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except Exception:
+                pass
+        self.process = None
+
+    def restart(self) -> None:
+        self.close()
+        self._start()
+
+    def run(
+        self,
+        command: str,
+        timeout_seconds: float,
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+    ) -> Tuple[Optional[int], str, str, _CommandUsage]:
+        """
+        Run a command in the shell, first changing to `cwd` if given.
+
+        `env` variables are set for this command only (as assignments on its
+        `eval`), leaving the shell's own environment untouched.
+
+        Returns:
+            (exit_code, output, status, usage) where status is "ok", "timeout" or
+            "exited". exit_code is None on timeout.
+        """
+        if not self.alive():
+            self.restart()
+
+        token = uuid.uuid4().hex
+        prefix = ""
+        if cwd and cwd != self.cwd and os.path.isdir(cwd):
+            self.cwd = cwd
+            prefix = f"cd -- {shlex.quote(self.cwd)} 2>/dev/null\n"
+        elif not os.path.isdir(self.cwd):
+            # The directory the shell was in has been removed; fall back to the process cwd
+            self.cwd = os.getcwd()
+            prefix = f"cd -- {shlex.quote(self.cwd)} 2>/dev/null\n"
+        pipe = _CommandPipe(token)
+        try:
+            return self._run(command, timeout_seconds, env, token, prefix, pipe)
+        finally:
+            pipe.close()
+
+    def _run(
+        self,
+        command: str,
+        timeout_seconds: float,
+        env: Optional[Dict[str, str]],
+        token: str,
+        prefix: str,
+        pipe: _CommandPipe,
+    ) -> Tuple[Optional[int], str, str, _CommandUsage]:
+        marker = f"__AGENT_CMD_DONE_{token}__ ".encode()
+        end_marker = f"\n__AGENT_CMD_END_{token}__\n".encode()
+        # The command writes to its own pipe. After it: reset the options and
+        # traps it may have set (only cwd and variables carry over, as with a
+        # fresh `bash -c`), then report its exit status, the shell's cumulative
+        # CPU times (`times` must run in the shell itself, not a subshell) and $PWD
+        script = (
+            f"{prefix}IFS= read -r -d '' __agent_cmd <<'__AGENT_CMD_{token}__'\n"
+            f"{command}\n"
+            f"__AGENT_CMD_{token}__\n"
+            f'{_env_assignments(env)}eval "$__agent_cmd" < /dev/null > {shlex.quote(pipe.path)} 2>&1\n'
+            f"__agent_status=$?\n"
+            f"{_RESET_SHELL_STATE}\n"
+            f"printf '\\n__AGENT_CMD_DONE_{token}__ %s\\n' \"$__agent_status\"\n"
+            f"times\n"
+            f"printf '%s\\n__AGENT_CMD_END_{token}__\\n' \"$PWD\"\n"
+        )
+        started = time.monotonic()
+        try:
+            self.process.stdin.write(script.encode())
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            self.restart()
+            return 1, "", "exited", _CommandUsage(0.0)
+
+        fd = self.process.stdout.fileno()
+        deadline = started + timeout_seconds
+        sentinel = b"\n" + marker
+        output = _OutputBuffer()
+        # Bytes that may still hold the start of the sentinel; everything
+        # before them is moved into the bounded output buffer as it arrives
+        pending = bytearray()
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                pipe.close(output)
+                output.write(pending)
+                self.restart()
+                return None, output.getvalue(), "timeout", _CommandUsage(time.monotonic() - started)
+            ready, _, _ = select.select([fd, pipe.fd], [], [], remaining)
+            if pipe.fd in ready:
+                pipe.read_into(output)
+            if fd not in ready:
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                # The command exited the shell (e.g. `exit`); report its status and respawn
+                pipe.close(output)
+                output.write(pending)
+                exit_code, usage = _wait_with_usage(self.process)
+                usage.wall_seconds = time.monotonic() - started
+                if usage.user_seconds is not None:
+                    # wait4 reports the whole shell's lifetime; keep this command's share.
+                    # wait4 and `times` account slightly differently, so clamp at zero.
+                    usage.user_seconds = max(0.0, usage.user_seconds - self._cpu_times[0])
+                    usage.system_seconds = max(0.0, usage.system_seconds - self._cpu_times[1])
+                    usage.max_rss_kb = None
+                self.restart()
+                return exit_code, output.getvalue(), "exited", usage
+            pending += chunk
+            index = pending.find(sentinel)
+            if index == -1:
+                flush = len(pending) - (len(sentinel) - 1)
+                if flush > 0:
+                    output.write(bytes(pending[:flush]))
+                    del pending[:flush]
+                continue
+            end = pending.find(end_marker, index + len(sentinel))
+            if end == -1:
+                continue
+            trailer = pending[index + len(sentinel) : end].decode("utf-8", errors="replace")
+            exit_text, user_seconds, system_seconds, cwd = self._parse_trailer(trailer)
+            if cwd:
+                self.cwd = cwd
+            usage = _CommandUsage(
+                wall_seconds=time.monotonic() - started,
+                user_seconds=max(0.0, user_seconds - self._cpu_times[0]),
+                system_seconds=max(0.0, system_seconds - self._cpu_times[1]),
+            )
+            self._cpu_times = (user_seconds, system_seconds)
+            pipe.close(output)
+            output.write(bytes(pending[:index]))
+            return int(exit_text), output.getvalue(), "ok", usage
+
+    @staticmethod
+    def _parse_trailer(trailer: str) -> Tuple[str, float, float, str]:
+        """Split the post-command trailer into exit status, cumulative user/sys CPU and cwd."""
+        lines = trailer.split("\n")
+        exit_text = lines[0].strip()
+        # `times` prints "<user> <sys>" for the shell, then for its children
+        seconds = [_parse_shell_time(value) for line in lines[1:3] for value in line.split()]
+        user_seconds = sum(seconds[0::2])
+        system_seconds = sum(seconds[1::2])
+        return exit_text, user_seconds, system_seconds, "\n".join(lines[3:])
+
+
+class _ShellPool:
+    """
+    Up to `max_shells` persistent shells serving one session.
+
+    Commands beyond the limit queue for a free shell instead of failing. Every
+    shell runs in its own process group, so concurrent commands never share a
+    terminal or signal each other. The pool tracks the session's working
+    directory: each command starts there (or in its own `cwd`), and a command
+    that changes directory moves the session with it, as long as it ran on
+    the session's directory without overlapping any other command. Exported
+    variables stay per shell.
+
+    The base environment and (on macOS) the sandbox policy are computed once
+    when the session starts. Its shells start from that environment, and
+    both its shells and its background jobs run under that sandbox policy.
+    Background jobs take the variables exported in a session shell instead
+    (see exported_environment). Per-call variables are overlaid on top
+    instead of copying os.environ for every command.
+    """
+
+    def __init__(self, max_shells: int = _MAX_CONCURRENT_COMMANDS):
+        self.cwd = os.getcwd()
+        self.base_env: Dict[str, str] = dict(os.environ)
+        self.sandbox_policy: Optional[str] = None
+        if _IS_MACOS and os.path.exists("/usr/bin/sandbox-exec"):
+            self.sandbox_policy = _sandbox_policy(self.cwd)
+        self.max_shells = max_shells
+        self._slots = threading.BoundedSemaphore(max_shells)
+        self._idle: List[_ShellSession] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        # Commands running now and commands started so far, to tell sequential `cd`s from parallel ones
+        self._active = 0
+        self._started = 0
+
+    def acquire(self, timeout_seconds: float) -> Optional[_ShellSession]:
+        """Wait up to `timeout_seconds` for a shell; None if all stayed busy."""
+        if not self._slots.acquire(timeout=timeout_seconds):
+            return None
+        try:
+            with self._lock:
+                if self._idle:
+                    return self._idle.pop()
+            return _ShellSession(self.cwd, self.base_env, self.sandbox_policy)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def environment(self, overlay: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """The session's base environment with per-call variables on top."""
+        if not overlay:
+            return self.base_env
+        return {**self.base_env, **overlay}
+
+    def exported_environment(self, timeout_seconds: float) -> Optional[Dict[str, str]]:
+        """
+        The variables exported in one of the session's shells (an activated
+        virtualenv included), or None if no shell became free in time.
+        """
+        shell = self.acquire(timeout_seconds)
+        if shell is None:
+            return None
+        path = os.path.join(_command_pipe_dir(), f"{uuid.uuid4().hex}.env")
+        try:
+            with self._lock:
+                cwd = self.cwd
+            # compgen and ${!name} are bash builtins, unlike `env -0` which BSD env lacks
+            exit_code, _, status, _ = shell.run(
+                f"for __agent_name in $(compgen -e); do "
+                f"printf '%s=%s\\0' \"$__agent_name\" \"${{!__agent_name}}\"; "
+                f"done > {shlex.quote(path)}",
+                timeout_seconds,
+                cwd=cwd,
+            )
+            if status != "ok" or exit_code != 0:
+                return None
+            with open(path, "rb") as file:
+                data = file.read()
+        finally:
+            self.release(shell)
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        environment = {}
+        for entry in data.split(b"\0"):
+            name, separator, value = entry.partition(b"=")
+            if separator:
+                environment[os.fsdecode(name)] = os.fsdecode(value)
+        return environment
+
+    def release(self, shell: _ShellSession) -> None:
+        with self._lock:
+            if self._closed or not shell.alive():
+                shell.close()
+            else:
+                self._idle.append(shell)
+        self._slots.release()
+
+    def run(
+        self,
+        command: str,
+        timeout_seconds: float,
+        env: Optional[Dict[str, str]] = None,
+        cwd: Optional[str] = None,
+    ) -> Tuple[Optional[int], str, str, Optional[_ShellSession], Optional[_CommandUsage]]:
+        """
+        Run a command on a free shell, queueing while all shells are busy.
+
+        The command starts in `cwd` if given, otherwise in the session's
+        working directory. Only a command without `cwd` that overlapped no
+        other command may move the session's working directory. Time spent
+        waiting for a shell counts against `timeout_seconds`.
+
+        Returns:
+            (exit_code, output, status, shell, usage); status is "busy" (and
+            shell and usage None) when no shell became free within the timeout.
+        """
+        deadline = time.monotonic() + timeout_seconds
+        shell = self.acquire(timeout_seconds)
+        if shell is None:
+            return None, "", "busy", None, None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self.release(shell)
+            return None, "", "busy", None, None
+        with self._lock:
+            start_cwd = cwd or self.cwd
+            overlapped = self._active > 0
+            self._active += 1
+            self._started += 1
+            started = self._started
+        try:
+            exit_code, output, status, usage = shell.run(
+                command, remaining, cwd=start_cwd, env=env
+            )
+        finally:
+            with self._lock:
+                self._active -= 1
+                sequential = not overlapped and self._started == started
+                if cwd is None and sequential and shell.cwd != start_cwd:
+                    self.cwd = shell.cwd
+            self.release(shell)
+        return exit_code, output, status, shell, usage
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            for shell in self._idle:
+                shell.close()
+            self._idle.clear()
+
+
+# Shell pools keyed by session (see shared.file_registry.session_key)
+_MAX_SHELL_SESSIONS = 8
+_shell_pools: "OrderedDict[str, _ShellPool]" = OrderedDict()
+_shell_pools_lock = threading.Lock()
+
+# Windows runs one-shot processes; this bounds how many run at once
+_one_shot_slots = threading.BoundedSemaphore(_MAX_CONCURRENT_COMMANDS)
+
+
+def _get_shell_pool(key: str) -> _ShellPool:
+    """Return the shell pool for a session, creating it on first use."""
+    with _shell_pools_lock:
+        pool = _shell_pools.get(key)
+        if pool is None:
+            pool = _ShellPool()
+            _shell_pools[key] = pool
+            if len(_shell_pools) > _MAX_SHELL_SESSIONS:
+                _, evicted = _shell_pools.popitem(last=False)
+                evicted.close()
+        else:
+            _shell_pools.move_to_end(key)
+        return pool
+
+
+@atexit.register
+def _close_shell_pools() -> None:
+    with _shell_pools_lock:
+        for pool in _shell_pools.values():
+            pool.close()
+        _shell_pools.clear()
+
+
+class _BackgroundJob:
+    """
+    A command running detached from the agent's turn.
+
+    Output is streamed by a reader thread into a bounded _OutputBuffer, so a
+    job can run for hours without growing memory. `read_position` remembers
+    how much output has been returned, letting BashOutput return only what
+    is new since the last poll. On macOS it runs under the session's write
+    sandbox, like the session's shells.
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        session: str,
+        command: str,
+        cwd: str,
+        env: Dict[str, str],
+        sandbox_policy: Optional[str] = None,
+    ):
+        self.job_id = job_id
+        self.session = session
+        self.command = command
+        self.cwd = cwd
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.exit_code: Optional[int] = None
+        self.usage: Optional[_CommandUsage] = None
+        self.killed = False
+        self.read_position = 0
+        self.output = _OutputBuffer(
+            encoding=locale.getpreferredencoding(False) if _IS_WINDOWS else "utf-8"
+        )
+        self.done = threading.Event()
+
+        if _IS_WINDOWS:
+            argv = _SHELL_CMD + [preprocess_command(command)]
+        else:
+            argv = ["/bin/bash", "-c", command]
+            if sandbox_policy:
+                argv = ["/usr/bin/sandbox-exec", "-p", sandbox_policy] + argv
+        self.process = _spawn(argv, cwd=cwd, env=env)
+        self._reader = threading.Thread(target=self._follow, daemon=True)
+        self._reader.start()
+
+    def _follow(self) -> None:
+        try:
+            _drain_pipe(self.process.stdout, self.output)
+        finally:
+            self.exit_code, self.usage = _wait_with_usage(self.process)
+            self.finished_at = time.monotonic()
+            self.usage.wall_seconds = self.finished_at - self.started_at
+            self.process.stdout.close()
+            self.done.set()
+
+    @property
+    def running(self) -> bool:
+        return not self.done.is_set()
+
+    def elapsed(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def wait(self, timeout_seconds: float) -> bool:
+        """Wait up to `timeout_seconds` for the job to finish; True if it did."""
+        return self.done.wait(timeout_seconds)
+
+    def kill(self) -> None:
+        """Stop the job and every process it started (SIGTERM, then SIGKILL)."""
+        if not self.running:
+            return
+        self.killed = True
+        # The reader thread reaps the leader with wait4 to collect its resource usage
+        _terminate_process_group(self.process, reap=False)
+        self.done.wait(5)
+
+    def status_line(self) -> str:
+        if self.running:
+            state = "running"
+        elif self.killed:
+            state = f"killed (exit code {self.exit_code})"
+        else:
+            state = f"finished with exit code {self.exit_code}"
+        return f"Job {self.job_id}: {state} after {self.elapsed():.1f}s (pid {self.process.pid})"
+
+    def read_new_output(self) -> str:
+        """Output produced since the previous call, with a note for bytes dropped meanwhile."""
+        text, self.read_position, skipped = self.output.read_since(self.read_position)
+        if skipped:
+            text = f"... ({skipped} bytes of output omitted) ...\n{text}"
+        return text
+
+
+# Background jobs by id; finished jobs are evicted oldest first beyond the cap
+_MAX_BACKGROUND_JOBS = 32
+_background_jobs: "OrderedDict[str, _BackgroundJob]" = OrderedDict()
+_background_jobs_lock = threading.Lock()
+
+
+def _start_background_job(
+    session: str,
+    command: str,
+    cwd: str,
+    env: Dict[str, str],
+    sandbox_policy: Optional[str] = None,
+) -> _BackgroundJob:
+    job = _BackgroundJob(uuid.uuid4().hex[:8], session, command, cwd, env, sandbox_policy)
+    with _background_jobs_lock:
+        _background_jobs[job.job_id] = job
+        finished = [key for key, other in _background_jobs.items() if not other.running]
+        for key in finished[: max(0, len(_background_jobs) - _MAX_BACKGROUND_JOBS)]:
+            del _background_jobs[key]
+    return job
+
+
+def get_background_job(session: str, job_id: str) -> Optional[_BackgroundJob]:
+    """Return a background job started in `session`, or None."""
+    with _background_jobs_lock:
+        job = _background_jobs.get(job_id.strip())
+    if job is None or job.session != session:
+        return None
+    return job
+
+
+def list_background_jobs(session: str) -> List[_BackgroundJob]:
+    """Return the background jobs started in `session`, oldest first."""
+    with _background_jobs_lock:
+        return [job for job in _background_jobs.values() if job.session == session]
+
+
+@atexit.register
+def _kill_background_jobs() -> None:
+    with _background_jobs_lock:
+        jobs = list(_background_jobs.values())
+    for job in jobs:
+        job.kill()
+
+
+# Commands whose output may be cached when BASH_COMMAND_CACHE=true, matched as
+# leading words; override with a comma-separated BASH_COMMAND_CACHE_ALLOWLIST
+_DEFAULT_CACHEABLE_COMMANDS = (
+    "git status",
+    "git log",
+    "git diff",
+    "git show",
+    "git rev-parse",
+    "git remote -v",
+    "python --version",
+    "python3 --version",
+    "pip list",
+    "pip freeze",
+    "pip show",
+    "node --version",
+    "npm --version",
+    "ls",
+    "pwd",
+    "uname",
+    "which",
+)
+
+# Anything beyond one plain invocation (chaining, redirection, expansion, globs) is never cached
+_UNCACHEABLE_CHARS = frozenset(";&|<>`$(){}[]*?~!\\\n")
+
+
+def _find_git_dir(path: str) -> Optional[str]:
+    """Return the git directory of the repository containing `path`, if any."""
+    while True:
+        candidate = os.path.join(path, ".git")
+        if os.path.isdir(candidate):
+            return candidate
+        if os.path.isfile(candidate):
+            # Worktrees and submodules: ".git" is a file pointing at the real git dir
+            try:
+                with open(candidate, "r", encoding="utf-8") as file:
+                    line = file.readline().strip()
+            except OSError:
+                return None
+            if line.startswith("gitdir:"):
+                return os.path.normpath(os.path.join(path, line[len("gitdir:") :].strip()))
+            return None
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+class _CommandCache:
+    """
+    Opt-in memoization of allowlisted, read-only commands.
+
+    Entries are keyed by session, command string and working directory, and
+    store an invalidation token taken before the command ran: the mtimes of
+    the working directory and of the enclosing repository's index, HEAD,
+    HEAD reflog and packed-refs, the write generation of the file tools
+    (Edit, Write, ...), and a counter bumped by every Bash command that is
+    not cacheable. A hit needs an identical token and an entry younger than
+    `ttl_seconds`; the TTL bounds staleness from changes made outside the agent
+    that touch none of the watched paths. Only successful results are cached.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        allowlist=_DEFAULT_CACHEABLE_COMMANDS,
+        ttl_seconds: float = 60.0,
+        max_entries: int = 256,
+    ):
+        self.enabled = enabled
+        self.allowlist = [tuple(entry.split()) for entry in allowlist if entry.strip()]
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.command_generation = 0
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cacheable(self, command: str) -> bool:
+        if not self.enabled or _UNCACHEABLE_CHARS.intersection(command):
+            return False
+        try:
+            words = shlex.split(command)
+        except ValueError:
+            return False
+        if any(word.startswith("--output") for word in words):
+            return False
+        return any(tuple(words[: len(entry)]) == entry for entry in self.allowlist)
+
+    def invalidate(self) -> None:
+        """A command that may have side effects ran; drop every cached result."""
+        with self._lock:
+            self.command_generation += 1
+            self._entries.clear()
+
+    def token(self, cwd: str) -> tuple:
+        paths = [cwd]
+        git_dir = _find_git_dir(cwd)
+        if git_dir:
+            paths += [
+                os.path.join(git_dir, name)
+                for name in ("index", "HEAD", os.path.join("logs", "HEAD"), "packed-refs")
+            ]
+        mtimes = []
+        for path in paths:
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return (read_registry.write_generation, self.command_generation, tuple(mtimes))
+
+    def get(self, key: tuple, token: tuple) -> Optional[Tuple[float, int, str]]:
+        """Return (age_seconds, exit_code, output) for a valid entry, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry_token, created_at, exit_code, output = entry
+            age = time.monotonic() - created_at
+            if entry_token != token or age > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return age, exit_code, output
+
+    def put(self, key: tuple, token: tuple, exit_code: int, output: str) -> None:
+        with self._lock:
+            # A side-effecting command finished while this one ran; don't store
+            if token[1] != self.command_generation:
+                return
+            self._entries[key] = (token, time.monotonic(), exit_code, output)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_command_cache = _CommandCache(
+    enabled=os.getenv("BASH_COMMAND_CACHE", "false").lower() == "true",
+    allowlist=(
+        os.getenv("BASH_COMMAND_CACHE_ALLOWLIST").split(",")
+        if os.getenv("BASH_COMMAND_CACHE_ALLOWLIST")
+        else _DEFAULT_CACHEABLE_COMMANDS
+    ),
+    ttl_seconds=float(os.getenv("BASH_COMMAND_CACHE_TTL", "60")),
+)
+
+
 class Bash(BaseTool):
     """
     Executes shell commands with full cross-platform support (Windows, macOS, Linux).
@@ -90,6 +1114,25 @@ class Bash(BaseTool):
     - Linux: Uses /bin/bash
 
     Executes commands in a persistent shell session with optional timeout, ensuring proper handling and security measures.
+    The working directory, exported variables and activated virtualenvs carry over between calls. If a command times out
+    or exits the shell, a new shell session is started in the last working directory.
+    Independent commands may be issued in parallel: up to BASH_MAX_CONCURRENCY (default 4) run at once, each in its own
+    shell and process group, and further calls wait for a free shell. Every command starts in the session's current
+    working directory unless the cwd parameter names another one for that call; a `cd` only moves the session when
+    the command ran without cwd and without overlapping other commands. Exported variables are only guaranteed to
+    persist for sequential calls.
+    Use the env parameter to set variables for a single command without affecting later ones.
+    When BASH_COMMAND_CACHE=true, repeating an allowlisted read-only command (git status, python --version, pip list,
+    ls, ...) returns the earlier result, marked as cached, as long as nothing it depends on has changed.
+
+    Each result reports the command's resource usage (wall time, CPU time, and peak memory where it can be measured).
+    On timeout the command's whole process group is terminated (SIGTERM, then SIGKILL), including test workers and servers it started.
+
+    Long-running commands (full test suites, builds, dev servers) can be started with run_in_background=true. The call
+    returns a job id immediately and the command keeps running without a timeout; use BashOutput to read its new output
+    or wait for it to finish, and KillBash to stop it. A job starts in the session's working directory (or cwd) with the
+    variables exported in the session, including an activated virtualenv; it runs in its own shell, so it does not see
+    shell functions, aliases or unexported variables.
 
     Before executing the command, please follow these steps:
 
@@ -111,7 +1154,7 @@ class Bash(BaseTool):
       - The command argument is required.
       - You can specify an optional timeout in milliseconds (up to 600000ms / 10 minutes). If not specified, commands will timeout after 120000ms (2 minutes).
       - It is very helpful if you write a clear, concise description of what this command does in 5-10 words.
-      - If the output exceeds 30000 characters, output will be truncated before being returned to you.
+      - If the output exceeds 30000 bytes, only its first 10000 and last 20000 bytes are returned to you, with a note of how many bytes were omitted in between.
       - VERY IMPORTANT: Prefer the specialized tools (Grep, Glob, Read, LS, Task) over shell commands with the same names. Do not call CLI `grep`, `find`, or `rg` here for code/content search; use the Grep tool. Do not call CLI `ls` to enumerate; use the LS tool. Do not call CLI `cat`/`head`/`tail` to read files; use the Read tool.
       - When issuing multiple commands, use the ';' or '&&' operator to separate them. Multiline scripts are allowed when needed.
       - Try to maintain your current working directory throughout the session by using absolute paths and avoiding usage of `cd`. You may use `cd` if the User explicitly requests it.
@@ -208,28 +1251,22 @@ class Bash(BaseTool):
         None,
         description="Clear, concise description of what this command does in 5-10 words. Examples:\nInput: ls\nOutput: Lists files in current directory\n\nInput: git status\nOutput: Shows working tree status\n\nInput: npm install\nOutput: Installs package dependencies\n\nInput: mkdir foo\nOutput: Creates directory 'foo'",
     )
+    env: Optional[Dict[str, str]] = Field(
+        None,
+        description="Extra environment variables for this command only, e.g. {\"PYTHONPATH\": \"src\"}. They do not persist to later commands; use `export` in the command for that.",
+    )
+    cwd: Optional[str] = Field(
+        None,
+        description="Directory to run this command in (relative paths are resolved against the session's working directory). The session's working directory is left unchanged, so parallel calls can each use their own directory.",
+    )
+    run_in_background: bool = Field(
+        False,
+        description="Start the command as a background job and return its job id immediately. It inherits the session's working directory and exported variables (not shell functions or aliases). Use BashOutput to read its output and KillBash to stop it. The timeout does not apply to background jobs.",
+    )
 
     def run(self):
         """Execute the bash command."""
-        global _bash_busy
-
         try:
-            # Check if another bash command is currently executing
-            if _bash_busy:
-                return """Exit code: 1
-Error: Terminal is currently busy executing another command.
-
-🔄 Only one bash command can execute at a time to prevent conflicts.
-
-💡 Please wait for the current command to complete before submitting the next one.
-   Submit your commands sequentially, not in parallel.
-
-ℹ️  If you have multiple commands to run, either:
-   - Wait and submit them one at a time, or
-   - Combine them using ';' or '&&' operators in a single command
-
-Example: echo "first" && echo "second" && ls -la"""
-
             # Set timeout (convert from milliseconds to seconds)
             timeout_seconds = self.timeout / 1000
 
@@ -250,82 +1287,108 @@ Example: echo "first" && echo "second" && ls -la"""
                     command = modifier(command)
                     break
 
-            # Execute with proper locking to prevent parallel execution
-            with _bash_execution_lock:
-                _bash_busy = True
-                try:
-                    return self._execute_bash_command(command, timeout_seconds)
-                finally:
-                    _bash_busy = False
+            if self.env:
+                invalid = [name for name in self.env if not _ENV_NAME.match(name)]
+                if invalid:
+                    return f"Exit code: 1\nError: Invalid environment variable name(s): {', '.join(invalid)}"
+
+            cwd = None
+            if self.cwd:
+                base = os.getcwd() if _IS_WINDOWS else _get_shell_pool(session_key(self.context)).cwd
+                cwd = os.path.normpath(os.path.join(base, os.path.expanduser(self.cwd)))
+                if not os.path.isdir(cwd):
+                    return f"Exit code: 1\nError: Working directory does not exist: {cwd}"
+
+            if self.run_in_background:
+                _command_cache.invalidate()
+                return self._start_background_job(command, timeout_seconds, cwd)
+
+            return self._execute_bash_command(command, timeout_seconds, cwd)
 
         except Exception as e:
-            _bash_busy = False  # Make sure to clear busy flag on exception
             return f"Exit code: 1\nError executing command: {str(e)}"
 
-    def _execute_bash_command(self, command, timeout_seconds):
-        """Execute a bash command using subprocess.run with proper timeout."""
-        output = ""
-        try:
-            # Preprocess command for OS-specific syntax (e.g., Windows path conversion)
-            processed_command = preprocess_command(command)
+    def _start_background_job(self, command, timeout_seconds, cwd=None):
+        """
+        Launch the command as a background job in `cwd` or the session's working
+        directory, with the variables exported in the session's shell.
+        """
+        session = session_key(self.context)
+        pool = _get_shell_pool(session)
+        cwd = cwd or (os.getcwd() if _IS_WINDOWS else pool.cwd)
+        env = pool.environment(self.env)
+        note = ""
+        if not _IS_WINDOWS:
+            exported = pool.exported_environment(timeout_seconds)
+            if exported is None:
+                note = "\n(All shells stayed busy, so the job started without the variables exported in the session.)"
+            else:
+                env = {**exported, **(self.env or {})}
+        job = _start_background_job(session, command, cwd, env, pool.sandbox_policy)
+        return (
+            f"Started background job {job.job_id} (pid {job.process.pid}) in {cwd}\n"
+            f'Use BashOutput with job_id="{job.job_id}" to read its output or wait for it, '
+            f'and KillBash with job_id="{job.job_id}" to stop it.{note}'
+        )
+
+    def _execute_bash_command(self, command, timeout_seconds, cwd=None):
+        """Execute a bash command on one of the session's persistent shells (one-shot on Windows)."""
+        if self.env or not _command_cache.cacheable(command):
+            # Anything that may have side effects invalidates cached results, before and after
+            _command_cache.invalidate()
+            try:
+                return self._run_command(command, timeout_seconds, cwd)
+            finally:
+                _command_cache.invalidate()
+
+        session = session_key(self.context)
+        cwd = cwd or (os.getcwd() if _IS_WINDOWS else _get_shell_pool(session).cwd)
+        key = (session, command, cwd)
+        token = _command_cache.token(cwd)
+        cached = _command_cache.get(key, token)
+        if cached is not None:
+            age, exit_code, output = cached
+            return _format_result(
+                exit_code, output, note=f"(cached result from {age:.1f}s ago; nothing it depends on has changed)"
+            )
 
-            # Build execution command based on detected OS
-            exec_cmd = _SHELL_CMD + [processed_command]
+        return self._run_command(command, timeout_seconds, cwd, cache_as=(key, token))
+
+    def _run_command(self, command, timeout_seconds, cwd=None, cache_as=None):
+        """Run a command now, in `cwd` if given; with `cache_as` (key, token), store a successful result."""
+        if _IS_WINDOWS:
+            deadline = time.monotonic() + timeout_seconds
+            if not _one_shot_slots.acquire(timeout=timeout_seconds):
+                return _busy_result(timeout_seconds)
+            try:
+                if deadline <= time.monotonic():
+                    return _busy_result(timeout_seconds)
+                return self._execute_one_shot(command, timeout_seconds, cwd, cache_as, deadline)
+            finally:
+                _one_shot_slots.release()
 
-            # Apply macOS sandboxing if available
-            if _IS_MACOS and os.path.exists("/usr/bin/sandbox-exec"):
-                try:
-                    cwd = os.getcwd()
-                    policy = f"""(version 1)
-(allow default)
-(deny file-write*)
-(allow file-write* (subpath \"{cwd}\"))
-(allow file-write* (subpath \"/tmp\"))
-(allow file-write* (subpath \"/private/tmp\"))
-"""
-                    exec_cmd = [
-                        "/usr/bin/sandbox-exec",
-                        "-p",
-                        policy,
-                        "/bin/bash",
-                        "-c",
-                        command,
-                    ]
-                except Exception:
-                    # If sandbox setup fails, fall back to normal execution
-                    exec_cmd = _SHELL_CMD + [command]
-
-            result = subprocess.run(
-                exec_cmd,
-                capture_output=True,
-                text=True,
-                timeout=timeout_seconds,
-                cwd=os.getcwd(),
-                env=os.environ.copy(),
+        output = ""
+        try:
+            pool = _get_shell_pool(session_key(self.context))
+            exit_code, output, status, shell, usage = pool.run(
+                command, timeout_seconds, env=self.env, cwd=cwd
             )
 
-            # Combine stdout and stderr
-            if result.stdout:
-                output += result.stdout
-            if result.stderr:
-                if output:
-                    output += "\n"
-                output += result.stderr
-
-            # Handle empty output
-            if not output.strip():
-                return f"Exit code: {result.returncode}\n(Command completed with no output)"
-
-            # Truncate if too long
-            if len(output) > 30000:
-                output = (
-                    output[-30000:] + "\n (output truncated to last 30000 characters)"
+            if status == "busy":
+                return _busy_result(timeout_seconds)
+            self._record_usage(command, 124 if status == "timeout" else exit_code, usage)
+            if status == "timeout":
+                return (
+                    f"Exit code: 124\nCommand timed out after {timeout_seconds} seconds; its process group was terminated "
+                    f"(shell session restarted in {shell.cwd}; exported variables were reset)"
+                    f"\n--- OUTPUT ---\n{output.strip()}"
                 )
+            if status == "exited":
+                output += "\n(shell exited; a new shell session was started)"
+            elif cache_as is not None and exit_code == 0:
+                _command_cache.put(*cache_as, exit_code, output)
+            return _format_result(exit_code, output, usage)
 
-            return f"Exit code: {result.returncode}\n--- OUTPUT ---\n{output.strip()}"
-
-        except subprocess.TimeoutExpired:
-            return f"Exit code: 124\nCommand timed out after {timeout_seconds} seconds\n--- OUTPUT ---\n{output.strip()}"
         except Exception as e:
             env_info = get_environment_info()
             return f"""Exit code: 1
@@ -337,12 +1400,93 @@ Environment Info:
 --- OUTPUT ---
 {output.strip()}"""
 
+    def _execute_one_shot(self, command, timeout_seconds, cwd=None, cache_as=None, deadline=None):
+        """
+        Execute a command in a fresh shell process, streaming its output into a bounded buffer.
+
+        With a monotonic `deadline` (the call's timeout less time spent queueing), the
+        command is stopped then instead of `timeout_seconds` after it starts.
+        """
+        buffer = _OutputBuffer(encoding=locale.getpreferredencoding(False))
+        try:
+            # Preprocess command for OS-specific syntax (e.g., Windows path conversion)
+            processed_command = preprocess_command(command)
+
+            env = _get_shell_pool(session_key(self.context)).environment(self.env)
+            started = time.monotonic()
+            process = _spawn(_SHELL_CMD + [processed_command], cwd=cwd or os.getcwd(), env=env)
+            reader = threading.Thread(
+                target=_drain_pipe, args=(process.stdout, buffer), daemon=True
+            )
+            reader.start()
+
+            try:
+                process.wait(timeout=timeout_seconds if deadline is None else max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                _terminate_process_group(process)
+                process.wait()
+                reader.join(timeout=1)
+                self._record_usage(command, 124, _CommandUsage(time.monotonic() - started))
+                return f"Exit code: 124\nCommand timed out after {timeout_seconds} seconds; its process tree was terminated\n--- OUTPUT ---\n{buffer.getvalue().strip()}"
+
+            reader.join()
+            process.stdout.close()
+            usage = _CommandUsage(time.monotonic() - started)
+            self._record_usage(command, process.returncode, usage)
+            output = buffer.getvalue()
+            if cache_as is not None and process.returncode == 0:
+                _command_cache.put(*cache_as, process.returncode, output)
+            return _format_result(process.returncode, output, usage)
+
+        except Exception as e:
+            env_info = get_environment_info()
+            return f"""Exit code: 1
+Error executing command: {str(e)}
+
+Environment Info:
+{env_info}
+
+--- OUTPUT ---
+{buffer.getvalue().strip()}"""
+
+    def _record_usage(self, command, exit_code, usage):
+        """Keep the resource usage of recent commands in the agent context."""
+        if self.context is None or usage is None:
+            return
+        history = self.context.get("bash_command_usage", [])
+        history.append({"command": command, "exit_code": exit_code, **usage.as_dict()})
+        self.context.set("bash_command_usage", history[-_MAX_USAGE_HISTORY:])
+
     @staticmethod
     def get_shell_info():
         """Get information about the shell being used."""
         return f"Shell: {_SHELL_TYPE} | OS: {_SYSTEM} | Command: {' '.join(_SHELL_CMD)}"
 
 
+def _busy_result(timeout_seconds):
+    """Result for a command that never got a free shell before its timeout."""
+    return (
+        f"Exit code: 124\nCommand timed out after {timeout_seconds} seconds waiting for a free shell "
+        f"({_MAX_CONCURRENT_COMMANDS} commands already running). Wait for running commands to finish "
+        "or combine commands with '&&'."
+    )
+
+
+def _format_result(exit_code, output, usage=None, note=None):
+    """Format a finished command's exit code, resource usage and output for the agent."""
+    header = f"Exit code: {exit_code}"
+    if usage is not None:
+        header += f"\n{usage.describe()}"
+    if note:
+        header += f"\n{note}"
+
+    # Handle empty output
+    if not output.strip():
+        return f"{header}\n(Command completed with no output)"
+
+    return f"{header}\n--- OUTPUT ---\n{output.strip()}"
+
+
 def get_environment_info():
     """Get detailed environment information for debugging."""
     return f"""OS: {_SYSTEM}
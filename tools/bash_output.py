@@ -0,0 +1,73 @@
+from typing import Optional
+
+from agency_swarm.tools import BaseTool
+from pydantic import Field
+
+from shared.file_registry import session_key
+from tools.bash import get_background_job, list_background_jobs
+
+
+class BashOutput(BaseTool):
+    """
+    Reads output from a background job started with Bash(run_in_background=true).
+
+    Usage:
+    - Each call returns only the output produced since the previous call for that job, along with the job's status (running, or its exit code and resource usage once finished).
+    - Set wait_seconds to block until the job finishes or the wait elapses, whichever comes first. Use this instead of polling in a tight loop or running `sleep` in Bash.
+    - Very long output keeps only the most recent part; skipped bytes are reported.
+    - Omit job_id to list the background jobs of this session and their status.
+    """
+
+    job_id: Optional[str] = Field(
+        None,
+        description="The id of the background job returned by Bash. Omit to list all background jobs.",
+    )
+    wait_seconds: int = Field(
+        0,
+        description="Seconds to wait for the job to finish before returning (0 returns immediately, max 600).",
+        ge=0,
+        le=600,
+    )
+
+    def run(self):
+        try:
+            session = session_key(self.context)
+
+            if not self.job_id:
+                jobs = list_background_jobs(session)
+                if not jobs:
+                    return "No background jobs in this session"
+                return "\n".join(f"{job.status_line()}: {job.command}" for job in jobs)
+
+            job = get_background_job(session, self.job_id)
+            if job is None:
+                return f"Error: No background job with id: {self.job_id}"
+
+            waited_out = False
+            if self.wait_seconds and job.running:
+                waited_out = not job.wait(self.wait_seconds)
+
+            # Read the status first so output written before the job finished is never missed
+            status = job.status_line()
+            output = job.read_new_output()
+            if waited_out:
+                status += f" (still running after waiting {self.wait_seconds}s)"
+            elif job.usage is not None:
+                status += f"\n{job.usage.describe()}"
+
+            if not output.strip():
+                return f"{status}\n(no new output)"
+            return f"{status}\n--- NEW OUTPUT ---\n{output.strip()}"
+
+        except Exception as e:
+            return f"Error reading background job output: {str(e)}"
+
+
+# Create alias for Agency Swarm tool loading (expects class name = file name)
+bash_output = BashOutput
+
+if __name__ == "__main__":
+    from tools.bash import Bash
+
+    print(Bash(command="for i in 1 2 3; do echo tick $i; sleep 1; done", run_in_background=True).run())
+    print(BashOutput().run())
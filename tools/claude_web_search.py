@@ -1,7 +1,221 @@
-from litellm import Reasoning, responses
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
 from agency_swarm.tools import BaseTool
+from litellm import Reasoning, aresponses
 from pydantic import Field
-from typing import Optional, List, Union
+
+_MODEL = "anthropic/claude-sonnet-4-20250514"
+
+
+def _normalize_query(query: str) -> str:
+    """Case, spacing and trailing punctuation do not change what a search finds."""
+    return re.sub(r"\s+", " ", query).strip().rstrip("?!. ").lower()
+
+
+def _normalize_link(link: str) -> str:
+    parts = urlsplit(link.strip())
+    path = parts.path.rstrip("/")
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ""))
+
+
+def _cache_key(query: str, links: List[str]) -> str:
+    payload = [_MODEL, _normalize_query(query), sorted(_normalize_link(link) for link in links)]
+    return hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest()
+
+
+class _SearchCache:
+    """
+    On-disk cache of search results, one JSON file per normalized query and link set.
+
+    Entries older than ttl_seconds are ignored and removed; beyond
+    max_entries, the oldest files are deleted.
+    """
+
+    def __init__(self, directory: str, ttl_seconds: float, max_entries: int = 1000):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the cached entry ({"text", "created", ...}) if present and within the TTL."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if time.time() - entry.get("created", 0) > self.ttl_seconds:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return entry
+
+    def put(self, key: str, query: str, links: List[str], text: str) -> None:
+        entry = {"query": query, "links": links, "created": time.time(), "text": text}
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(entry, file)
+            os.replace(temp_path, path)
+            self._evict()
+        except OSError:
+            # Unwritable cache directory: searching still works, just uncached
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def _evict(self) -> None:
+        with os.scandir(self.directory) as entries:
+            files = [
+                (entry.stat().st_mtime_ns, entry.path)
+                for entry in entries
+                if entry.name.endswith(".json")
+            ]
+        if len(files) <= self.max_entries:
+            return
+        for _, path in sorted(files)[: len(files) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# Persistent result cache; set WEB_SEARCH_CACHE=false to disable
+_search_cache: Optional[_SearchCache] = (
+    _SearchCache(
+        os.getenv("WEB_SEARCH_CACHE_DIR")
+        or os.path.join(os.path.expanduser("~"), ".cache", "agency-code", "web_search"),
+        ttl_seconds=float(os.getenv("WEB_SEARCH_CACHE_TTL", str(24 * 3600))),
+    )
+    if os.getenv("WEB_SEARCH_CACHE", "true").lower() == "true"
+    else None
+)
+
+# Searches in progress by cache key, so concurrent identical searches share one model call
+_in_flight_lock = threading.Lock()
+_in_flight: Dict[str, Future] = {}
+
+
+async def _search(query: str, links: List[str]) -> str:
+    """Run one web search through the model and return its answer text, without blocking the event loop."""
+    # Prepare links context if provided
+    links_context = ""
+    if links:
+        links_context = " Prioritize these links if relevant: " + ", ".join(links)
+
+    response = await aresponses(
+        model=_MODEL,
+        input=[
+            {
+                "role": "system",
+                "content": (
+                    "You are a helpful assistant that searches the web for information. "
+                    "IMPORTANT: Only return the TOP 3 MOST RELEVANT results. "
+                    "Do not explore more than 3 sources. "
+                    "Return the information concisely and exactly as found. "
+                    "If the user needs comprehensive documentation, recommend using WebFetch tool with specific URLs."
+                )
+            },
+            {
+                "role": "user",
+                "content": f"Search for: {query}{links_context}. Return only the TOP 3 most relevant results."
+            }
+        ],
+        tools=[{
+            "type": "web_search_preview",
+            "search_context_size": "medium"  # Changed from "high" to "medium" to reduce context usage
+        }],
+        reasoning=Reasoning(effort="low"),  # Changed from "medium" to "low" to save tokens
+        temperature=0,
+    )
+    return response.output[-1].content[-1].text
+
+
+class _SearchAbandoned(Exception):
+    """The caller running a shared search was cancelled; waiters run it themselves."""
+
+
+def _settle(key: str, future: Future, result: Optional[str] = None, exception: Optional[BaseException] = None) -> None:
+    """Stop sharing an in-flight search and hand its outcome to the waiters."""
+    with _in_flight_lock:
+        if _in_flight.get(key) is future:
+            del _in_flight[key]
+    if future.done():
+        return
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
+
+
+async def _cached_search(query: str, links: List[str]) -> tuple:
+    """
+    Return (text, age_seconds) for a search, from the cache when possible.
+
+    age_seconds is None for a fresh result. If the same search is already
+    running (in any thread or event loop), this awaits that result instead
+    of calling the model again. Cancelling a waiter does not affect the
+    shared search; if the caller running it is cancelled, a waiter runs the
+    search instead. Failed searches are not cached.
+    """
+    key = _cache_key(query, links)
+    while True:
+        if _search_cache is not None:
+            entry = _search_cache.get(key)
+            if entry is not None:
+                return entry["text"], time.time() - entry["created"]
+
+        with _in_flight_lock:
+            future = _in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = _in_flight[key] = Future()
+        if owner:
+            break
+        try:
+            # shield: cancelling this waiter must not cancel the shared future
+            return await asyncio.shield(asyncio.wrap_future(future)), None
+        except _SearchAbandoned:
+            continue
+
+    try:
+        text = await _search(query, links)
+    except Exception as e:
+        _settle(key, future, exception=e)
+        raise
+    except BaseException:
+        # Cancelled: never hand CancelledError to the waiters, let one of them search instead
+        _settle(key, future, exception=_SearchAbandoned())
+        raise
+    try:
+        if _search_cache is not None:
+            _search_cache.put(key, query, links, text)
+    finally:
+        _settle(key, future, result=text)
+    return text, None
+
+
+def _describe_age(seconds: float) -> str:
+    if seconds < 3600:
+        return f"{max(1, int(seconds // 60))} min"
+    return f"{seconds / 3600:.1f} h"
 
 
 class ClaudeWebSearch(BaseTool):
@@ -14,6 +228,7 @@ class ClaudeWebSearch(BaseTool):
     - Results are limited to the top 3 most relevant matches
     - For user-provided URLs or API documentation, use WebFetch tool instead (no limits)
     - Use this tool ONLY for general research when you don't have a specific URL
+    - Results are cached for a day by query (ignoring case, spacing and trailing punctuation) and links; cached results say how old they are
 
     Usage:
     - Plan your search query carefully - you only get one shot
@@ -38,52 +253,26 @@ class ClaudeWebSearch(BaseTool):
         ]
     )
 
-    def run(self):
+    async def run(self):
         """
         Executes a SINGLE focused web search and returns top 3 results.
 
+        The model call is awaited, so other work on the event loop keeps running during the search.
+
         Returns:
             str: Search results limited to 3 most relevant matches, or error message
         """
         try:
-            # Prepare links context if provided (limit to 3)
-            links_context = ""
-            if self.links:
-                limited_links = self.links[:3]  # Limit to 3 links
-                links_context = " Prioritize these links if relevant: " + ", ".join(limited_links)
-
-            response = responses(
-                model="anthropic/claude-sonnet-4-20250514",
-                input=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are a helpful assistant that searches the web for information. "
-                            "IMPORTANT: Only return the TOP 3 MOST RELEVANT results. "
-                            "Do not explore more than 3 sources. "
-                            "Return the information concisely and exactly as found. "
-                            "If the user needs comprehensive documentation, recommend using WebFetch tool with specific URLs."
-                        )
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Search for: {self.query}{links_context}. Return only the TOP 3 most relevant results."
-                    }
-                ],
-                tools=[{
-                    "type": "web_search_preview",
-                    "search_context_size": "medium"  # Changed from "high" to "medium" to reduce context usage
-                }],
-                reasoning=Reasoning(effort="low"),  # Changed from "medium" to "low" to save tokens
-                temperature=0,
-            )
+            limited_links = (self.links or [])[:3]  # Limit to 3 links
+            text, age = await _cached_search(self.query, limited_links)
 
             # Track search in context (if available)
             if self.context is not None:
                 search_count = self.context.get("web_search_count", 0)
                 self.context.set("web_search_count", search_count + 1)
 
-            return f"Web search results for: '{self.query}'\n\n{response.output[-1].content[-1].text}"
+            note = f" (cached result from {_describe_age(age)} ago)" if age is not None else ""
+            return f"Web search results for: '{self.query}'{note}\n\n{text}"
         except Exception as e:
             return f"Error performing web search: {str(e)}"
 
@@ -99,4 +288,4 @@ if __name__ == "__main__":
     current_file = __file__
 
     tool = ClaudeWebSearch(queries=["What is the latest version of the agency-swarm framework?", "How does fast API integration work in agency-swarm? Provide a full code example."], links=["https://platform.openai.com/docs/api-reference/files/create", "https://agency-swarm.ai/llms.txt"])
-    print(tool.run())
+    print(asyncio.run(tool.run()))
@@ -4,8 +4,13 @@ from typing import Optional
 from agency_swarm.tools import BaseTool
 from pydantic import Field
 
-# Import the global read files registry
-from tools.read import _global_read_files
+from shared.diff_utils import compact_diff
+from shared.file_registry import (
+    check_stale_read,
+    fingerprint_written_file,
+    read_registry,
+    session_key,
+)
 
 
 class Edit(BaseTool):
@@ -19,6 +24,8 @@ class Edit(BaseTool):
     - Only use emojis if the user explicitly requests it. Avoid adding emojis to files unless asked.
     - The edit will FAIL if `old_string` is not unique in the file. Either provide a larger string with more surrounding context to make it unique or use `replace_all` to change every instance of `old_string`.
     - Use `replace_all` for replacing and renaming strings across the file. This parameter is useful if you want to rename a variable for instance.
+    - If the file was modified on disk after you read it, the edit is rejected with the changed line ranges. Read the file again before retrying.
+    - A successful edit returns a compact unified diff of the change, so there is no need to Read the file again to verify it.
     """
 
     file_path: str = Field(..., description="The absolute path to the file to modify")
@@ -35,18 +42,8 @@ class Edit(BaseTool):
         try:
             # Check if the file has been read first (YAML precondition)
             abs_file_path = os.path.abspath(self.file_path)
-            file_has_been_read = False
-
-            # Check in shared state first
-            if self.context is not None:
-                read_files = self.context.get("read_files", set())
-                file_has_been_read = abs_file_path in read_files
-
-            # Check global fallback if not found in context
-            if not file_has_been_read:
-                file_has_been_read = abs_file_path in _global_read_files
-
-            if not file_has_been_read:
+            session = session_key(self.context)
+            if not read_registry.has_read(session, abs_file_path):
                 return "Error: You must use Read tool at least once before editing this file. This tool will error if you attempt an edit without reading the file first."
 
             # Validate that old_string and new_string are different
@@ -61,6 +58,11 @@ class Edit(BaseTool):
             if not os.path.isfile(self.file_path):
                 return f"Error: Path is not a file: {self.file_path}"
 
+            # Refuse to modify a file that changed on disk since it was last read
+            stale_read_error = check_stale_read(session, abs_file_path)
+            if stale_read_error:
+                return stale_read_error
+
             # Read the file
             try:
                 with open(self.file_path, "r", encoding="utf-8") as file:
@@ -108,48 +110,16 @@ class Edit(BaseTool):
             try:
                 with open(self.file_path, "w", encoding="utf-8") as file:
                     file.write(new_content)
-
-                # Create a short diff-like preview snippet (first and last replacement context)
-                preview_lines = []
-                old_preview_indices = []
-                start_idx = 0
-                while True:
-                    idx = content.find(self.old_string, start_idx)
-                    if idx == -1:
-                        break
-                    old_preview_indices.append(idx)
-                    start_idx = idx + len(self.old_string)
-                    if not self.replace_all and len(old_preview_indices) >= 1:
-                        break
-
-                def make_context(src: str, idx: int, needle: str, repl: str) -> str:
-                    a = max(0, idx - 30)
-                    b = min(len(src), idx + len(needle) + 30)
-                    before = src[a:idx]
-                    after = src[idx + len(needle) : b]
-                    return f"...{before}[{needle}->{repl}]{after}..."
-
-                if old_preview_indices:
-                    first_idx = old_preview_indices[0]
-                    preview_lines.append(
-                        make_context(
-                            content, first_idx, self.old_string, self.new_string
-                        )
-                    )
-                    if self.replace_all and len(old_preview_indices) > 1:
-                        last_idx = old_preview_indices[-1]
-                        if last_idx != first_idx:
-                            preview_lines.append(
-                                make_context(
-                                    content, last_idx, self.old_string, self.new_string
-                                )
-                            )
-
-                preview = "\n".join(preview_lines) if preview_lines else ""
+                read_registry.record_write(
+                    session,
+                    abs_file_path,
+                    fingerprint_written_file(self.file_path, new_content),
+                )
 
                 msg = f"Successfully replaced {replacement_count} occurrence(s) in {self.file_path}"
-                if preview:
-                    msg += f"\nPreview:\n{preview}"
+                diff = compact_diff(content, new_content, self.file_path)
+                if diff:
+                    msg += f"\nDiff:\n{diff}"
                 return msg
 
             except PermissionError:
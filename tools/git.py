@@ -1,25 +1,920 @@
 import os
-from typing import List, Optional
+import re
+import stat
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
 from agency_swarm.tools import BaseTool
 from pydantic import Field
 
+# Process-wide caches shared by all Git tool calls
+_cache_lock = threading.Lock()
+# index path -> (index stat key, index object, index mtime_ns)
+_index_cache: Dict[str, Tuple[tuple, object, int]] = {}
+# HEAD tree id -> {path: (mode, sha)} for staged-change comparison
+_MAX_CACHED_TREES = 8
+_tree_cache: "OrderedDict[bytes, Dict[bytes, Tuple[int, bytes]]]" = OrderedDict()
+# worktree file -> (size, mtime_ns, inode, blob id) of files hashed by status
+_MAX_HASHED_FILES = 65536
+_worktree_hashes: "OrderedDict[bytes, Tuple[int, int, int, bytes]]" = OrderedDict()
+
+
+# Open repositories keyed by resolved worktree root, least recently used evicted
+_MAX_OPEN_REPOS = 8
+_repo_cache: "OrderedDict[str, _RepoHandle]" = OrderedDict()
+
+# Files and directories whose mtimes change when HEAD, refs or packs change
+_REPO_TOKEN_PATHS = (
+    "HEAD",
+    "packed-refs",
+    "refs",
+    os.path.join("refs", "heads"),
+    os.path.join("refs", "tags"),
+    os.path.join("refs", "remotes"),
+    os.path.join("logs", "HEAD"),
+    os.path.join("objects", "pack"),
+)
+
+
+class _RepoHandle:
+    """An open dulwich Repo reused across calls, with the token it was opened under."""
+
+    def __init__(self, repo, token: tuple):
+        self.repo = repo
+        self.token = token
+        # dulwich pack readers are not safe for concurrent use
+        self.lock = threading.RLock()
+
+
+def _find_repo_root(path: str) -> str:
+    """Walk up from `path` to the directory containing .git."""
+    from dulwich.errors import NotGitRepository
+
+    current = os.path.realpath(path)
+    while True:
+        if os.path.exists(os.path.join(current, ".git")):
+            return current
+        parent = os.path.dirname(current)
+        if parent == current:
+            raise NotGitRepository(f"No git repository was found at {path}")
+        current = parent
+
+
+def _repo_token(controldir: str) -> tuple:
+    tokens = []
+    for name in _REPO_TOKEN_PATHS:
+        try:
+            st = os.stat(os.path.join(controldir, name))
+            tokens.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            tokens.append(None)
+    return tuple(tokens)
+
+
+def _open_repo(path: str) -> _RepoHandle:
+    """
+    Return a cached handle for the repository containing `path`.
+
+    Handles keep dulwich's loaded pack indexes and object caches between
+    calls; one is reopened when HEAD, refs or the pack directory changed.
+    """
+    from dulwich.repo import Repo
+
+    root = _find_repo_root(path)
+    with _cache_lock:
+        handle = _repo_cache.get(root)
+    if handle is not None:
+        if _repo_token(handle.repo.controldir()) == handle.token:
+            with _cache_lock:
+                if root in _repo_cache:
+                    _repo_cache.move_to_end(root)
+            return handle
+
+    repo = Repo(root)
+    handle = _RepoHandle(repo, _repo_token(repo.controldir()))
+    evicted = []
+    with _cache_lock:
+        previous = _repo_cache.pop(root, None)
+        if previous is not None:
+            evicted.append(previous)
+        _repo_cache[root] = handle
+        while len(_repo_cache) > _MAX_OPEN_REPOS:
+            evicted.append(_repo_cache.popitem(last=False)[1])
+    for old in evicted:
+        # Wait for any call still using the old handle before closing its pack files
+        with old.lock:
+            old.repo.close()
+    return handle
+
+
+def _decode_path(path) -> str:
+    return path.decode("utf-8", errors="replace") if isinstance(path, bytes) else path
+
+
+def _timestamp_ns(value) -> int:
+    """Index entries store times as (seconds, nanoseconds) or as a number of seconds."""
+    if isinstance(value, tuple):
+        return value[0] * 1_000_000_000 + value[1]
+    return int(value * 1_000_000_000)
+
+
+def _load_index(repo) -> Tuple[object, int]:
+    """
+    Return the repository index and its mtime, parsing the file only when it changed.
+
+    The parsed index is cached keyed by the index file's size, mtime and inode.
+    """
+    index_path = repo.index_path()
+    st = os.stat(index_path)
+    key = (st.st_size, st.st_mtime_ns, st.st_ino)
+    with _cache_lock:
+        cached = _index_cache.get(index_path)
+        if cached is not None and cached[0] == key:
+            return cached[1], cached[2]
+    index = repo.open_index()
+    with _cache_lock:
+        _index_cache[index_path] = (key, index, st.st_mtime_ns)
+    return index, st.st_mtime_ns
+
+
+def _iter_tree(repo, tree_id):
+    """Recursively iterate the blobs of a tree (module function in newer dulwich)."""
+    try:
+        from dulwich.object_store import iter_tree_contents
+    except ImportError:
+        return repo.object_store.iter_tree_contents(tree_id)
+    return iter_tree_contents(repo.object_store, tree_id)
+
+
+def _head_tree_entries(repo) -> Dict[bytes, Tuple[int, bytes]]:
+    """Flatten the HEAD tree into {path: (mode, sha)}, cached by tree id."""
+    try:
+        tree_id = repo[repo.head()].tree
+    except KeyError:
+        # No commits yet
+        return {}
+    return _tree_entries(repo, tree_id)
+
+
+def _tree_entries(repo, tree_id: bytes) -> Dict[bytes, Tuple[int, bytes]]:
+    """Flatten a tree into {path: (mode, sha)}, cached by tree id."""
+    with _cache_lock:
+        entries = _tree_cache.get(tree_id)
+        if entries is not None:
+            _tree_cache.move_to_end(tree_id)
+            return entries
+    entries = {entry.path: (entry.mode, entry.sha) for entry in _iter_tree(repo, tree_id)}
+    with _cache_lock:
+        _tree_cache[tree_id] = entries
+        if len(_tree_cache) > _MAX_CACHED_TREES:
+            _tree_cache.popitem(last=False)
+    return entries
+
+
+def _worktree_blob_id(repo, fs_path: bytes, tree_path: bytes, st, normalizer) -> bytes:
+    """Hash a worktree file as a blob, reusing the result while its stat data is unchanged."""
+    from dulwich.index import blob_from_path_and_stat
+
+    key = (st.st_size, st.st_mtime_ns, st.st_ino)
+    with _cache_lock:
+        cached = _worktree_hashes.get(fs_path)
+        if cached is not None and cached[:3] == key:
+            return cached[3]
+    blob = blob_from_path_and_stat(fs_path, st)
+    if normalizer is not None:
+        blob = normalizer.checkin_normalize(blob, tree_path)
+    blob_id = blob.id
+    with _cache_lock:
+        _worktree_hashes[fs_path] = key + (blob_id,)
+        _worktree_hashes.move_to_end(fs_path)
+        if len(_worktree_hashes) > _MAX_HASHED_FILES:
+            _worktree_hashes.popitem(last=False)
+    return blob_id
+
+
+def _status_lines(repo) -> List[str]:
+    """
+    Compute `git status` with git's stat-based change detection.
+
+    A worktree file is clean without reading it when its size, mtime and
+    inode match the index entry and the entry is not racily clean (modified
+    no earlier than the index was written). Only the remaining files are
+    hashed, and those hashes are cached by stat data across calls.
+    """
+    from dulwich import index as dulwich_index
+    from dulwich import porcelain
+
+    index, index_mtime_ns = _load_index(repo)
+    root = os.fsencode(repo.path)
+    conflicted_type = getattr(dulwich_index, "ConflictedIndexEntry", None)
+    try:
+        normalizer = repo.get_blob_normalizer()
+    except Exception:
+        normalizer = None
+
+    unstaged = []
+    staged = {"add": [], "delete": [], "modify": []}
+    head_entries = _head_tree_entries(repo)
+    index_paths = set()
+
+    for tree_path, entry in index.items():
+        index_paths.add(tree_path)
+        if conflicted_type is not None and isinstance(entry, conflicted_type):
+            unstaged.append(tree_path)
+            continue
+
+        head_entry = head_entries.get(tree_path)
+        if head_entry is None:
+            staged["add"].append(tree_path)
+        elif head_entry != (entry.mode, entry.sha):
+            staged["modify"].append(tree_path)
+
+        fs_path = os.path.join(root, tree_path.replace(b"/", os.sep.encode()))
+        try:
+            st = os.lstat(fs_path)
+        except FileNotFoundError:
+            unstaged.append(tree_path)
+            continue
+        if stat.S_ISDIR(st.st_mode) or not (stat.S_ISREG(st.st_mode) or stat.S_ISLNK(st.st_mode)):
+            # Submodule checkouts and special files are not compared
+            continue
+
+        mtime_ns = _timestamp_ns(entry.mtime)
+        if (
+            st.st_size == entry.size
+            and st.st_mtime_ns == mtime_ns
+            and (not entry.ino or st.st_ino == entry.ino)
+            and mtime_ns < index_mtime_ns
+        ):
+            continue
+        if _worktree_blob_id(repo, fs_path, tree_path, st, normalizer) != entry.sha:
+            unstaged.append(tree_path)
+
+    staged["delete"] = [path for path in head_entries if path not in index_paths]
+
+    untracked = porcelain.get_untracked_paths(
+        repo.path, repo.path, index, exclude_ignored=True
+    )
+
+    out = []
+    for p in sorted(untracked):
+        out.append(f"?? {_decode_path(p)}")
+    for p in sorted(unstaged):
+        out.append(f" M {_decode_path(p)}")
+    for category, items in staged.items():
+        code = {"add": "A", "delete": "D", "modify": "M"}.get(category, "S")
+        for p in sorted(items):
+            out.append(f" {code} {_decode_path(p)}")
+    return out
+
+
+def _resolve_commit(repo, ref: str):
+    """Resolve a revision such as HEAD, a branch, a sha prefix, HEAD~3 or main^2 to a commit."""
+    from dulwich.objectspec import parse_commit
+
+    base, suffix = re.fullmatch(r"(.+?)((?:[~^]\d*)*)", ref).groups()
+    commit = parse_commit(repo, base.encode("utf-8"))
+    for operator, count in re.findall(r"([~^])(\d*)", suffix):
+        number = int(count) if count else 1
+        try:
+            if operator == "~":
+                for _ in range(number):
+                    commit = repo[commit.parents[0]]
+            elif number:
+                commit = repo[commit.parents[number - 1]]
+        except IndexError:
+            raise KeyError(ref)
+    return commit
+
+
+# Blobs larger than this are reported by size instead of being diffed
+_MAX_DIFF_BLOB_BYTES = 1024 * 1024
+# Like git, a NUL byte in the first 8000 bytes marks a file as binary
+_BINARY_SNIFF_BYTES = 8000
+
+
+def _under_paths(tree_path: bytes, prefixes: Optional[List[bytes]]) -> bool:
+    if prefixes is None:
+        return True
+    return any(tree_path == prefix or tree_path.startswith(prefix + b"/") for prefix in prefixes)
+
+
+def _changed_worktree_files(repo, tree_id: Optional[bytes], prefixes: Optional[List[bytes]]):
+    """
+    Yield (path, old_sha, worktree st or None) for tracked files that differ from a tree.
+
+    Tracked means present in the tree or the index, like `git diff <ref>`.
+    Files whose stat data matches their (non-racy) index entry take the
+    index blob id without being read; others are hashed through the
+    stat-keyed cache shared with status.
+    """
+    index, index_mtime_ns = _load_index(repo)
+    root = os.fsencode(repo.path)
+    old_entries = _tree_entries(repo, tree_id) if tree_id is not None else {}
+    try:
+        normalizer = repo.get_blob_normalizer()
+    except Exception:
+        normalizer = None
+
+    candidates = set(path for path in old_entries if _under_paths(path, prefixes))
+    candidates.update(path for path in index.paths() if _under_paths(path, prefixes))
+
+    for tree_path in sorted(candidates):
+        old_sha = old_entries[tree_path][1] if tree_path in old_entries else None
+        fs_path = os.path.join(root, tree_path.replace(b"/", os.sep.encode()))
+        try:
+            st = os.lstat(fs_path)
+        except FileNotFoundError:
+            if old_sha is not None:
+                yield tree_path, old_sha, None
+            continue
+        if stat.S_ISDIR(st.st_mode) or not (stat.S_ISREG(st.st_mode) or stat.S_ISLNK(st.st_mode)):
+            continue
+
+        entry = index[tree_path] if tree_path in index else None
+        new_sha = None
+        if entry is not None and hasattr(entry, "mtime"):
+            mtime_ns = _timestamp_ns(entry.mtime)
+            if (
+                st.st_size == entry.size
+                and st.st_mtime_ns == mtime_ns
+                and (not entry.ino or st.st_ino == entry.ino)
+                and mtime_ns < index_mtime_ns
+            ):
+                new_sha = entry.sha
+        if new_sha is None:
+            new_sha = _worktree_blob_id(repo, fs_path, tree_path, st, normalizer)
+        if new_sha != old_sha:
+            yield tree_path, old_sha, (fs_path, st)
+
+
+def _read_worktree_side(fs_path: bytes, st) -> Tuple[Optional[bytes], str]:
+    """Return (content, kind) where kind is "text", "binary" or "huge"; content is None unless text."""
+    if stat.S_ISLNK(st.st_mode):
+        return os.fsencode(os.readlink(fs_path)), "text"
+    if st.st_size > _MAX_DIFF_BLOB_BYTES:
+        return None, "huge"
+    with open(fs_path, "rb") as file:
+        head = file.read(_BINARY_SNIFF_BYTES)
+        if b"\0" in head:
+            return None, "binary"
+        return head + file.read(), "text"
+
+
+def _read_blob_side(repo, sha: Optional[bytes]) -> Tuple[Optional[bytes], str]:
+    if sha is None:
+        return b"", "text"
+    data = repo.object_store[sha].as_raw_string()
+    if len(data) > _MAX_DIFF_BLOB_BYTES:
+        return None, "huge"
+    if b"\0" in data[:_BINARY_SNIFF_BYTES]:
+        return None, "binary"
+    return data, "text"
+
+
+def _diff_lines(
+    repo,
+    ref: str,
+    paths: Optional[List[str]],
+    mode: str,
+    max_hunks: int,
+    max_lines: int,
+) -> List[str]:
+    """
+    Diff the working tree against `ref`, rendering only what fits in max_lines.
+
+    mode is "patch", "stat" or "name-only". Files are compared by blob id
+    first, so unchanged files are never read; binary files and blobs over
+    _MAX_DIFF_BLOB_BYTES are reported without being diffed; each file shows
+    at most max_hunks hunks. Once the line budget is spent, remaining files
+    are only counted.
+    """
+    from shared.diff_utils import changed_blocks, compact_diff
+
+    try:
+        tree_id = _resolve_commit(repo, ref).tree
+    except KeyError:
+        if ref != "HEAD":
+            raise ValueError(f"Unknown revision: {ref}")
+        # No commits yet: everything in the index is new
+        tree_id = None
+
+    out: List[str] = []
+    omitted = 0
+    insertions = deletions = files = 0
+    for tree_path, old_sha, new_side in _changed_worktree_files(
+        repo, tree_id, _repo_relative_paths(repo, paths)
+    ):
+        files += 1
+        if len(out) >= max_lines:
+            omitted += 1
+            continue
+        path = _decode_path(tree_path)
+        if mode == "name-only":
+            out.append(path)
+            continue
+
+        old_data, old_kind = _read_blob_side(repo, old_sha)
+        if new_side is None:
+            new_data, new_kind = b"", "text"
+        else:
+            new_data, new_kind = _read_worktree_side(*new_side)
+        skipped = None
+        if "huge" in (old_kind, new_kind):
+            skipped = f"skipped, larger than {_MAX_DIFF_BLOB_BYTES} bytes"
+        elif "binary" in (old_kind, new_kind):
+            skipped = "binary"
+
+        if mode == "stat":
+            if skipped:
+                out.append(f" {path} | {skipped}")
+                continue
+            old_lines = old_data.decode("utf-8", errors="replace").splitlines()
+            new_lines = new_data.decode("utf-8", errors="replace").splitlines()
+            added = removed = 0
+            for o1, o2, n1, n2 in changed_blocks(old_lines, new_lines):
+                removed += o2 - o1
+                added += n2 - n1
+            insertions += added
+            deletions += removed
+            out.append(f" {path} | +{added} -{removed}")
+            continue
+
+        out.append(f"diff --git a/{path} b/{path}")
+        if old_sha is None:
+            out.append("new file")
+        elif new_side is None:
+            out.append("deleted file")
+        if skipped == "binary":
+            out.append(f"Binary files a/{path} and b/{path} differ")
+            continue
+        if skipped:
+            out.append(f"({skipped})")
+            continue
+        diff = compact_diff(
+            old_data.decode("utf-8", errors="replace"),
+            new_data.decode("utf-8", errors="replace"),
+            path,
+            max_lines=max(1, max_lines - len(out) - 2),
+            max_hunks=max_hunks,
+        )
+        out.extend(diff.splitlines())
+
+    if mode == "stat" and files:
+        out.append(f" {files} files changed, {insertions} insertions(+), {deletions} deletions(-)")
+    if omitted:
+        out.append(f"(truncated: {omitted} more changed files not shown; narrow with paths or use stat)")
+    return out
+
+
+_SINCE_UNITS = {
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+    "week": 7 * 86400,
+    "month": 30 * 86400,
+    "year": 365 * 86400,
+}
+
+
+def _parse_since(text: str) -> int:
+    """Parse "YYYY-MM-DD[THH:MM]" (local time unless an offset is given) or "N units ago"."""
+    value = text.strip().lower()
+    match = re.fullmatch(r"(\d+)\s+(minute|hour|day|week|month|year)s?\s+ago", value)
+    if match:
+        return int(time.time()) - int(match.group(1)) * _SINCE_UNITS[match.group(2)]
+    try:
+        return int(datetime.fromisoformat(text.strip()).timestamp())
+    except ValueError:
+        raise ValueError(
+            f"Unrecognized since value {text!r}; use a date like 2024-05-01 or e.g. '2 weeks ago'"
+        )
+
+
+def _repo_relative_paths(repo, paths: Optional[List[str]]) -> Optional[List[bytes]]:
+    """Convert absolute or cwd-relative paths into repository tree paths."""
+    if not paths:
+        return None
+    root = os.path.realpath(repo.path)
+    tree_paths = []
+    for path in paths:
+        full = os.path.realpath(os.path.join(os.getcwd(), path))
+        relative = os.path.relpath(full, root)
+        if relative == os.curdir:
+            return None
+        if relative.startswith(os.pardir):
+            raise ValueError(f"Path is outside the repository: {path}")
+        tree_paths.append(relative.replace(os.sep, "/").encode("utf-8"))
+    return tree_paths
+
+
+def _decode_text(commit, value: bytes) -> str:
+    return value.decode(commit.encoding.decode("ascii") if commit.encoding else "utf-8", errors="replace")
+
+
+def _format_commit_time(timestamp: int, offset: int) -> str:
+    from dulwich.objects import format_timezone
+
+    when = time.strftime("%a %b %d %Y %H:%M:%S", time.gmtime(timestamp + offset))
+    return f"{when} {format_timezone(offset).decode('ascii')}"
+
+
+def _format_commit(commit, oneline: bool) -> List[str]:
+    """Render a commit like porcelain.log, or as a single line."""
+    message = _decode_text(commit, commit.message)
+    if oneline:
+        day = time.strftime("%Y-%m-%d", time.gmtime(commit.author_time + commit.author_timezone))
+        subject = message.strip().split("\n", 1)[0]
+        return [f"{commit.id.decode('ascii')[:7]} {day} {subject}"]
+
+    lines = ["-" * 50, f"commit: {commit.id.decode('ascii')}"]
+    if len(commit.parents) > 1:
+        lines.append("merge: " + "...".join(parent.decode("ascii") for parent in commit.parents[1:]))
+    lines.append(f"Author: {_decode_text(commit, commit.author)}")
+    if commit.author != commit.committer:
+        lines.append(f"Committer: {_decode_text(commit, commit.committer)}")
+    lines.append(f"Date:   {_format_commit_time(commit.author_time, commit.author_timezone)}")
+    lines.append("")
+    lines.extend(message.rstrip("\n").split("\n"))
+    lines.append("")
+    return lines
+
+
+def _log_lines(
+    repo,
+    ref: str,
+    limit: Optional[int],
+    skip: int,
+    since: Optional[str],
+    paths: Optional[List[str]],
+    oneline: bool,
+    max_lines: int,
+) -> List[str]:
+    """
+    Walk history from `ref` lazily, newest first, producing one page of log output.
+
+    The walk stops as soon as the page is full (limit commits or max_lines
+    lines), so the cost depends on the page requested rather than on the
+    size of the history.
+    """
+    try:
+        start = _resolve_commit(repo, ref)
+    except KeyError:
+        if ref == "HEAD":
+            return ["(no commits)"]
+        raise ValueError(f"Unknown revision: {ref}")
+
+    walker = repo.get_walker(
+        include=[start.id],
+        paths=_repo_relative_paths(repo, paths),
+        since=_parse_since(since) if since else None,
+        # One extra entry tells whether another page exists
+        max_entries=skip + limit + 1 if limit is not None else None,
+    )
+
+    out: List[str] = []
+    shown = 0
+    for position, entry in enumerate(walker):
+        if position < skip:
+            continue
+        if limit is not None and shown == limit:
+            out.append(f"(more commits available: use skip={skip + shown})")
+            break
+        lines = _format_commit(entry.commit, oneline)
+        if len(out) + len(lines) > max_lines:
+            out.append(f"(truncated: use skip={skip + shown} to continue)")
+            break
+        out.extend(lines)
+        shown += 1
+    return out
+
+
+# Commit graph cache persisted inside the control directory, one per repository
+_HISTORY_CACHE_FILE = "agent_history_cache.json"
+_HISTORY_CACHE_VERSION = 1
+_commit_graphs: Dict[str, "_CommitGraph"] = {}
+
+
+class _CommitGraph:
+    """
+    Parents, metadata and changed paths of every commit reachable from the refs asked about.
+
+    Commits are immutable, so entries never go stale: `update` only walks
+    commits missing from the graph, stopping at the first known ancestor.
+    Changed paths are recorded against the first parent (everything for a
+    root commit), and a path -> commits index answers history queries
+    without reading any objects. The graph is saved as JSON in the
+    repository's control directory after each update.
+    """
+
+    def __init__(self, cache_path: str):
+        self.cache_path = cache_path
+        # sha -> (parents, commit_time, author_time, author_tz, author, subject, paths)
+        self.commits: Dict[str, tuple] = {}
+        self.by_path: Dict[str, set] = {}
+
+    @classmethod
+    def load(cls, cache_path: str) -> "_CommitGraph":
+        import json
+
+        graph = cls(cache_path)
+        try:
+            with open(cache_path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+            if data.get("version") == _HISTORY_CACHE_VERSION:
+                for sha, record in data["commits"].items():
+                    graph._add(sha, tuple(record))
+        except (OSError, ValueError, KeyError, TypeError):
+            # Missing or unreadable cache: rebuild from the object store
+            graph.commits.clear()
+            graph.by_path.clear()
+        return graph
+
+    def _add(self, sha: str, record: tuple) -> None:
+        self.commits[sha] = record
+        for path in record[6]:
+            self.by_path.setdefault(path, set()).add(sha)
+
+    def save(self) -> None:
+        import json
+
+        payload = {"version": _HISTORY_CACHE_VERSION, "commits": self.commits}
+        temp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(payload, file, separators=(",", ":"))
+            os.replace(temp_path, self.cache_path)
+        except OSError:
+            # Read-only repository: the graph still serves this process
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def update(self, repo, tip: bytes) -> None:
+        """Add every commit reachable from `tip` that is not in the graph yet."""
+        from dulwich.diff_tree import tree_changes
+
+        added = False
+        pending = [tip.decode("ascii")]
+        while pending:
+            sha = pending.pop()
+            if sha in self.commits:
+                continue
+            commit = repo[sha.encode("ascii")]
+            parents = [parent.decode("ascii") for parent in commit.parents]
+            parent_tree = repo[commit.parents[0]].tree if commit.parents else None
+            paths = set()
+            for change in tree_changes(repo.object_store, parent_tree, commit.tree):
+                for side in (change.old, change.new):
+                    if side is not None and side.path is not None:
+                        paths.add(side.path.decode("utf-8", errors="surrogateescape"))
+            message = _decode_text(commit, commit.message).strip()
+            self._add(
+                sha,
+                (
+                    parents,
+                    commit.commit_time,
+                    commit.author_time,
+                    commit.author_timezone,
+                    _decode_text(commit, commit.author).split(" <", 1)[0],
+                    message.split("\n", 1)[0],
+                    sorted(paths),
+                ),
+            )
+            added = True
+            pending.extend(parent for parent in parents if parent not in self.commits)
+        if added:
+            self.save()
+
+    def touches(self, sha: str, prefixes: List[str]) -> bool:
+        for prefix in prefixes:
+            commits = self.by_path.get(prefix)
+            if commits is not None and sha in commits:
+                return True
+        # Directory prefixes: scan the commit's own change list
+        return bool(_matching_paths(self.commits[sha][6], prefixes))
+
+    def history(self, start: str, prefixes: List[str]):
+        """Yield commits reachable from `start` that change one of `prefixes`, newest first."""
+        import heapq
+
+        seen = {start}
+        queue = [(-self.commits[start][1], start)]
+        while queue:
+            _, sha = heapq.heappop(queue)
+            if self.touches(sha, prefixes):
+                yield sha, self.commits[sha]
+            for parent in self.commits[sha][0]:
+                if parent not in seen:
+                    seen.add(parent)
+                    heapq.heappush(queue, (-self.commits[parent][1], parent))
+
+
+def _matching_paths(paths: List[str], prefixes: List[str]) -> List[str]:
+    return [
+        path
+        for path in paths
+        if any(path == prefix or path.startswith(prefix + "/") for prefix in prefixes)
+    ]
+
+
+def _commit_graph(repo, tip: bytes) -> _CommitGraph:
+    """Return the repository's commit graph, brought up to date with `tip`."""
+    controldir = repo.controldir()
+    with _cache_lock:
+        graph = _commit_graphs.get(controldir)
+    if graph is None:
+        graph = _CommitGraph.load(os.path.join(controldir, _HISTORY_CACHE_FILE))
+        with _cache_lock:
+            _commit_graphs[controldir] = graph
+    graph.update(repo, tip)
+    return graph
+
+
+def _format_day(timestamp: int, offset: int) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(timestamp + offset))
+
+
+def _history_prefixes(repo, paths: Optional[List[str]], command: str) -> List[str]:
+    tree_paths = _repo_relative_paths(repo, paths)
+    if not tree_paths:
+        raise ValueError(f"{command} requires paths (a file or directory inside the repository)")
+    return [path.decode("utf-8", errors="surrogateescape") for path in tree_paths]
+
+
+def _file_history_lines(
+    repo,
+    ref: str,
+    paths: Optional[List[str]],
+    limit: Optional[int],
+    skip: int,
+    since: Optional[str],
+    max_lines: int,
+) -> List[str]:
+    """List commits reachable from `ref` that changed `paths`, answered from the commit graph."""
+    prefixes = _history_prefixes(repo, paths, "file_history")
+    start = _resolve_commit(repo, ref).id
+    graph = _commit_graph(repo, start)
+    since_time = _parse_since(since) if since else None
+
+    out: List[str] = []
+    position = shown = 0
+    for sha, record in graph.history(start.decode("ascii"), prefixes):
+        if since_time is not None and record[1] < since_time:
+            continue
+        position += 1
+        if position <= skip:
+            continue
+        if (limit is not None and shown == limit) or len(out) >= max_lines:
+            out.append(f"(more commits available: use skip={skip + shown})")
+            break
+        _, _, author_time, author_tz, author, subject, changed = record
+        # Name the files when a directory or several paths were asked about
+        files = _matching_paths(changed, prefixes)
+        detail = f" [{', '.join(files)}]" if files != prefixes else ""
+        out.append(f"{sha[:7]} {_format_day(author_time, author_tz)} {author}: {subject}{detail}")
+        shown += 1
+    return out or ["(no commits)"]
+
+
+def _blob_lines(repo, tree_id: bytes, path: bytes) -> List[str]:
+    from dulwich.object_store import tree_lookup_path
+
+    try:
+        mode, blob_id = tree_lookup_path(repo.__getitem__, tree_id, path)
+    except KeyError:
+        return []
+    if stat.S_ISDIR(mode):
+        return []
+    return repo[blob_id].as_raw_string().decode("utf-8", errors="replace").splitlines()
+
+
+def _blame_lines(
+    repo,
+    ref: str,
+    paths: Optional[List[str]],
+    start_line: int,
+    end_line: Optional[int],
+    max_lines: int,
+) -> List[str]:
+    """
+    Attribute each line of a file at `ref` to the commit that last changed it.
+
+    Walks the first-parent chain using the commit graph, reading the file
+    only at commits that changed it, and stops once every requested line is
+    attributed. Lines brought in by a merge are attributed to the merge.
+    Versions are aligned with changed_blocks (difflib), not git's Myers diff,
+    so moved or ambiguous lines may be attributed differently from `git blame`.
+    """
+    from shared.diff_utils import changed_blocks
+
+    prefixes = _history_prefixes(repo, paths, "blame")
+    if len(prefixes) != 1:
+        raise ValueError("blame takes exactly one file in paths")
+    path = prefixes[0]
+    tree_path = path.encode("utf-8", "surrogateescape")
+
+    start = _resolve_commit(repo, ref)
+    graph = _commit_graph(repo, start.id)
+    lines = _blob_lines(repo, start.tree, tree_path)
+    if not lines:
+        raise ValueError(f"{path} does not exist at {ref} (or is empty)")
+
+    first = max(1, start_line) - 1
+    last = min(len(lines), end_line if end_line is not None else len(lines))
+    last = min(last, first + max_lines)
+    # Requested line number -> its index in the version being examined
+    positions: Dict[int, int] = {number: number for number in range(first, last)}
+    owners: Dict[int, str] = {}
+
+    sha = start.id.decode("ascii")
+    current = lines
+    while positions:
+        parents = graph.commits[sha][0]
+        if path in graph.commits[sha][6]:
+            previous = _blob_lines(repo, repo[parents[0].encode("ascii")].tree, tree_path) if parents else []
+            # Map indexes in `current` to `previous`; indexes inside a changed block belong to sha
+            mapping: Dict[int, Optional[int]] = {}
+            blocks = changed_blocks(previous, current)
+            for number, index in positions.items():
+                mapped = index
+                for o1, o2, n1, n2 in blocks:
+                    if index < n1:
+                        break
+                    mapped = None if index < n2 else index - n2 + o2
+                mapping[number] = mapped
+            for number, index in mapping.items():
+                if index is None:
+                    owners[number] = sha
+                    del positions[number]
+                else:
+                    positions[number] = index
+            current = previous
+        if not parents:
+            for number in positions:
+                owners[number] = sha
+            break
+        sha = parents[0]
+
+    width = len(str(last))
+    out = []
+    for number in range(first, last):
+        record = graph.commits[owners[number]]
+        author = record[4][:16]
+        out.append(
+            f"{owners[number][:7]} ({author:<16} {_format_day(record[2], record[3])} "
+            f"{number + 1:>{width}}) {lines[number]}"
+        )
+    if last < (end_line if end_line is not None else len(lines)) and last < len(lines):
+        out.append(f"(truncated: use start_line={last + 1} to continue)")
+    return out
+
 
 class Git(BaseTool):
     """Read-only git operations using dulwich library only.
 
-    Supports: status, diff, log, show. All operations are safe and non-destructive.
+    Supports: status, diff, log, show, file_history, blame. All operations are safe and non-destructive.
+    status compares index stat data with the worktree and only hashes files whose stat changed.
+    diff compares the working tree with ref (tracked files only) and supports path filters, stat and name_only
+    summaries and a per-file hunk cap; binary files and blobs over 1 MB are listed but not diffed.
+    log walks history lazily from ref and supports paging (limit/skip), a since date, path filters and oneline output;
+    prefer small pages (e.g. limit=20, oneline=true) over reading the whole history.
+    file_history lists the commits that changed paths and blame attributes the lines of one file (paths=[file],
+    optionally start_line/end_line) to commits; both are answered from a commit graph cached in the .git directory
+    and updated incrementally, so prefer them over running `git log -p` or `git blame` through Bash. blame aligns
+    file versions with its own line diff rather than git's, so moved lines and runs of identical lines can be
+    attributed to a different commit than `git blame` reports (typically 1-3% of lines in actively edited files);
+    use `git blame` through Bash when exact attribution of such lines matters.
     """
 
-    cmd: str = Field(..., description="Git command: status, diff, log, show")
-    ref: str = Field("HEAD", description="Git reference for diff/show operations")
+    cmd: str = Field(..., description="Git command: status, diff, log, show, file_history, blame")
+    ref: str = Field("HEAD", description="Git reference for diff/show operations, and the starting point for log")
     max_lines: int = Field(20000, description="Max output lines")
+    limit: Optional[int] = Field(
+        None, ge=1, description="log/file_history: maximum number of commits to return"
+    )
+    skip: int = Field(0, ge=0, description="log/file_history: number of commits to skip before the page starts")
+    since: Optional[str] = Field(
+        None, description="log/file_history: only commits after this date, e.g. '2024-05-01' or '2 weeks ago'"
+    )
+    paths: Optional[List[str]] = Field(
+        None,
+        description="log/diff/file_history: only commits or changes that touch these files or directories; blame: the file",
+    )
+    oneline: bool = Field(False, description="log: one line per commit (short sha, date, subject)")
+    stat: bool = Field(False, description="diff: per-file added/removed line counts instead of patches")
+    name_only: bool = Field(False, description="diff: only the names of changed files")
+    max_hunks: int = Field(20, ge=1, description="diff: maximum hunks shown per file")
+    start_line: int = Field(1, ge=1, description="blame: first line to attribute (1-based)")
+    end_line: Optional[int] = Field(None, ge=1, description="blame: last line to attribute (inclusive)")
 
     def run(self):
         try:
-            from io import StringIO
-
-            from dulwich import porcelain
+            import dulwich  # noqa: F401
         except Exception:
             return (
                 "Exit code: 1\n"
@@ -28,37 +923,30 @@ class Git(BaseTool):
             )
 
         try:
-            repo = porcelain.open_repo(os.getcwd())
+            handle = _open_repo(os.getcwd())
         except Exception as e:
             return f"Exit code: 1\nError opening git repo: {e}"
 
+        with handle.lock:
+            return self._run_command(handle.repo)
+
+    def _run_command(self, repo):
+        from io import StringIO
+
+        from dulwich import porcelain
+
         try:
             if self.cmd == "status":
-                st = porcelain.status(repo)
-                out = []
-                for p in sorted(st.untracked):
-                    name = p.decode() if isinstance(p, bytes) else p
-                    out.append(f"?? {name}")
-                for p in sorted(st.unstaged):
-                    name = p.decode() if isinstance(p, bytes) else p
-                    out.append(f" M {name}")
-                staged = getattr(st, "staged", {}) or {}
-                for category, items in staged.items():
-                    code = {"add": "A", "delete": "D", "modify": "M"}.get(category, "S")
-                    for p in items:
-                        name = p.decode() if isinstance(p, bytes) else p
-                        out.append(f" {code} {name}")
+                out = _status_lines(repo)
                 return "\n".join(out) or "(clean)"
 
             if self.cmd == "diff":
-                # Show unstaged changes using dulwich
-                out = StringIO()
+                # Working tree vs ref, computing only what will be shown
                 try:
-                    # Get working tree vs HEAD diff
-                    porcelain.diff_tree(repo, repo.head(), None, outstream=out)
-                    lines = out.getvalue().splitlines()
-                    if len(lines) > self.max_lines:
-                        lines = lines[: self.max_lines] + ["(truncated)"]
+                    mode = "name-only" if self.name_only else "stat" if self.stat else "patch"
+                    lines = _diff_lines(
+                        repo, self.ref, self.paths, mode, self.max_hunks, self.max_lines
+                    )
                     return "\n".join(lines)
                 except Exception as e:
                     return f"Exit code: 1\nError in diff: {e}"
@@ -76,11 +964,28 @@ class Git(BaseTool):
                     return f"Exit code: 1\nError in show: {e}"
 
             if self.cmd == "log":
-                out = StringIO()
-                porcelain.log(repo, outstream=out)
-                lines = out.getvalue().splitlines()
-                if len(lines) > self.max_lines:
-                    lines = lines[: self.max_lines] + ["(truncated)"]
+                lines = _log_lines(
+                    repo,
+                    self.ref,
+                    self.limit,
+                    self.skip,
+                    self.since,
+                    self.paths,
+                    self.oneline,
+                    self.max_lines,
+                )
+                return "\n".join(lines)
+
+            if self.cmd == "file_history":
+                lines = _file_history_lines(
+                    repo, self.ref, self.paths, self.limit, self.skip, self.since, self.max_lines
+                )
+                return "\n".join(lines)
+
+            if self.cmd == "blame":
+                lines = _blame_lines(
+                    repo, self.ref, self.paths, self.start_line, self.end_line, self.max_lines
+                )
                 return "\n".join(lines)
 
             return "Exit code: 1\nUnknown cmd"
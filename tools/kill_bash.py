@@ -0,0 +1,49 @@
+from agency_swarm.tools import BaseTool
+from pydantic import Field
+
+from shared.file_registry import session_key
+from tools.bash import get_background_job
+
+
+class KillBash(BaseTool):
+    """
+    Stops a background job started with Bash(run_in_background=true).
+
+    Usage:
+    - Stops the job's whole process group, including any processes it started (test workers, dev servers): SIGTERM first, then SIGKILL for anything still running after 2 seconds.
+    - Returns the job's final status and any output not yet read with BashOutput.
+    """
+
+    job_id: str = Field(..., description="The id of the background job to stop.")
+
+    def run(self):
+        try:
+            job = get_background_job(session_key(self.context), self.job_id)
+            if job is None:
+                return f"Error: No background job with id: {self.job_id}"
+
+            if not job.running:
+                message = f"{job.status_line()}; nothing to kill"
+            else:
+                job.kill()
+                message = job.status_line()
+
+            output = job.read_new_output()
+            if output.strip():
+                message += f"\n--- NEW OUTPUT ---\n{output.strip()}"
+            return message
+
+        except Exception as e:
+            return f"Error killing background job: {str(e)}"
+
+
+# Create alias for Agency Swarm tool loading (expects class name = file name)
+kill_bash = KillBash
+
+if __name__ == "__main__":
+    from tools.bash import Bash
+
+    result = Bash(command="sleep 300", run_in_background=True).run()
+    print(result)
+    job_id = result.split()[3]
+    print(KillBash(job_id=job_id).run())
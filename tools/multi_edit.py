@@ -4,8 +4,13 @@ from typing import List, Optional
 from agency_swarm.tools import BaseTool
 from pydantic import BaseModel, Field
 
-# Import the global read files registry
-from tools.read import _global_read_files
+from shared.diff_utils import compact_diff
+from shared.file_registry import (
+    check_stale_read,
+    fingerprint_written_file,
+    read_registry,
+    session_key,
+)
 
 
 class EditOperation(BaseModel):
@@ -36,6 +41,8 @@ class MultiEdit(BaseTool):
     - Each edit operates on the result of the previous edit
     - All edits must be valid for the operation to succeed - if any edit fails, none will be applied
     - This tool is ideal when you need to make several changes to different parts of the same file
+    - If the file was modified on disk after you read it, the edits are rejected with the changed line ranges. Read the file again before retrying
+    - A successful multi-edit returns a compact unified diff of all changes, so there is no need to Read the file again to verify them
     - For Jupyter notebooks (.ipynb files), use the NotebookEdit instead
 
     CRITICAL REQUIREMENTS:
@@ -70,6 +77,9 @@ class MultiEdit(BaseTool):
 
     def run(self):
         try:
+            abs_file_path = os.path.abspath(self.file_path)
+            session = session_key(self.context)
+
             # Check if this is a new file creation (first edit has empty old_string)
             creating_new_file = len(self.edits) > 0 and self.edits[0].old_string == ""
 
@@ -101,16 +111,14 @@ class MultiEdit(BaseTool):
                     return f"Error: Path is not a file: {self.file_path}"
 
                 # Enforce prior Read for all existing files
-                abs_file_path = os.path.abspath(self.file_path)
-                file_has_been_read = False
-                if self.context is not None:
-                    read_files = self.context.get("read_files", set())
-                    file_has_been_read = abs_file_path in read_files
-                if not file_has_been_read:
-                    file_has_been_read = abs_file_path in _global_read_files
-                if not file_has_been_read:
+                if not read_registry.has_read(session, abs_file_path):
                     return "Error: You must use Read tool at least once before editing this file. This tool will error if you attempt an edit without reading the file first."
 
+                # Refuse to modify a file that changed on disk since it was last read
+                stale_read_error = check_stale_read(session, abs_file_path)
+                if stale_read_error:
+                    return stale_read_error
+
                 # Read the existing file
                 try:
                     with open(self.file_path, "r", encoding="utf-8") as file:
@@ -120,6 +128,8 @@ class MultiEdit(BaseTool):
 
                 remaining_edits = self.edits
 
+            original_content = content
+
             # Validate all edits before applying any
             for i, edit in enumerate(remaining_edits):
                 # Check that old_string and new_string are different
@@ -150,13 +160,22 @@ class MultiEdit(BaseTool):
             try:
                 with open(self.file_path, "w", encoding="utf-8") as file:
                     file.write(content)
+                read_registry.record_write(
+                    session,
+                    abs_file_path,
+                    fingerprint_written_file(self.file_path, content),
+                )
 
                 if creating_new_file:
                     total_operations = len(self.edits)
                     return f"Successfully created new file {self.file_path} and applied {total_operations} edit operations ({edit_count} total replacements)"
                 else:
                     total_operations = len(self.edits)
-                    return f"Successfully applied {total_operations} edit operations ({edit_count} total replacements) to {self.file_path}"
+                    msg = f"Successfully applied {total_operations} edit operations ({edit_count} total replacements) to {self.file_path}"
+                    diff = compact_diff(original_content, content, self.file_path)
+                    if diff:
+                        msg += f"\nDiff:\n{diff}"
+                    return msg
 
             except PermissionError:
                 return f"Error: Permission denied writing to file: {self.file_path}"
@@ -1,9 +1,217 @@
+import fnmatch
 import json
 import os
-from typing import Literal, Optional
+import threading
+from collections import Counter
+from typing import Dict, List, Literal, Optional, Tuple
 
 from agency_swarm.tools import BaseTool
-from pydantic import Field
+from pydantic import BaseModel, Field
+
+from shared.file_registry import read_registry
+from tools.notebook_read import format_size, measure_output
+
+# Repeated stream lines are collapsed once a run is at least this long
+_MIN_REPEATED_LINES = 3
+
+
+class NotebookEditOperation(BaseModel):
+    cell_id: Optional[str] = Field(
+        None,
+        description="The ID or 0-indexed position of the target cell. For insert, the new cell goes after this cell, or at the beginning if not specified.",
+    )
+    new_source: str = Field("", description="The new source for the cell (unused for delete)")
+    cell_type: Optional[Literal["code", "markdown"]] = Field(
+        None,
+        description="The type of the cell (code or markdown). Required for insert.",
+    )
+    edit_mode: Literal["replace", "insert", "delete"] = Field(
+        "replace",
+        description="The type of edit to make (replace, insert, delete). Defaults to replace.",
+    )
+
+
+class _EditError(ValueError):
+    """An edit that cannot be applied; the message is shown to the agent."""
+
+
+class _CellIndex:
+    """
+    Cell id -> position map over a notebook's cell list.
+
+    Inserts and deletes only shift the cells after them, so the map is
+    repaired lazily from the first changed position on the next lookup.
+    """
+
+    def __init__(self, cells: list):
+        self.cells = cells
+        self._positions: Dict[str, int] = {}
+        self._stale_from: Optional[int] = 0
+
+    def _refresh(self) -> None:
+        start = self._stale_from
+        if start is None:
+            return
+        for cell_id in [cell_id for cell_id, i in self._positions.items() if i >= start]:
+            del self._positions[cell_id]
+        for i in range(start, len(self.cells)):
+            cell_id = self.cells[i].get("id")
+            if isinstance(cell_id, str):
+                # The first cell with a duplicated id wins, as in a linear scan
+                self._positions.setdefault(cell_id, i)
+        self._stale_from = None
+
+    def __contains__(self, cell_id: str) -> bool:
+        self._refresh()
+        return cell_id in self._positions
+
+    def find(self, cell_id: Optional[str]) -> Optional[int]:
+        """Position of the first cell whose id or position matches `cell_id`."""
+        if cell_id is None:
+            return 0  # Default to first cell
+        self._refresh()
+        position = self._positions.get(cell_id)
+        if cell_id.isdigit() and int(cell_id) < len(self.cells):
+            position = int(cell_id) if position is None else min(position, int(cell_id))
+        return position
+
+    def insert(self, position: int, cell: dict) -> None:
+        self.cells.insert(position, cell)
+        self._mark_stale(position)
+
+    def pop(self, position: int) -> dict:
+        cell = self.cells.pop(position)
+        self._mark_stale(position)
+        return cell
+
+    def _mark_stale(self, position: int) -> None:
+        if self._stale_from is None or position < self._stale_from:
+            self._stale_from = position
+
+
+def _text(value) -> str:
+    return "".join(value) if isinstance(value, list) else str(value)
+
+
+def _lines(text: str) -> List[str]:
+    """Split text into the list-of-lines form notebooks store multiline strings in."""
+    return text.splitlines(keepends=True)
+
+
+def _collapse_stream(text: str) -> Tuple[str, int]:
+    """
+    Reduce stream text to what a terminal would end up showing.
+
+    Carriage-return updates (progress bars) keep only their last state and
+    runs of identical lines are collapsed to one line and a repeat note.
+    Returns the new text and the number of lines or updates dropped.
+    """
+    dropped = 0
+    shown = []
+    for line in text.split("\n"):
+        if "\r" in line:
+            updates = [update for update in line.split("\r") if update]
+            dropped += max(0, len(updates) - 1)
+            line = updates[-1] if updates else ""
+        shown.append(line)
+
+    trailing_newline = shown[-1] == ""
+    if trailing_newline:
+        shown.pop()
+    collapsed = []
+    i = 0
+    while i < len(shown):
+        run = 1
+        while i + run < len(shown) and shown[i + run] == shown[i]:
+            run += 1
+        if run >= _MIN_REPEATED_LINES:
+            collapsed.append(shown[i])
+            collapsed.append(f"... (previous line repeated {run - 1} more times)")
+            dropped += run - 1
+        else:
+            collapsed.extend(shown[i:i + run])
+        i += run
+    result = "\n".join(collapsed) + ("\n" if trailing_newline else "")
+    return result, dropped
+
+
+def _truncate_text(text: str, limit: int) -> str:
+    """Keep the beginning and end of text longer than limit characters."""
+    half = limit // 2
+    omitted = len(text) - 2 * half
+    return f"{text[:half]}\n... [{omitted} characters truncated] ...\n{text[len(text) - half:]}"
+
+
+class _Compaction:
+    """Strips and shortens the outputs of notebook cells, counting what it changed."""
+
+    def __init__(self, strip_mime_types: List[str], max_chars: int):
+        self.strip_mime_types = strip_mime_types
+        self.max_chars = max_chars
+        self.removed: Counter = Counter()
+        self.removed_chars = 0
+        self.truncated = 0
+        self.merged = 0
+        self.collapsed_lines = 0
+
+    def compact(self, outputs: list) -> list:
+        compacted = []
+        for output in outputs:
+            output = dict(output)
+            previous = compacted[-1] if compacted else None
+            if (
+                output.get("output_type") == "stream"
+                and previous is not None
+                and previous.get("output_type") == "stream"
+                and previous.get("name") == output.get("name")
+            ):
+                # Consecutive writes to the same stream display as one block
+                previous["text"] = _text(previous.get("text", "")) + _text(output.get("text", ""))
+                self.merged += 1
+                continue
+            compacted.append(output)
+
+        for output in compacted:
+            if output.get("output_type") == "stream":
+                self._compact_stream(output)
+            elif isinstance(output.get("data"), dict):
+                self._compact_data(output)
+        return compacted
+
+    def _compact_stream(self, output: dict) -> None:
+        text, dropped = _collapse_stream(_text(output.get("text", "")))
+        self.collapsed_lines += dropped
+        if len(text) > self.max_chars:
+            text = _truncate_text(text, self.max_chars)
+            self.truncated += 1
+        output["text"] = _lines(text)
+
+    def _compact_data(self, output: dict) -> None:
+        data = {}
+        removed = []
+        for (mime, size), value in zip(measure_output(output), output["data"].values()):
+            if any(fnmatch.fnmatch(mime, pattern) for pattern in self.strip_mime_types):
+                removed.append((mime, size))
+            elif size <= self.max_chars:
+                data[mime] = value
+            elif mime == "text/plain":
+                data[mime] = _lines(_truncate_text(_text(value), self.max_chars))
+                self.truncated += 1
+            else:
+                removed.append((mime, size))
+
+        for mime, size in removed:
+            self.removed[mime] += 1
+            self.removed_chars += size
+        if removed:
+            if "text/plain" not in data:
+                notes = ", ".join(f"{mime} output removed ({format_size(size)})" for mime, size in removed)
+                data["text/plain"] = [f"[{notes}]"]
+            removed_types = {mime for mime, _ in removed}
+            metadata = output.get("metadata")
+            if isinstance(metadata, dict):
+                output["metadata"] = {key: value for key, value in metadata.items() if key not in removed_types}
+        output["data"] = data
 
 
 class NotebookEdit(BaseTool):
@@ -19,6 +227,12 @@ class NotebookEdit(BaseTool):
     - edit_mode=replace (default): replaces the content of the targeted cell. If cell_type is provided, the cell's type will also be updated.
     - edit_mode=insert: inserts a new cell AFTER the cell specified by cell_id; if cell_id is not provided, inserts at the beginning. cell_type is required when inserting.
     - edit_mode=delete: deletes the targeted cell.
+    - edit_mode=compact_outputs: shrinks the outputs of every code cell (or only the cell given by cell_id) and rewrites the notebook compactly. Outputs whose MIME type matches strip_mime_types (e.g. "image/*", "text/html") are removed; text/plain and stream output longer than max_output_chars keeps its beginning and end, and larger rich outputs are removed. Repeated stream lines and progress-bar updates are collapsed. Use NotebookRead with output_sizes=true to see which cells carry large outputs.
+
+    Batch edits:
+    - To change several cells, pass edits (a list of {cell_id, new_source, cell_type, edit_mode}) instead of the single-cell fields. The notebook is loaded and saved once.
+    - Edits are applied in order, each to the result of the previous one, so numeric cell_ids refer to positions after the earlier edits.
+    - All edits must succeed or none are applied. The notebook is replaced atomically, so it is never left half-written.
     """
 
     notebook_path: str = Field(
@@ -29,14 +243,30 @@ class NotebookEdit(BaseTool):
         None,
         description="The ID of the cell to edit. When inserting a new cell, the new cell will be inserted after the cell with this ID, or at the beginning if not specified.",
     )
-    new_source: str = Field(..., description="The new source for the cell")
+    new_source: Optional[str] = Field(
+        None, description="The new source for the cell. Required for replace and insert unless edits is given."
+    )
     cell_type: Optional[Literal["code", "markdown"]] = Field(
         None,
         description="The type of the cell (code or markdown). If not specified, it defaults to the current cell type. If using edit_mode=insert, this is required.",
     )
-    edit_mode: Optional[Literal["replace", "insert", "delete"]] = Field(
+    edit_mode: Optional[Literal["replace", "insert", "delete", "compact_outputs"]] = Field(
         "replace",
-        description="The type of edit to make (replace, insert, delete). Defaults to replace.",
+        description="The type of edit to make (replace, insert, delete, compact_outputs). Defaults to replace.",
+    )
+    strip_mime_types: Optional[List[str]] = Field(
+        None,
+        description='For edit_mode=compact_outputs: output MIME types to remove, wildcards allowed (e.g. ["image/*", "text/html"]).',
+    )
+    max_output_chars: int = Field(
+        10000,
+        ge=0,
+        description="For edit_mode=compact_outputs: outputs larger than this many characters are truncated (text) or removed (rich outputs).",
+    )
+    edits: Optional[List[NotebookEditOperation]] = Field(
+        None,
+        min_length=1,
+        description="Several edits to apply in order with a single load and save, instead of cell_id/new_source/cell_type/edit_mode.",
     )
 
     def run(self):
@@ -57,6 +287,12 @@ class NotebookEdit(BaseTool):
             if not self.notebook_path.endswith(".ipynb"):
                 return f"Error: File is not a Jupyter notebook (.ipynb): {self.notebook_path}"
 
+            if self.edits is not None:
+                if self.cell_id is not None or self.new_source is not None or self.cell_type is not None:
+                    return "Error: Provide either edits or the single-cell fields (cell_id, new_source, cell_type), not both"
+            elif self.new_source is None and self.edit_mode not in ("delete", "compact_outputs"):
+                return f"Error: new_source is required when using edit_mode={self.edit_mode or 'replace'}"
+
             # Read and parse the notebook
             try:
                 with open(self.notebook_path, "r", encoding="utf-8") as f:
@@ -74,127 +310,186 @@ class NotebookEdit(BaseTool):
             if not isinstance(cells, list):
                 return f"Error: Invalid notebook format - 'cells' is not a list"
 
-            # Handle different edit modes
-            if self.edit_mode == "insert":
-                return self._insert_cell(notebook_data, cells)
-            elif self.edit_mode == "delete":
-                return self._delete_cell(notebook_data, cells)
-            else:  # replace mode
-                return self._replace_cell(notebook_data, cells)
+            index = _CellIndex(cells)
+            if self.edits is not None:
+                return self._apply_edits(notebook_data, index)
+            if self.edit_mode == "compact_outputs":
+                return self._compact_outputs(notebook_data, index)
+
+            edit = NotebookEditOperation(
+                cell_id=self.cell_id,
+                new_source=self.new_source or "",
+                cell_type=self.cell_type,
+                edit_mode=self.edit_mode or "replace",
+            )
+            try:
+                summary = self._apply_edit(index, edit)
+            except _EditError as e:
+                return f"Error: {e}"
+
+            # Save the notebook
+            self._save_notebook(notebook_data)
+
+            if edit.edit_mode == "delete":
+                return f"Successfully {summary} from {self.notebook_path}. Notebook now has {len(cells)} cells."
+            return f"Successfully {summary} in {self.notebook_path}"
 
         except Exception as e:
             return f"Error editing notebook: {str(e)}"
 
-    def _find_cell_index(self, cells):
-        """Find the index of the cell to edit."""
+    def _apply_edits(self, notebook_data, index):
+        """Apply every edit in memory, then save once; nothing is saved if any edit fails."""
+        summaries = []
+        for i, edit in enumerate(self.edits):
+            try:
+                summaries.append(self._apply_edit(index, edit))
+            except _EditError as e:
+                return f"Error in edit {i + 1}: {e}. No edits were applied."
+
+        self._save_notebook(notebook_data)
+
+        lines = [
+            f"Successfully applied {len(self.edits)} edits to {self.notebook_path}. Notebook now has {len(index.cells)} cells:"
+        ]
+        lines.extend(f"{i}. {summary}" for i, summary in enumerate(summaries, 1))
+        return "\n".join(lines)
+
+    def _compact_outputs(self, notebook_data, index):
+        """Strip, truncate and deduplicate cell outputs, then rewrite the notebook compactly if any changed."""
         if self.cell_id is None:
-            return 0  # Default to first cell
+            targets = index.cells
+        else:
+            cell_index = index.find(self.cell_id)
+            if cell_index is None:
+                return f"Error: Cell with ID '{self.cell_id}' not found in notebook"
+            targets = [index.cells[cell_index]]
 
-        for i, cell in enumerate(cells):
-            # Check both 'id' field and index-based matching
-            if "id" in cell and cell["id"] == self.cell_id:
-                return i
-            elif self.cell_id.isdigit() and i == int(self.cell_id):
-                return i
+        compaction = _Compaction(self.strip_mime_types or [], self.max_output_chars)
+        changed_cells = 0
+        for cell in targets:
+            outputs = cell.get("outputs")
+            if not isinstance(outputs, list) or not outputs:
+                continue
+            compacted = compaction.compact(outputs)
+            if compacted != outputs:
+                cell["outputs"] = compacted
+                changed_cells += 1
+
+        if not changed_cells:
+            return f"Outputs are already compact; {self.notebook_path} was left unchanged"
+
+        size_before = os.path.getsize(self.notebook_path)
+        self._save_notebook(notebook_data, indent=1)
+        size_after = os.path.getsize(self.notebook_path)
+
+        lines = [
+            f"Successfully compacted outputs of {changed_cells} cells in {self.notebook_path}: "
+            f"{format_size(size_before)} -> {format_size(size_after)}"
+        ]
+        if compaction.removed:
+            removed = ", ".join(f"{mime} x{count}" for mime, count in sorted(compaction.removed.items()))
+            lines.append(f"Removed {format_size(compaction.removed_chars)} of outputs: {removed}")
+        if compaction.truncated:
+            lines.append(f"Truncated {compaction.truncated} outputs to {self.max_output_chars} characters")
+        if compaction.merged or compaction.collapsed_lines:
+            lines.append(
+                f"Merged {compaction.merged} stream outputs and collapsed {compaction.collapsed_lines} repeated lines or progress updates"
+            )
+        return "\n".join(lines)
+
+    def _apply_edit(self, index, edit):
+        """Apply one edit to the in-memory notebook and describe it."""
+        if edit.edit_mode == "insert":
+            return self._insert_cell(index, edit)
+        elif edit.edit_mode == "delete":
+            return self._delete_cell(index, edit)
+        else:  # replace mode
+            return self._replace_cell(index, edit)
+
+    def _target_index(self, index, edit, empty_error):
+        """Find the cell an edit targets, raising _EditError when there is none."""
+        if len(index.cells) == 0:
+            raise _EditError(empty_error)
+
+        cell_index = index.find(edit.cell_id)
+        if cell_index is None:
+            raise _EditError(f"Cell with ID '{edit.cell_id}' not found in notebook")
 
-        return None  # Cell not found
+        if cell_index >= len(index.cells):
+            raise _EditError(f"Cell index {cell_index} is out of range (notebook has {len(index.cells)} cells)")
+        return cell_index
 
-    def _insert_cell(self, notebook_data, cells):
+    def _insert_cell(self, index, edit):
         """Insert a new cell."""
         # cell_type is required for insert mode
-        if self.cell_type is None:
-            return "Error: cell_type is required when using edit_mode=insert"
+        if edit.cell_type is None:
+            raise _EditError("cell_type is required when using edit_mode=insert")
 
         # Find insertion point
-        if self.cell_id is None:
+        if edit.cell_id is None:
             insert_index = 0  # Insert at beginning
         else:
-            cell_index = self._find_cell_index(cells)
+            cell_index = index.find(edit.cell_id)
             if cell_index is None:
-                return f"Error: Cell with ID '{self.cell_id}' not found in notebook"
+                raise _EditError(f"Cell with ID '{edit.cell_id}' not found in notebook")
             insert_index = cell_index + 1  # Insert after the found cell
 
         # Create new cell
         new_cell = {
-            "cell_type": self.cell_type,
-            "source": self._format_source(self.new_source),
+            "cell_type": edit.cell_type,
+            "source": self._format_source(edit.new_source),
         }
 
         # Add cell-type specific fields
-        if self.cell_type == "code":
+        if edit.cell_type == "code":
             new_cell["execution_count"] = None
             new_cell["outputs"] = []
 
         # Generate a unique ID for the new cell
-        existing_ids = {cell.get("id", f"cell-{i}") for i, cell in enumerate(cells)}
-        new_id = f"new-cell-{len(cells)}"
+        cell_count = len(index.cells)
+        new_id = f"new-cell-{cell_count}"
         counter = 0
-        while new_id in existing_ids:
+        while new_id in index:
             counter += 1
-            new_id = f"new-cell-{len(cells)}-{counter}"
+            new_id = f"new-cell-{cell_count}-{counter}"
         new_cell["id"] = new_id
 
         # Insert the cell
-        cells.insert(insert_index, new_cell)
+        index.insert(insert_index, new_cell)
 
-        # Save the notebook
-        self._save_notebook(notebook_data)
+        return f"inserted new {edit.cell_type} cell (ID: {new_id}) at position {insert_index}"
 
-        return f"Successfully inserted new {self.cell_type} cell (ID: {new_id}) at position {insert_index} in {self.notebook_path}"
-
-    def _delete_cell(self, notebook_data, cells):
+    def _delete_cell(self, index, edit):
         """Delete a cell."""
-        if len(cells) == 0:
-            return "Error: Cannot delete cell from empty notebook"
-
-        cell_index = self._find_cell_index(cells)
-        if cell_index is None:
-            return f"Error: Cell with ID '{self.cell_id}' not found in notebook"
-
-        if cell_index >= len(cells):
-            return f"Error: Cell index {cell_index} is out of range (notebook has {len(cells)} cells)"
+        cell_index = self._target_index(index, edit, "Cannot delete cell from empty notebook")
 
-        # Get cell info before deletion
-        deleted_cell = cells[cell_index]
+        # Delete the cell
+        deleted_cell = index.pop(cell_index)
         cell_type = deleted_cell.get("cell_type", "unknown")
         cell_id = deleted_cell.get("id", f"cell-{cell_index}")
 
-        # Delete the cell
-        cells.pop(cell_index)
+        return f"deleted {cell_type} cell (ID: {cell_id}) at position {cell_index}"
 
-        # Save the notebook
-        self._save_notebook(notebook_data)
-
-        return f"Successfully deleted {cell_type} cell (ID: {cell_id}) at position {cell_index} from {self.notebook_path}. Notebook now has {len(cells)} cells."
-
-    def _replace_cell(self, notebook_data, cells):
+    def _replace_cell(self, index, edit):
         """Replace the content of an existing cell."""
-        if len(cells) == 0:
-            return "Error: Cannot replace cell in empty notebook"
-
-        cell_index = self._find_cell_index(cells)
-        if cell_index is None:
-            return f"Error: Cell with ID '{self.cell_id}' not found in notebook"
-
-        if cell_index >= len(cells):
-            return f"Error: Cell index {cell_index} is out of range (notebook has {len(cells)} cells)"
+        cell_index = self._target_index(index, edit, "Cannot replace cell in empty notebook")
 
         # Get the cell to modify
-        cell = cells[cell_index]
+        cell = index.cells[cell_index]
         old_cell_type = cell.get("cell_type", "code")
 
         # Update source
-        cell["source"] = self._format_source(self.new_source)
+        cell["source"] = self._format_source(edit.new_source)
 
         # Update cell type if specified
-        if self.cell_type and self.cell_type != old_cell_type:
-            cell["cell_type"] = self.cell_type
+        if edit.cell_type and edit.cell_type != old_cell_type:
+            cell["cell_type"] = edit.cell_type
 
             # Add/remove type-specific fields
-            if self.cell_type == "code" and old_cell_type != "code":
+            if edit.cell_type == "code" and old_cell_type != "code":
                 cell["execution_count"] = None
                 cell["outputs"] = []
-            elif self.cell_type != "code" and old_cell_type == "code":
+            elif edit.cell_type != "code" and old_cell_type == "code":
                 # Remove code-specific fields
                 cell.pop("execution_count", None)
                 cell.pop("outputs", None)
@@ -204,13 +499,10 @@ class NotebookEdit(BaseTool):
             cell["execution_count"] = None
             cell["outputs"] = []
 
-        # Save the notebook
-        self._save_notebook(notebook_data)
-
         cell_id = cell.get("id", f"cell-{cell_index}")
         final_type = cell.get("cell_type", "unknown")
 
-        return f"Successfully replaced content of {final_type} cell (ID: {cell_id}) at position {cell_index} in {self.notebook_path}"
+        return f"replaced content of {final_type} cell (ID: {cell_id}) at position {cell_index}"
 
     def _format_source(self, source_text):
         """Format source text as a list of strings (notebook format)."""
@@ -234,10 +526,22 @@ class NotebookEdit(BaseTool):
 
         return formatted_lines
 
-    def _save_notebook(self, notebook_data):
-        """Save the notebook data to file."""
-        with open(self.notebook_path, "w", encoding="utf-8") as f:
-            json.dump(notebook_data, f, indent=2, ensure_ascii=False)
+    def _save_notebook(self, notebook_data, indent=2):
+        """Save the notebook data to file, replacing it atomically."""
+        temp_path = f"{self.notebook_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(notebook_data, f, indent=indent, ensure_ascii=False)
+            # Keep the notebook's permissions on the replacement file
+            os.chmod(temp_path, os.stat(self.notebook_path).st_mode & 0o7777)
+            os.replace(temp_path, self.notebook_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        read_registry.mark_written()
 
 
 # Create alias for Agency Swarm tool loading (expects class name = file name)
@@ -1,16 +1,222 @@
 import json
 import os
-from typing import Optional
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
 
 from agency_swarm.tools import BaseTool
 from pydantic import Field
 
+# Characters that can start a JSON token the cell scanner cares about
+_STRUCTURE = re.compile(rb'["\[\]{}]')
+
+# Output MIME types shown as text; everything else is only named with its size
+_TEXT_MIME_TYPES = ("text/plain",)
+
+_MAX_INDEXED_NOTEBOOKS = 32
+_index_lock = threading.Lock()
+_index_cache: "OrderedDict[str, Tuple[tuple, List[_CellSpan]]]" = OrderedDict()
+
+
+@dataclass(frozen=True)
+class _CellSpan:
+    """Where a cell's JSON object sits in the notebook file, with its id and type."""
+
+    start: int
+    end: int
+    cell_id: Optional[str]
+    cell_type: Optional[str]
+
+
+class _NotebookFormatError(ValueError):
+    pass
+
+
+def _tokens(data: bytes):
+    """
+    Yield (start, end) of every string and bracket in a JSON document.
+
+    Strings are skipped with bytes.find, so long output payloads cost a
+    memchr rather than a per-character scan.
+    """
+    position = 0
+    search = _STRUCTURE.search
+    while True:
+        match = search(data, position)
+        if match is None:
+            return
+        start = match.start()
+        if data[start] != 0x22:  # not a quote: a bracket
+            position = start + 1
+            yield start, position
+            continue
+        end = data.find(b'"', start + 1)
+        while end != -1:
+            backslashes = 0
+            while data[end - 1 - backslashes] == 0x5C:
+                backslashes += 1
+            if backslashes % 2 == 0:
+                break
+            end = data.find(b'"', end + 1)
+        if end == -1:
+            raise _NotebookFormatError("Invalid notebook format - unterminated string")
+        position = end + 1
+        yield start, position
+
+
+def _scan_cells(data: bytes) -> List[_CellSpan]:
+    """
+    Locate every cell of a notebook without decoding it.
+
+    Walks only strings and brackets (outputs, including base64 payloads,
+    are skipped as single string tokens) to find the byte range of each
+    object in the top-level "cells" array along with its "id" and
+    "cell_type". Raises _NotebookFormatError when the layout is not found.
+    """
+    spans: List[_CellSpan] = []
+    depth = 0
+    in_cells = False
+    awaiting: Optional[bytes] = None
+    cell_start = None
+    cell_fields = {}
+    last_end = 0
+
+    for start, end in _tokens(data):
+        first = data[start]
+        gap = data[last_end:start].strip()
+        last_end = end
+
+        if awaiting is not None:
+            key, awaiting = awaiting, None
+            if key == b'"cells"':
+                if not (gap == b":" and first == 0x5B):
+                    raise _NotebookFormatError("Invalid notebook format - 'cells' is not a list")
+                in_cells = True
+            elif gap == b":" and first == 0x22:
+                cell_fields[key] = json.loads(data[start:end])
+                continue
+
+        if first == 0x22:
+            # Only short strings can be the keys we look for
+            if end - start > 11 or (depth != 1 and cell_start is None):
+                continue
+            token = data[start:end]
+            is_key = data[end:end + 64].lstrip()[:1] == b":"
+            if is_key and depth == 1 and token == b'"cells"' and not in_cells and not spans:
+                awaiting = token
+            elif is_key and cell_start is not None and depth == 3 and token in (b'"id"', b'"cell_type"'):
+                awaiting = token
+            continue
+
+        if first in (0x5B, 0x7B):  # [ or {
+            depth += 1
+            if in_cells and depth == 3 and first == 0x7B:
+                cell_start = start
+                cell_fields = {}
+            continue
+
+        depth -= 1
+        if cell_start is not None and depth == 2 and first == 0x7D:
+            spans.append(
+                _CellSpan(cell_start, end, cell_fields.get(b'"id"'), cell_fields.get(b'"cell_type"'))
+            )
+            cell_start = None
+        elif in_cells and depth == 1 and first == 0x5D:
+            return spans
+
+    raise _NotebookFormatError("Invalid notebook format - no 'cells' key found")
+
+
+def _notebook_cells(path: str) -> List[_CellSpan]:
+    """Return the cell index of a notebook, rescanning only when the file changed."""
+    st = os.stat(path)
+    key = (st.st_size, st.st_mtime_ns, st.st_ino)
+    with _index_lock:
+        cached = _index_cache.get(path)
+        if cached is not None and cached[0] == key:
+            _index_cache.move_to_end(path)
+            return cached[1]
+
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        spans = _scan_cells(data)
+    except _NotebookFormatError:
+        # Let a full parse report syntax errors precisely
+        notebook = json.loads(data)
+        if not isinstance(notebook, dict) or "cells" not in notebook:
+            raise _NotebookFormatError("Invalid notebook format - no 'cells' key found")
+        if not isinstance(notebook["cells"], list):
+            raise _NotebookFormatError("Invalid notebook format - 'cells' is not a list")
+        raise
+
+    with _index_lock:
+        _index_cache[path] = (key, spans)
+        if len(_index_cache) > _MAX_INDEXED_NOTEBOOKS:
+            _index_cache.popitem(last=False)
+    return spans
+
+
+def _find_cell(spans: List[_CellSpan], cell_id: str) -> Optional[int]:
+    """Position of the first cell whose id matches, or whose position matches a numeric cell_id."""
+    candidates = [i for i, span in enumerate(spans) if span.cell_id == cell_id][:1]
+    if cell_id.isdigit() and int(cell_id) < len(spans):
+        candidates.append(int(cell_id))
+    return min(candidates) if candidates else None
+
+
+def _load_cells(path: str, spans: List[_CellSpan]) -> List[dict]:
+    """Parse just the given cells from the notebook file."""
+    cells = []
+    with open(path, "rb") as f:
+        for span in spans:
+            f.seek(span.start)
+            cells.append(json.loads(f.read(span.end - span.start)))
+    return cells
+
+
+def _join(value) -> str:
+    return "".join(value) if isinstance(value, list) else str(value)
+
+
+def format_size(length: int) -> str:
+    if length < 1024:
+        return f"{length} B"
+    if length < 1024 * 1024:
+        return f"{length / 1024:.1f} KB"
+    return f"{length / (1024 * 1024):.1f} MB"
+
+
+def _payload_size(value) -> int:
+    """Characters in an output payload (a string, a list of lines, or JSON data)."""
+    if isinstance(value, (str, list)):
+        return len(_join(value))
+    return len(json.dumps(value))
+
+
+def measure_output(output: dict) -> List[Tuple[str, int]]:
+    """Label and size of each part of a cell output: the stream, each MIME type, or the traceback."""
+    output_type = output.get("output_type", "unknown")
+    if output_type == "stream":
+        return [(f"stream {output.get('name', 'stdout')}", _payload_size(output.get("text", [])))]
+    if output_type in ("execute_result", "display_data"):
+        return [(mime, _payload_size(value)) for mime, value in output.get("data", {}).items()]
+    if output_type == "error":
+        return [("error", _payload_size(output.get("traceback", [])) + len(str(output.get("evalue", ""))))]
+    return [(output_type, len(json.dumps(output)))]
+
 
 class NotebookRead(BaseTool):
     """
     Reads a Jupyter notebook (.ipynb file) and returns all of the cells with their outputs.
     Jupyter notebooks are interactive documents that combine code, text, and visualizations, commonly used for data analysis and scientific computing.
     The notebook_path parameter must be an absolute path, not a relative path.
+    Large notebooks can be read in pages of cells with offset and limit. Only text/plain outputs are shown;
+    images and other rich outputs are listed by MIME type and size without being loaded into the result.
+    Use output_sizes=true to list the size of each cell and its outputs instead of their contents, then read
+    only the cells you need or strip large outputs with NotebookEdit (edit_mode=compact_outputs).
     """
 
     notebook_path: str = Field(
@@ -21,6 +227,20 @@ class NotebookRead(BaseTool):
         None,
         description="The ID of a specific cell to read. If not provided, all cells will be read.",
     )
+    offset: int = Field(
+        0,
+        ge=0,
+        description="The 0-based position of the first cell to read. Only provide if the notebook is too large to read at once.",
+    )
+    limit: Optional[int] = Field(
+        None,
+        ge=1,
+        description="The number of cells to read. Only provide if the notebook is too large to read at once.",
+    )
+    output_sizes: bool = Field(
+        False,
+        description="Report the size of each cell and its outputs instead of the cell contents.",
+    )
 
     def run(self):
         try:
@@ -40,115 +260,129 @@ class NotebookRead(BaseTool):
             if not self.notebook_path.endswith(".ipynb"):
                 return f"Error: File is not a Jupyter notebook (.ipynb): {self.notebook_path}"
 
-            # Read and parse the notebook
+            # Index the notebook's cells (cached until the file changes)
             try:
-                with open(self.notebook_path, "r", encoding="utf-8") as f:
-                    notebook_data = json.load(f)
+                spans = _notebook_cells(self.notebook_path)
             except json.JSONDecodeError as e:
                 return f"Error: Invalid JSON in notebook file: {str(e)}"
+            except _NotebookFormatError as e:
+                return f"Error: {e}"
             except Exception as e:
                 return f"Error reading notebook file: {str(e)}"
 
-            # Validate notebook structure
-            if "cells" not in notebook_data:
-                return f"Error: Invalid notebook format - no 'cells' key found"
-
-            cells = notebook_data["cells"]
-            if not isinstance(cells, list):
-                return f"Error: Invalid notebook format - 'cells' is not a list"
-
             # If specific cell_id requested, find and return that cell
             if self.cell_id:
-                for i, cell in enumerate(cells):
-                    # Check both 'id' field and index-based matching
-                    cell_matches = False
-                    if "id" in cell and cell["id"] == self.cell_id:
-                        cell_matches = True
-                    elif self.cell_id.isdigit() and i == int(self.cell_id):
-                        cell_matches = True
-
-                    if cell_matches:
-                        return self._format_single_cell(cell, i)
-
-                return f"Error: Cell with ID '{self.cell_id}' not found in notebook"
-
-            # Return all cells
-            result = f"Jupyter Notebook: {self.notebook_path}\\n"
-            result += f"Total cells: {len(cells)}\\n\\n"
-
-            for i, cell in enumerate(cells):
-                result += self._format_single_cell(cell, i) + "\\n\\n"
-
-            return result.strip()
+                index = _find_cell(spans, self.cell_id)
+                if index is None:
+                    return f"Error: Cell with ID '{self.cell_id}' not found in notebook"
+                cell = _load_cells(self.notebook_path, [spans[index]])[0]
+                if self.output_sizes:
+                    return self._format_sizes([cell], [spans[index]], index, len(spans))
+                return self._format_single_cell(cell, index)
+
+            # Return the requested page of cells
+            total = len(spans)
+            if self.offset and self.offset >= total:
+                return f"Error: offset {self.offset} is past the last cell (notebook has {total} cells)"
+            end = total if self.limit is None else min(total, self.offset + self.limit)
+            cells = _load_cells(self.notebook_path, spans[self.offset:end])
+            if self.output_sizes:
+                return self._format_sizes(cells, spans[self.offset:end], self.offset, total)
+
+            parts = [f"Jupyter Notebook: {self.notebook_path}", f"Total cells: {total}", ""]
+            for index, cell in enumerate(cells, start=self.offset):
+                parts.append(self._format_single_cell(cell, index))
+                parts.append("")
+            if self.offset or end < total:
+                parts.append(f"Showing cells {self.offset}-{end - 1} of {total}.")
+                if end < total:
+                    parts.append(f"Use offset={end} to read more.")
+
+            return "\n".join(parts).strip()
 
         except Exception as e:
             return f"Error reading notebook: {str(e)}"
 
+    def _format_sizes(self, cells, spans, offset, total):
+        """One line per cell with its size on disk and the size of each output."""
+        parts = [
+            f"Output sizes: {self.notebook_path}",
+            f"Total cells: {total} ({format_size(os.path.getsize(self.notebook_path))})",
+            "",
+        ]
+        outputs_total = 0
+        for index, (cell, span) in enumerate(zip(cells, spans), start=offset):
+            cell_id = cell.get("id", f"cell-{index}")
+            line = f"Cell {index} (ID: {cell_id}, Type: {cell.get('cell_type', 'unknown')}): {format_size(span.end - span.start)}"
+            measured = [part for output in cell.get("outputs") or [] for part in measure_output(output)]
+            if measured:
+                cell_outputs = sum(size for _, size in measured)
+                outputs_total += cell_outputs
+                details = ", ".join(f"{label} {format_size(size)}" for label, size in measured)
+                line += f", outputs {format_size(cell_outputs)}: {details}"
+            parts.append(line)
+
+        end = offset + len(cells)
+        parts.append("")
+        if len(cells) < total:
+            parts.append(f"Showing cells {offset}-{end - 1} of {total}.")
+        parts.append(f"Outputs shown total {format_size(outputs_total)}.")
+        return "\n".join(parts)
+
     def _format_single_cell(self, cell, index):
         """Format a single cell for display."""
         cell_type = cell.get("cell_type", "unknown")
         cell_id = cell.get("id", f"cell-{index}")
 
-        result = f"=== Cell {index} (ID: {cell_id}, Type: {cell_type}) ==="
+        parts = [f"=== Cell {index} (ID: {cell_id}, Type: {cell_type}) ==="]
 
         # Add source code
-        source = cell.get("source", [])
-        if isinstance(source, list):
-            source_text = "".join(source)
-        else:
-            source_text = str(source)
-
+        source_text = _join(cell.get("source", []))
         if source_text.strip():
-            result += f"\\nSource:\\n{source_text}"
+            parts.append(f"Source:\n{source_text}")
         else:
-            result += "\\nSource: [empty]"
+            parts.append("Source: [empty]")
 
         # Add outputs for code cells
         if cell_type == "code" and "outputs" in cell:
             outputs = cell["outputs"]
             if outputs:
-                result += "\\n\\nOutputs:"
+                parts.append("\nOutputs:")
                 for i, output in enumerate(outputs):
-                    result += f"\\n  Output {i + 1}:"
-
                     output_type = output.get("output_type", "unknown")
-                    result += f" (Type: {output_type})"
+                    parts.append(f"  Output {i + 1}: (Type: {output_type})")
 
                     # Handle different output types
                     if output_type == "stream":
-                        text = output.get("text", [])
-                        if isinstance(text, list):
-                            text = "".join(text)
-                        result += f"\\n    {text.strip()}"
+                        parts.append(f"    {_join(output.get('text', [])).strip()}")
 
                     elif output_type in ["execute_result", "display_data"]:
                         data = output.get("data", {})
-                        if "text/plain" in data:
-                            plain_text = data["text/plain"]
-                            if isinstance(plain_text, list):
-                                plain_text = "".join(plain_text)
-                            result += f"\\n    {plain_text.strip()}"
-
-                        # Note other data types
-                        other_types = [k for k in data.keys() if k != "text/plain"]
+                        for mime in _TEXT_MIME_TYPES:
+                            if mime in data:
+                                parts.append(f"    {_join(data[mime]).strip()}")
+
+                        # Name other data types with their size instead of including them
+                        other_types = [
+                            f"{mime} ({format_size(_payload_size(value))})"
+                            for mime, value in data.items()
+                            if mime not in _TEXT_MIME_TYPES
+                        ]
                         if other_types:
-                            result += (
-                                f"\\n    [Also contains: {', '.join(other_types)}]"
-                            )
+                            parts.append(f"    [Also contains: {', '.join(other_types)}]")
 
                     elif output_type == "error":
                         ename = output.get("ename", "Error")
                         evalue = output.get("evalue", "")
-                        result += f"\\n    {ename}: {evalue}"
+                        parts.append(f"    {ename}: {evalue}")
             else:
-                result += "\\n\\nOutputs: [none]"
+                parts.append("\nOutputs: [none]")
 
         # Add execution count for code cells
         if cell_type == "code" and "execution_count" in cell:
-            exec_count = cell["execution_count"]
-            result += f"\\n\\nExecution Count: {exec_count}"
+            parts.append(f"\nExecution Count: {cell['execution_count']}")
 
-        return result
+        return "\n".join(parts)
 
 
 # Create alias for Agency Swarm tool loading (expects class name = file name)
@@ -5,8 +5,12 @@ from typing import Optional
 from agency_swarm.tools import BaseTool
 from pydantic import Field
 
-# Global registry for tracking read files when context is not available
-_global_read_files = set()
+from shared.file_registry import (
+    FileFingerprint,
+    read_registry,
+    session_key,
+    split_lines,
+)
 
 
 class Read(BaseTool):
@@ -38,15 +42,10 @@ class Read(BaseTool):
 
     def run(self):
         try:
-            # Track that this file has been read in shared state (or global fallback)
+            # Track that this file has been read in the session's read registry
             abs_path = os.path.abspath(self.file_path)
-            if self.context is not None:
-                read_files = self.context.get("read_files", set())
-                read_files.add(abs_path)
-                self.context.set("read_files", read_files)
-            # Always mirror into global registry to ensure persistence across tool instances in tests
-            global _global_read_files
-            _global_read_files.add(abs_path)
+            session = session_key(self.context)
+            read_registry.record(session, abs_path)
 
             # Check if path exists
             if not os.path.exists(self.file_path):
@@ -65,17 +64,14 @@ class Read(BaseTool):
             if self.file_path.endswith(".ipynb"):
                 return f"Error: This is a Jupyter notebook file. Please use the NotebookRead tool instead."
 
-            # Try to read the file
-            try:
-                with open(self.file_path, "r", encoding="utf-8") as file:
-                    lines = file.readlines()
-            except UnicodeDecodeError:
-                # Try with different encodings
-                try:
-                    with open(self.file_path, "r", encoding="latin-1") as file:
-                        lines = file.readlines()
-                except UnicodeDecodeError:
-                    return f"Error: Unable to decode file {self.file_path}. It may be a binary file."
+            # Read the raw bytes once so the registry can fingerprint what was seen
+            with open(self.file_path, "rb") as file:
+                data = file.read()
+                stat = os.fstat(file.fileno())
+            lines = split_lines(data)
+            read_registry.record(
+                session, abs_path, FileFingerprint.from_stat(stat, data, lines)
+            )
 
             # Handle empty file
             if not lines:
@@ -1,8 +1,367 @@
+import codecs
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
 from agency_swarm.tools import BaseTool
 from pydantic import Field
-from typing import Optional
-import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from shared.http_cache import HttpCache
+
+# Headers mimicking a browser request
+_REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:123.0) Gecko/20100101 Firefox/123.0',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Sec-Fetch-User': '?1',
+}
+
+# One pooled session for all fetches, so repeated requests to a host reuse connections
+_POOL_SIZE = 16
+_session_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+
+# On-disk HTTP cache; set WEB_FETCH_CACHE=false to disable
+_http_cache: Optional[HttpCache] = (
+    HttpCache(
+        os.getenv("WEB_FETCH_CACHE_DIR")
+        or os.path.join(os.path.expanduser("~"), ".cache", "agency-code", "web_fetch"),
+        max_bytes=int(float(os.getenv("WEB_FETCH_CACHE_MAX_MB", "100")) * 1024 * 1024),
+    )
+    if os.getenv("WEB_FETCH_CACHE", "true").lower() == "true"
+    else None
+)
+
+
+def _get_session() -> requests.Session:
+    """Return the shared session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=_POOL_SIZE, pool_maxsize=_POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update(_REQUEST_HEADERS)
+            _session = session
+        return _session
+
+
+# Requests in flight to one host at a time, across all fetches
+_PER_HOST_LIMIT = 4
+_host_slots_lock = threading.Lock()
+_host_slots: Dict[str, threading.BoundedSemaphore] = {}
+
+# Multi-URL mode: worker threads per call
+_MAX_BATCH_WORKERS = 8
+
+
+@contextmanager
+def _host_slot(url: str):
+    """Hold one of the host's request slots while talking to it."""
+    host = urlsplit(url).netloc.lower()
+    with _host_slots_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = _host_slots[host] = threading.BoundedSemaphore(_PER_HOST_LIMIT)
+    with slot:
+        yield
+
+
+# Responses are streamed and cut off after this many bytes
+_MAX_RESPONSE_BYTES = 5 * 1024 * 1024
+_CHUNK_BYTES = 64 * 1024
+
+
+def _fetch(url: str, timeout: int) -> Tuple[bytes, Dict[str, str], bool]:
+    """
+    GET `url` through the shared session and the HTTP cache.
+
+    Fresh cache entries are returned without a request; stale ones are
+    revalidated with If-None-Match/If-Modified-Since, so an unchanged page
+    costs a 304 instead of a download. The body is streamed and capped at
+    _MAX_RESPONSE_BYTES (capped bodies are not cached). Returns the body,
+    lower-cased response headers and whether the body was cut off; raises
+    requests exceptions like requests.get.
+    """
+    cached = _http_cache.lookup(url) if _http_cache is not None else None
+    if cached is not None and cached.is_fresh():
+        return cached.body, cached.headers, False
+
+    headers = cached.conditional_headers() if cached is not None else {}
+    with _host_slot(url), _get_session().get(url, headers=headers, timeout=timeout, stream=True) as response:
+        if response.status_code == 304 and cached is not None:
+            _http_cache.revalidated(cached, response.headers)
+            return cached.body, cached.headers, False
+        response.raise_for_status()  # Raise exception for bad status codes
+
+        chunks = []
+        size = 0
+        truncated = False
+        for chunk in response.iter_content(chunk_size=_CHUNK_BYTES):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= _MAX_RESPONSE_BYTES:
+                truncated = True
+                break
+        body = b"".join(chunks)[:_MAX_RESPONSE_BYTES]
+        response_headers = {name.lower(): value for name, value in response.headers.items()}
+
+    if _http_cache is not None and response.status_code == 200 and not truncated:
+        _http_cache.store(url, response_headers, body)
+    return body, response_headers, truncated
+
+
+# Elements whose content is never useful as page text
+_SKIPPED_TAGS = frozenset(
+    {"script", "style", "noscript", "template", "svg", "nav", "footer", "header", "iframe"}
+)
+# Elements that start a new line of text
+_BLOCK_TAGS = frozenset(
+    {
+        "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt",
+        "figcaption", "h1", "h2", "h3", "h4", "h5", "h6", "hr", "li", "main", "ol",
+        "p", "pre", "section", "table", "td", "th", "title", "tr", "ul",
+    }
+)
+_VOID_TAGS = frozenset(
+    {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+)
+# Main content shorter than this share of the page text is ignored
+_MIN_MAIN_SHARE = 0.2
+_WHITESPACE = re.compile(r"\s+")
+
+
+class _TextExtractor(HTMLParser):
+    """
+    Incremental HTML-to-text converter.
+
+    Fed in chunks, it emits text as it parses without building a tree:
+    content inside _SKIPPED_TAGS is dropped as soon as the opening tag is
+    seen, whitespace is collapsed except inside <pre>, and block elements
+    start new lines. Text inside <main>, <article> or role="main" elements
+    is also collected separately as the page's likely main content.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.lines: List[str] = []
+        self.main_lines: List[str] = []
+        self._line: List[str] = []
+        self._skip_tag: Optional[str] = None
+        self._skip_depth = 0
+        self._main_tag: Optional[str] = None
+        self._main_depth = 0
+        self._pre_depth = 0
+
+    def _break(self) -> None:
+        if not self._line:
+            return
+        text = "".join(self._line)
+        self._line = []
+        for line in text.split("\n") if self._pre_depth else (text,):
+            line = line.rstrip() if self._pre_depth else line.strip()
+            if line.strip():
+                self.lines.append(line)
+                if self._main_tag is not None:
+                    self.main_lines.append(line)
+
+    def handle_starttag(self, tag, attrs):
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth += 1
+            return
+        if tag in _SKIPPED_TAGS:
+            self._skip_tag = tag
+            self._skip_depth = 1
+            return
+        if tag in _BLOCK_TAGS:
+            self._break()
+        if tag == "pre":
+            self._pre_depth += 1
+        if tag in _VOID_TAGS:
+            return
+        if self._main_tag is None:
+            if tag in ("main", "article") or dict(attrs).get("role") == "main":
+                self._main_tag = tag
+                self._main_depth = 1
+        elif tag == self._main_tag:
+            self._main_depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        if self._skip_tag is None and tag in _BLOCK_TAGS:
+            self._break()
+
+    def handle_endtag(self, tag):
+        if self._skip_tag is not None:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+                if self._skip_depth == 0:
+                    self._skip_tag = None
+            return
+        if tag in _BLOCK_TAGS:
+            self._break()
+        if tag == "pre" and self._pre_depth:
+            self._pre_depth -= 1
+        if tag == self._main_tag:
+            self._main_depth -= 1
+            if self._main_depth == 0:
+                self._break()
+                self._main_tag = None
+
+    def handle_data(self, data):
+        if self._skip_tag is not None:
+            return
+        self._line.append(data if self._pre_depth else _WHITESPACE.sub(" ", data))
+
+    def text(self) -> str:
+        """Finish parsing and return the main content if substantial, else all page text."""
+        self.close()
+        self._break()
+        total = sum(map(len, self.lines))
+        main = sum(map(len, self.main_lines))
+        if total and main >= total * _MIN_MAIN_SHARE:
+            return "\n".join(self.main_lines)
+        return "\n".join(self.lines)
+
+
+def _charset(headers: Dict[str, str], body: bytes) -> str:
+    """Pick the body's encoding from Content-Type, a <meta> charset, or utf-8."""
+    match = re.search(r"charset=[\"']?([\w-]+)", headers.get("content-type", ""), re.I)
+    if match is None:
+        match = re.search(rb"<meta[^>]+charset=[\"']?([\w-]+)", body[:4096], re.I)
+    if match is not None:
+        name = match.group(1)
+        name = name.decode("ascii", errors="ignore") if isinstance(name, bytes) else name
+        try:
+            return codecs.lookup(name).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+def _extract_text(body: bytes, headers: Dict[str, str]) -> str:
+    """Convert a response body to readable text, parsing HTML incrementally."""
+    content_type = headers.get("content-type", "text/html").split(";")[0].strip().lower()
+    decoder = codecs.getincrementaldecoder(_charset(headers, body))(errors="replace")
+    if "html" not in content_type and "xml" not in content_type:
+        if not (content_type.startswith("text/") or content_type.endswith(("json", "javascript"))):
+            raise ValueError(f"unsupported content type {content_type!r}")
+        return decoder.decode(body, final=True)
+
+    extractor = _TextExtractor()
+    for start in range(0, len(body), _CHUNK_BYTES):
+        extractor.feed(decoder.decode(body[start : start + _CHUNK_BYTES]))
+    extractor.feed(decoder.decode(b"", final=True))
+    return extractor.text()
+
+
+def _fetch_text(url: str, timeout: int, deadline: Optional[float] = None) -> Tuple[bool, str, bool]:
+    """
+    Fetch one URL and extract its readable text.
+
+    Returns (success, text, truncated); failures are reported as an
+    "Error: ..." message in place of the text. With a monotonic `deadline`,
+    the request timeout shrinks to the time left.
+    """
+    try:
+        # Validate URL format
+        if not url.startswith(('http://', 'https://')):
+            return False, f"Error: Invalid URL format. URL must start with http:// or https://. Got: {url}", False
+
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False, f"Error: Not fetched within the {timeout} second time limit for URL: {url}", False
+            timeout = max(1.0, remaining)
+
+        # Fetch the URL (pooled connection, cached or revalidated when possible)
+        content, headers, truncated = _fetch(url, timeout)
+
+        try:
+            return True, _page_text(url, content, headers), truncated
+        except ValueError as e:
+            return False, f"Error: Cannot extract text from {url}: {e}", False
+
+    except requests.exceptions.Timeout:
+        return False, f"Error: Request timed out after {timeout:g} seconds for URL: {url}", False
+    except requests.exceptions.ConnectionError:
+        return False, f"Error: Failed to connect to {url}. Please check the URL and your internet connection.", False
+    except requests.exceptions.HTTPError as e:
+        return False, f"Error: HTTP {e.response.status_code} error fetching {url}: {str(e)}", False
+    except Exception as e:
+        return False, f"Error fetching URL {url}: {str(e)}", False
+
+
+def _render_page(url: str, text: str, truncated: bool, offset: int, max_chars: int) -> Tuple[bool, str]:
+    """Render a page's text (from `offset`, at most `max_chars`) as a tool result."""
+    total = len(text)
+    if offset >= total and total:
+        return False, f"Error: offset {offset} is past the end of the text ({total} characters) for URL: {url}"
+    end = min(total, offset + max_chars)
+    text = text[offset:end]
+
+    notes = []
+    if end < total:
+        notes.append(f"[Showing characters {offset}-{end} of {total}. Use offset={end} to read more.]")
+    if truncated:
+        notes.append(f"[Page was cut off after {_MAX_RESPONSE_BYTES} bytes.]")
+    footer = "\n\n" + "\n".join(notes) if notes else ""
+    return True, f"Successfully fetched content from {url}:\n\n{text}{footer}"
+
+
+def _share_budget(lengths: List[int], budget: int) -> List[int]:
+    """
+    Split `budget` characters between texts of the given lengths.
+
+    Texts shorter than an equal share keep their full length and leave the
+    rest to the longer ones, so the shares never add up to more than `budget`.
+    """
+    shares = [0] * len(lengths)
+    remaining = len(lengths)
+    for index in sorted(range(len(lengths)), key=lengths.__getitem__):
+        shares[index] = min(lengths[index], budget // remaining)
+        budget -= shares[index]
+        remaining -= 1
+    return shares
+
+
+# Extracted text of recent pages, so paging through a document parses it once
+_MAX_EXTRACTED_PAGES = 16
+_extracted_lock = threading.Lock()
+_extracted: "OrderedDict[Tuple[str, bytes], str]" = OrderedDict()
+
+
+def _page_text(url: str, body: bytes, headers: Dict[str, str]) -> str:
+    key = (url, hashlib.blake2b(body, digest_size=16).digest())
+    with _extracted_lock:
+        text = _extracted.get(key)
+        if text is not None:
+            _extracted.move_to_end(key)
+            return text
+    text = _extract_text(body, headers)
+    with _extracted_lock:
+        _extracted[key] = text
+        if len(_extracted) > _MAX_EXTRACTED_PAGES:
+            _extracted.popitem(last=False)
+    return text
 
 
 class WebFetch(BaseTool):
@@ -13,8 +372,10 @@ class WebFetch(BaseTool):
     - Use this tool when the user provides specific URLs to fetch (e.g., API documentation, reference materials)
     - ALWAYS use this tool when studying complete API documentation - this is encouraged and has NO limits
     - The url parameter must be a valid HTTP/HTTPS URL
-    - Returns the full text content of the webpage
-    - For API documentation, it's recommended to fetch ALL related doc pages to ensure proper implementation
+    - Returns the readable text of the page: scripts, styles and navigation are dropped, and the main content (<main>/<article>) is preferred when the page has one
+    - Long pages are returned in pages of max_chars characters; continue with the offset given at the end of the result
+    - Connections are pooled and responses are cached on disk honoring ETag/Last-Modified/Cache-Control, so fetching a page again is cheap
+    - For API documentation, it's recommended to fetch ALL related doc pages to ensure proper implementation; pass them together in urls to fetch them concurrently in one call (their text shares max_chars; continue a cut-off page with url and offset)
     - This tool has no search limits - fetch as many documentation pages as needed for accurate implementation
     - If fetch fails, an error message will be returned
 
@@ -22,10 +383,11 @@ class WebFetch(BaseTool):
     - Fetch API documentation: url="https://platform.openai.com/docs/api-reference/files/create"
     - Fetch reference material: url="https://agency-swarm.ai/additional-features/fastapi-integration"
     - Study framework docs: url="https://docs.anthropic.com/claude/docs/tool-use"
+    - Fetch several pages at once: urls=["https://agency-swarm.ai/core-framework/tools/overview", "https://agency-swarm.ai/core-framework/agents/overview"]
     """
 
-    url: str = Field(
-        ...,
+    url: Optional[str] = Field(
+        default=None,
         description="The URL to fetch content from. Must be a valid HTTP/HTTPS URL.",
         examples=[
             "https://platform.openai.com/docs/api-reference/files/create",
@@ -33,75 +395,89 @@ class WebFetch(BaseTool):
             "https://docs.anthropic.com/claude/docs/tool-use"
         ]
     )
+    urls: Optional[List[str]] = Field(
+        default=None,
+        description="Several URLs to fetch concurrently in one call (e.g. all related doc pages); results are returned per URL",
+        max_length=20,
+    )
     timeout: Optional[int] = Field(
         default=30,
-        description="Request timeout in seconds (default: 30)",
+        description="Request timeout in seconds (default: 30); with urls, the time limit for the whole batch",
         ge=5,
         le=120
     )
+    offset: int = Field(
+        default=0,
+        description="Character offset into the extracted text to start from (for reading long pages in parts); single url only",
+        ge=0,
+    )
+    max_chars: int = Field(
+        default=50000,
+        description="Maximum number of characters of text to return (default: 50000); with urls, the total for all pages, shared equally except that short pages leave the rest of their share to longer ones",
+        ge=1000,
+        le=200000,
+    )
 
     def run(self):
         """
-        Fetches the content from the specified URL.
+        Fetches the content from the specified URL, or from every URL in urls concurrently.
 
         Returns:
-            str: The text content of the webpage, or an error message if fetch fails
+            str: The text content of the webpage(s), or an error message if fetch fails
         """
-        try:
-            # Validate URL format
-            if not self.url.startswith(('http://', 'https://')):
-                return f"Error: Invalid URL format. URL must start with http:// or https://. Got: {self.url}"
-
-            # Set headers to mimic browser request
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:123.0) Gecko/20100101 Firefox/123.0',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'DNT': '1',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-                'Sec-Fetch-Dest': 'document',
-                'Sec-Fetch-Mode': 'navigate',
-                'Sec-Fetch-Site': 'none',
-                'Sec-Fetch-User': '?1',
-            }
-
-            # Fetch the URL
-            response = requests.get(self.url, headers=headers, timeout=self.timeout)
-            response.raise_for_status()  # Raise exception for bad status codes
-
-            # Parse HTML content
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            # Remove script and style elements
-            for script in soup(["script", "style", "nav", "footer", "header"]):
-                script.decompose()
-
-            # Get text content
-            text = soup.get_text()
-
-            # Clean up whitespace
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = '\n'.join(chunk for chunk in chunks if chunk)
-
-            # Track successful fetch in context (if available)
-            if self.context is not None:
-                fetched_urls = self.context.get("fetched_urls", set())
-                fetched_urls.add(self.url)
-                self.context.set("fetched_urls", fetched_urls)
-
-            return f"Successfully fetched content from {self.url}:\n\n{text}"
-
-        except requests.exceptions.Timeout:
-            return f"Error: Request timed out after {self.timeout} seconds for URL: {self.url}"
-        except requests.exceptions.ConnectionError:
-            return f"Error: Failed to connect to {self.url}. Please check the URL and your internet connection."
-        except requests.exceptions.HTTPError as e:
-            return f"Error: HTTP {e.response.status_code} error fetching {self.url}: {str(e)}"
-        except Exception as e:
-            return f"Error fetching URL {self.url}: {str(e)}"
+        if self.urls:
+            if self.offset:
+                return "Error: offset cannot be combined with urls; to read further into one page, fetch it with url and offset."
+            return self._run_batch()
+        if not self.url:
+            return "Error: Provide either url or urls."
+
+        ok, text, truncated = _fetch_text(self.url, self.timeout)
+        ok, message = _render_page(self.url, text, truncated, self.offset, self.max_chars) if ok else (ok, text)
+        if ok:
+            self._track([self.url])
+        return message
+
+    def _run_batch(self) -> str:
+        """Fetch all urls on a thread pool within one overall time limit and character budget."""
+        urls = list(dict.fromkeys(url.strip() for url in self.urls if url.strip()))
+        if self.url and self.url not in urls:
+            urls.insert(0, self.url)
+        deadline = time.monotonic() + self.timeout
+
+        executor = ThreadPoolExecutor(max_workers=min(_MAX_BATCH_WORKERS, len(urls)))
+        futures = [executor.submit(_fetch_text, url, self.timeout, deadline) for url in urls]
+        wait(futures, timeout=self.timeout)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        results = []
+        for url, future in zip(urls, futures):
+            if future.done() and not future.cancelled():
+                results.append(future.result())
+            else:
+                results.append((False, f"Error: Not fetched within the {self.timeout} second time limit for URL: {url}", False))
+
+        # The pages' text shares max_chars; pages that failed or are short leave their share to the others
+        shares = _share_budget([len(text) if ok else 0 for ok, text, _ in results], self.max_chars)
+
+        sections = []
+        fetched = []
+        for number, (url, (ok, text, truncated), share) in enumerate(zip(urls, results, shares), start=1):
+            if ok:
+                ok, text = _render_page(url, text, truncated, 0, share)
+            if ok:
+                fetched.append(url)
+            sections.append(f"=== [{number}/{len(urls)}] {url} ===\n{text}")
+
+        self._track(fetched)
+        return f"Fetched {len(fetched)} of {len(urls)} URLs:\n\n" + "\n\n".join(sections)
+
+    def _track(self, urls: List[str]) -> None:
+        # Track successful fetches in context (if available)
+        if self.context is not None and urls:
+            fetched_urls = self.context.get("fetched_urls", set())
+            fetched_urls.update(urls)
+            self.context.set("fetched_urls", fetched_urls)
 
 
 # Create alias for Agency Swarm tool loading (expects class name = file name)
@@ -1,14 +1,20 @@
+import hashlib
 import os
+from typing import Literal
 
 from agency_swarm.tools import BaseTool
 from pydantic import Field
 
-# Import the global read files registry
-from tools.read import _global_read_files
-
-
-# Global registry for tracking written files when context is not available
-_global_written_files = set()
+from shared.diff_utils import compact_diff
+from shared.file_registry import (
+    check_stale_read,
+    disk_bytes,
+    file_digest,
+    fingerprint_file,
+    fingerprint_written_file,
+    read_registry,
+    session_key,
+)
 
 
 class Write(BaseTool):
@@ -17,10 +23,13 @@ class Write(BaseTool):
 
     Usage:
     - This tool will overwrite the existing file if there is one at the provided path.
+    - Use mode="append" to add content to the end of a file (logs, generated output) without rewriting what is already there.
+    - Writing content identical to what is already on disk is detected and skipped, leaving the file's modification time untouched.
     - If this is an existing file, you MUST use the Read tool first to read the file's contents. This tool will fail if you did not read the file first.
     - ALWAYS prefer editing existing files in the codebase. NEVER write new files unless explicitly required.
     - NEVER proactively create documentation files (*.md) or README files. Only create documentation files if explicitly requested by the User.
     - Only use emojis if the user explicitly requests it. Avoid writing emojis to files unless asked.
+    - Overwriting an existing file returns a compact unified diff against its previous content, so there is no need to Read the file again to verify it.
     """
 
     file_path: str = Field(
@@ -28,6 +37,10 @@ class Write(BaseTool):
         description="Absolute or relative path to the file to write.",
     )
     content: str = Field(..., description="The content to write to the file")
+    mode: Literal["overwrite", "append"] = Field(
+        "overwrite",
+        description="overwrite (default) replaces the file contents; append adds content to the end of the file.",
+    )
 
     def run(self):
         try:
@@ -35,31 +48,55 @@ class Write(BaseTool):
             if not os.path.isabs(self.file_path):
                 return f"Error: File path must be absolute: {self.file_path}"
 
+            abs_file_path = os.path.abspath(self.file_path)
+            session = session_key(self.context)
+            previous_content = None
+
             # Check if file already exists
             file_exists = os.path.exists(self.file_path)
 
             if file_exists:
                 # For existing files, check if the file has been read first (YAML precondition)
-                abs_file_path = os.path.abspath(self.file_path)
-                file_has_been_read = False
-
-                # Check in shared state first
-                if self.context is not None:
-                    read_files = self.context.get("read_files", set())
-                    file_has_been_read = abs_file_path in read_files
-
-                # Check global fallback if not found in context
-                if not file_has_been_read:
-                    file_has_been_read = abs_file_path in _global_read_files
-
-                if not file_has_been_read:
+                if not read_registry.has_read(session, abs_file_path):
                     return "Error: You must use Read tool at least once before overwriting this existing file. This tool will fail if you did not read the file first."
 
                 # Verify it's a file and not a directory
                 if not os.path.isfile(self.file_path):
                     return f"Error: Path exists but is not a file: {self.file_path}"
 
-                operation = "overwritten"
+                # Refuse to modify a file that changed on disk since it was last read
+                stale_read_error = check_stale_read(session, abs_file_path)
+                if stale_read_error:
+                    return stale_read_error
+
+                if self.mode == "append":
+                    operation = "appended to"
+                else:
+                    # Skip identical writes: compare sizes first, hash only on a size match.
+                    # The digest recorded by Read is reused when the file is untouched since.
+                    new_bytes = disk_bytes(self.content)
+                    stat = os.stat(self.file_path)
+                    if stat.st_size == len(new_bytes):
+                        cached = read_registry.get(session, abs_file_path)
+                        if (
+                            cached is not None
+                            and cached.size == stat.st_size
+                            and cached.mtime_ns == stat.st_mtime_ns
+                        ):
+                            current_digest = cached.digest
+                        else:
+                            current_digest = file_digest(self.file_path)
+                        if current_digest == hashlib.blake2b(new_bytes).digest():
+                            return f"File unchanged: {self.file_path} already has this content, write skipped"
+
+                    # Keep the previous content so the result can show what changed
+                    try:
+                        with open(self.file_path, "r", encoding="utf-8") as file:
+                            previous_content = file.read()
+                    except UnicodeDecodeError:
+                        previous_content = None
+
+                    operation = "overwritten"
             else:
                 # Create directory if it doesn't exist
                 directory = os.path.dirname(self.file_path)
@@ -70,9 +107,10 @@ class Write(BaseTool):
                         return f"Error creating directory {directory}: {str(e)}"
                 operation = "created"
 
-            # Write the content to the file
+            # Write the content to the file (append only touches the tail)
             try:
-                with open(self.file_path, "w", encoding="utf-8") as file:
+                write_mode = "a" if self.mode == "append" else "w"
+                with open(self.file_path, write_mode, encoding="utf-8") as file:
                     file.write(self.content)
 
                 # Get file stats
@@ -81,17 +119,23 @@ class Write(BaseTool):
                     1 if self.content and not self.content.endswith("\n") else 0
                 )
 
-                # Track that this file has been written in shared state (or global fallback)
-                abs_path = os.path.abspath(self.file_path)
-                if self.context is not None:
-                    written_files = self.context.get("read_files", set())
-                    written_files.add(abs_path)
-                    self.context.set("read_files", written_files)
-
-                # Always mirror into global registry to ensure persistence across tool instances in tests
-                _global_written_files.add(abs_path)
-
-                return f"Successfully {operation} file: {self.file_path}\\nSize: {file_size} bytes, Lines: {line_count}"
+                # Track the written file so later edits don't require another Read.
+                # After an append the content is only known from disk, so the file is re-hashed.
+                if self.mode == "append":
+                    fingerprint = fingerprint_file(self.file_path)
+                else:
+                    fingerprint = fingerprint_written_file(self.file_path, self.content)
+                read_registry.record_write(session, abs_file_path, fingerprint)
+
+                if operation == "appended to":
+                    return f"Successfully appended to file: {self.file_path}\nAppended: {len(disk_bytes(self.content))} bytes, {line_count} lines. Total size: {file_size} bytes"
+
+                msg = f"Successfully {operation} file: {self.file_path}\\nSize: {file_size} bytes, Lines: {line_count}"
+                if previous_content is not None:
+                    diff = compact_diff(previous_content, self.content, self.file_path)
+                    if diff:
+                        msg += f"\nDiff:\n{diff}"
+                return msg
 
             except PermissionError:
                 return f"Error: Permission denied writing to file: {self.file_path}"